@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Latency of fresh-instance calls with the on-demand and the pooling allocators.
+
+Runs the same short snippet repeatedly with each allocation strategy and
+reports the median and 90th percentile latency of a call, and the mean setup
+and instantiation times from the executor metrics. With the pooling allocator,
+stores recycle reserved slots instead of mapping fresh memory on every call.
+
+Usage:
+    python benchmarks/allocation.py [--calls 50] [--memory-limit-mib 256]
+"""
+
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import StoreLimits, WasmtimePythonExecutor
+from wasmtime_executor.limits import supports_pooling_allocator
+
+
+SNIPPET = "print(sum(range(1000)))"
+
+
+def measure(strategy: str, calls: int, limits: StoreLimits) -> list:
+    executor = WasmtimePythonExecutor(
+        additional_authorized_imports=[],
+        allocation_strategy=strategy,
+        store_limits=limits,
+    )
+    try:
+        # Warm up the runtime and the page cache
+        executor(SNIPPET)
+        samples = []
+        for _ in range(calls):
+            executor(SNIPPET)
+            samples.append(executor.last_metrics)
+        return samples
+    finally:
+        executor.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--memory-limit-mib", type=int, default=256)
+    args = parser.parse_args()
+
+    limits = StoreLimits(memory_size=args.memory_limit_mib << 20)
+    strategies = ["on-demand"]
+    if supports_pooling_allocator():
+        strategies.append("pooling")
+    else:
+        print("pooling allocator unavailable with this wasmtime-py", file=sys.stderr)
+
+    print(f"{args.calls} calls, memory limit {args.memory_limit_mib} MiB")
+    print(f"{'strategy':>10} {'p50 ms':>8} {'p90 ms':>8} {'setup us':>9} {'inst us':>8}")
+    for strategy in strategies:
+        samples = measure(strategy, args.calls, limits)
+        totals = sorted(m.total_seconds * 1000 for m in samples)
+        p90 = totals[int(len(totals) * 0.9) - 1]
+        setup = statistics.mean(m.setup_seconds for m in samples) * 1e6
+        instantiate = statistics.mean(m.instantiate_seconds for m in samples) * 1e6
+        print(
+            f"{strategy:>10} {statistics.median(totals):>8.2f} {p90:>8.2f}"
+            f" {setup:>9.0f} {instantiate:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Cost of handing a dataset to guest code as a variable or as an attachment.
+
+For each size, times a call receiving a bytes value through ``send_variables``
+and a call reading the same bytes from an attachment, once whole and once in
+1 MiB chunks, and reports the median time of each and the time spent attaching.
+
+Usage:
+    python benchmarks/attachments.py [--sizes 1 10 100] [--repeat 3]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor
+
+
+READ_WHOLE = "n = len(open('/data/blob', 'rb').read())"
+
+READ_CHUNKS = """
+n = 0
+with open('/data/blob', 'rb') as f:
+    while chunk := f.read(1 << 20):
+        n += len(chunk)
+"""
+
+
+def median_seconds(call, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output, logs, is_final_answer = call()
+        samples.append(time.perf_counter() - started)
+        if "error" in str(output).lower():
+            raise RuntimeError(output)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", nargs="*", type=int, default=[1, 10, 100], help="Sizes in MiB")
+    parser.add_argument("--repeat", type=int, default=3, help="Calls timed per measurement")
+    args = parser.parse_args()
+
+    executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+    try:
+        executor("pass")
+        print(f"{'MiB':>5} {'variable ms':>12} {'attach ms':>10} {'read ms':>8} {'chunks ms':>10}")
+        for size in args.sizes:
+            data = os.urandom(size << 20)
+
+            executor.send_variables({"blob": data})
+            variable = median_seconds(lambda: executor("n = len(blob)"), args.repeat)
+            executor.state.pop("blob")
+
+            started = time.perf_counter()
+            executor.attach_data("blob", data)
+            attach = time.perf_counter() - started
+            whole = median_seconds(lambda: executor(READ_WHOLE), args.repeat)
+            chunks = median_seconds(lambda: executor(READ_CHUNKS), args.repeat)
+            executor.detach_data("blob")
+
+            print(
+                f"{size:>5} {variable * 1000:>12.1f} {attach * 1000:>10.1f}"
+                f" {whole * 1000:>8.1f} {chunks * 1000:>10.1f}"
+            )
+    finally:
+        executor.cleanup()
+
+
+if __name__ == "__main__":
+    main()
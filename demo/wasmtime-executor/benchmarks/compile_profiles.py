@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Compile time against run time for every compilation profile.
+
+For each profile of ``COMPILE_PROFILES``, compiles python.wasm from scratch,
+without the compiled module cache or wasmtime's own cache, then times a
+trivial call and a CPU-bound call on the resulting engine. A profile pays off
+when its compile-time saving outweighs the run time it loses over the calls a
+process makes before it exits; the break-even number of CPU-bound calls is
+printed against the default profile.
+
+Usage:
+    python benchmarks/compile_profiles.py [--repeat 5] [--profiles fast-start max-throughput]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmRuntime, WasmtimePythonExecutor, clear_runtimes
+from wasmtime_executor.compilation import COMPILE_PROFILES
+
+
+CPU_CODE = "total = sum(i * i for i in range(300_000))"
+
+
+def median_seconds(call, repeat: int) -> float:
+    call()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def measure(profile: str, repeat: int) -> dict:
+    executor = WasmtimePythonExecutor(
+        additional_authorized_imports=[], use_module_cache=False, compile_profile=profile
+    )
+    try:
+        # wasmtime's own compilation cache would turn the compile into a cache load
+        settings = {
+            name: value for name, value in executor.engine_settings.items() if name != "cache"
+        }
+        started = time.perf_counter()
+        WasmRuntime(executor.python_wasm_path, settings)
+        compile_seconds = time.perf_counter() - started
+        return {
+            "compile": compile_seconds,
+            "trivial": median_seconds(lambda: executor("x = 1 + 1"), repeat),
+            "cpu": median_seconds(lambda: executor(CPU_CODE), repeat),
+        }
+    finally:
+        executor.cleanup()
+        clear_runtimes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Calls timed per measurement")
+    parser.add_argument(
+        "--profiles", nargs="*", choices=sorted(COMPILE_PROFILES), help="Profiles to measure"
+    )
+    args = parser.parse_args()
+
+    profiles = args.profiles or list(COMPILE_PROFILES)
+    results = {profile: measure(profile, args.repeat) for profile in profiles}
+
+    print(f"{'profile':>15} {'compile s':>10} {'trivial ms':>11} {'cpu ms':>8} {'break-even':>11}")
+    reference = results.get("default")
+    for profile, result in results.items():
+        # CPU-bound calls after which the compile time saved is lost again
+        break_even = "-"
+        if reference is not None:
+            saved = reference["compile"] - result["compile"]
+            lost = result["cpu"] - reference["cpu"]
+            if saved > 0 and lost > 0:
+                break_even = f"{saved / lost:.0f}"
+        print(
+            f"{profile:>15} {result['compile']:>10.2f} {result['trivial'] * 1000:>11.1f}"
+            f" {result['cpu'] * 1000:>8.1f} {break_even:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
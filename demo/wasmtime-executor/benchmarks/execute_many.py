@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Throughput of ``execute_many`` as the number of workers grows.
+
+Runs the same batch of CPU-bound snippets with 1, 2, 4, ... workers up to the
+number of CPUs, and reports snippets per second and the speedup over a single
+worker. Each snippet runs in its own ``Store``, so on an idle machine the
+speedup should track the number of cores.
+
+With ``--processes``, the batch runs on a ``WorkerPool`` of ``--max-workers``
+processes instead of threads of this process. The host stall column is the
+longest delay a host thread waking up every millisecond saw during the batch,
+which is what a service sharing the process with the guests would notice.
+
+Usage:
+    python benchmarks/execute_many.py [--snippets 32] [--max-workers 8] [--preinitialize]
+        [--processes]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor, WorkerPool
+
+
+SNIPPET = "print(sum(i * i for i in range(200_000)))"
+
+
+def worker_counts(max_workers: int) -> list:
+    counts = []
+    workers = 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(max_workers)
+    return counts
+
+
+class HostStallMonitor:
+    """Measures the longest delay of a host thread sleeping 1 ms at a time."""
+
+    def __init__(self):
+        self.longest = 0.0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            started = time.perf_counter()
+            time.sleep(0.001)
+            self.longest = max(self.longest, time.perf_counter() - started - 0.001)
+
+    def stop(self) -> float:
+        self._running = False
+        self._thread.join()
+        return self.longest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--snippets", type=int, default=32)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--preinitialize", action="store_true")
+    parser.add_argument("--processes", action="store_true")
+    args = parser.parse_args()
+
+    options = dict(
+        additional_authorized_imports=[],
+        preinitialize=args.preinitialize,
+        pool_size=args.max_workers,
+        pool_refill_workers=args.max_workers,
+    )
+    if args.processes:
+        executor = WorkerPool(workers=args.max_workers, **options)
+    else:
+        executor = WasmtimePythonExecutor(**options)
+    codes = [SNIPPET] * args.snippets
+
+    # Warm up the shared runtime and the page cache
+    executor.execute_many(codes[: args.max_workers], max_workers=args.max_workers)
+
+    print(f"{args.snippets} snippets, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'seconds':>9} {'snippets/s':>11} {'speedup':>8} {'host stall ms':>14}")
+    baseline = None
+    for workers in worker_counts(args.max_workers):
+        monitor = HostStallMonitor()
+        started = time.perf_counter()
+        results = executor.execute_many(codes, max_workers=workers)
+        elapsed = time.perf_counter() - started
+        stall = monitor.stop()
+
+        failures = sum(1 for _, logs, _ in results if not logs.strip().isdigit())
+        if failures:
+            print(f"{failures} snippets failed", file=sys.stderr)
+        baseline = baseline or elapsed
+        print(
+            f"{workers:>8} {elapsed:>9.2f} {args.snippets / elapsed:>11.1f}"
+            f" {baseline / elapsed:>7.2f}x {stall * 1000:>14.1f}"
+        )
+
+    executor.cleanup()
+
+
+if __name__ == "__main__":
+    main()
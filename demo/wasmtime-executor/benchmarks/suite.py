@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite tracking the performance of the executor across releases.
+
+Measures, in order:
+
+- ``compile``: compiling python.wasm from scratch versus loading it from the
+  compiled module cache.
+- ``latency``: latency of a trivial call in the fresh, pooled and session modes.
+- ``state``: latency of a call as the variables sent with ``send_variables`` grow.
+- ``output``: latency of a call as the volume it prints grows.
+- ``throughput``: snippets per second of ``execute_many`` as workers are added.
+
+Results are written as one JSON document, with the environment they were measured
+in, so that runs of different releases can be compared.
+
+``--baseline`` compares the new results with those of an earlier run and prints
+the ratio of every median latency, or of every throughput, to stderr.
+
+Usage:
+    python benchmarks/suite.py [--output results.json] [--only latency state] [--quick]
+        [--baseline previous.json]
+"""
+
+import argparse
+import importlib.metadata
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import (
+    CompiledModuleCache,
+    WasmRuntime,
+    WasmtimePythonExecutor,
+    __version__,
+)
+
+
+# Bump when the layout of the results changes
+RESULTS_FORMAT_VERSION = 1
+
+MODES = {
+    "fresh": {},
+    "pooled": {"preinitialize": True},
+    "session": {"session": True},
+}
+
+STATE_SIZES = [1 << 10, 10 << 10, 100 << 10, 1 << 20, 10 << 20, 100 << 20]
+OUTPUT_SIZES = [1 << 10, 10 << 10, 100 << 10, 1 << 20, 10 << 20]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Return the median, 90th percentile, mean and extremes of ``samples``, in milliseconds."""
+    ordered = sorted(sample * 1000 for sample in samples)
+    return {
+        "p50_ms": statistics.median(ordered),
+        # Nearest-rank percentile, so few samples never report a value below it
+        "p90_ms": ordered[math.ceil(0.9 * len(ordered)) - 1],
+        "mean_ms": statistics.mean(ordered),
+        "min_ms": ordered[0],
+        "max_ms": ordered[-1],
+        "samples": len(ordered),
+    }
+
+
+def time_calls(
+    call: Callable[[], object], repeat: int, prepare: Callable[[], None] = lambda: None
+) -> Dict[str, float]:
+    """Time ``repeat`` calls of ``call`` after one warm-up call, running ``prepare`` untimed first."""
+    call()
+    samples = []
+    for _ in range(repeat):
+        prepare()
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def bench_compile(args) -> dict:
+    executor = WasmtimePythonExecutor(additional_authorized_imports=[], use_module_cache=False)
+    wasm_path = executor.python_wasm_path
+    # wasmtime's own compilation cache would turn the compile into a cache load
+    settings = {
+        name: value for name, value in executor.engine_settings.items() if name != "cache"
+    }
+    executor.cleanup()
+
+    repeat = 1 if args.quick else 3
+    compile_samples = []
+    load_samples = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = CompiledModuleCache(cache_dir)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            WasmRuntime(wasm_path, settings)
+            compile_samples.append(time.perf_counter() - started)
+        # Store the artifact, then time loading it
+        WasmRuntime(wasm_path, settings, cache)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            WasmRuntime(wasm_path, settings, cache)
+            load_samples.append(time.perf_counter() - started)
+    return {"compile": summarize(compile_samples), "cache_load": summarize(load_samples)}
+
+
+def wait_for_pool(executor: WasmtimePythonExecutor) -> None:
+    """Let the interpreter pool refill, as it would between the steps of an agent."""
+    while executor.pool_stats() is not None and not executor.pool_stats()["ready"]:
+        time.sleep(0.005)
+
+
+def bench_latency(args) -> dict:
+    results = {}
+    for mode, options in MODES.items():
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[], **options)
+        try:
+            results[mode] = time_calls(
+                lambda: executor("x = 1 + 1"), args.repeat, lambda: wait_for_pool(executor)
+            )
+        finally:
+            executor.cleanup()
+    return results
+
+
+def bench_state(args) -> dict:
+    sizes = STATE_SIZES[:4] if args.quick else STATE_SIZES
+    results = {}
+    executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+    try:
+        for size in sizes:
+            executor.send_variables({"blob": "x" * size})
+            results[str(size)] = time_calls(
+                lambda: executor("n = len(blob)"), max(3, args.repeat // 4)
+            )
+    finally:
+        executor.cleanup()
+    return results
+
+
+def bench_output(args) -> dict:
+    sizes = OUTPUT_SIZES[:3] if args.quick else OUTPUT_SIZES
+    results = {}
+    executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+    try:
+        for size in sizes:
+            code = f"for _ in range({size // 64}):\n    print('x' * 63)"
+            results[str(size)] = time_calls(lambda: executor(code), max(3, args.repeat // 4))
+    finally:
+        executor.cleanup()
+    return results
+
+
+def bench_throughput(args) -> dict:
+    cpus = os.cpu_count() or 1
+    snippets = 8 if args.quick else 32
+    codes = ["print(sum(i * i for i in range(100_000)))"] * snippets
+    results = {}
+    executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+    try:
+        executor.execute_many(codes[:cpus], max_workers=cpus)
+        workers = 1
+        while True:
+            started = time.perf_counter()
+            executor.execute_many(codes, max_workers=workers)
+            elapsed = time.perf_counter() - started
+            results[str(workers)] = {
+                "seconds": elapsed,
+                "snippets_per_second": snippets / elapsed,
+            }
+            if workers >= cpus:
+                break
+            workers = min(workers * 2, cpus)
+    finally:
+        executor.cleanup()
+    return results
+
+
+BENCHMARKS = {
+    "compile": bench_compile,
+    "latency": bench_latency,
+    "state": bench_state,
+    "output": bench_output,
+    "throughput": bench_throughput,
+}
+
+
+def environment() -> dict:
+    return {
+        "package_version": __version__,
+        "wasmtime_version": importlib.metadata.version("wasmtime"),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def compare(results: dict, baseline: dict) -> List[str]:
+    """Return one line per measurement found in both runs, with its new-to-old ratio."""
+    lines = []
+    for name, measurements in results["benchmarks"].items():
+        for key, values in measurements.items():
+            old = baseline.get("benchmarks", {}).get(name, {}).get(key)
+            if not old:
+                continue
+            metric = "p50_ms" if "p50_ms" in values else "snippets_per_second"
+            if old.get(metric):
+                ratio = values[metric] / old[metric]
+                lines.append(f"{name:>10} {key:>10} {metric:>20} {ratio:>6.2f}x")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", help="File receiving the JSON results (default: stdout)")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=20, help="Calls timed per measurement")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes and fewer samples")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare with")
+    args = parser.parse_args(argv)
+
+    results = {
+        "format": RESULTS_FORMAT_VERSION,
+        "environment": environment(),
+        "benchmarks": {},
+    }
+    for name in args.only or BENCHMARKS:
+        print(f"running {name}", file=sys.stderr)
+        results["benchmarks"][name] = BENCHMARKS[name](args)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        print("\n".join(compare(results, baseline)), file=sys.stderr)
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(document + "\n")
+    else:
+        print(document)
+
+
+if __name__ == "__main__":
+    main()
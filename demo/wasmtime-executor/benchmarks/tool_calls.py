@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Overhead of calling host tools from guest code.
+
+Runs a loop making the same number of calls to a host tool and to a function
+defined in the guest, in each execution mode, and reports the median time of
+a call of each loop and the resulting overhead of one host tool call. The time
+tool calls spend on the host, decoding the call, running the tool and encoding
+the reply, is taken from the executor metrics.
+
+Usage:
+    python benchmarks/tool_calls.py [--calls 1000] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor
+
+
+MODES = {
+    "fresh": {"output_capture": "memory"},
+    "pooled": {"preinitialize": True},
+    "session": {"session": True},
+}
+
+LOOP = """
+def local_echo(value):
+    return value
+
+for i in range({calls}):
+    {function}({{"i": i, "name": "item"}})
+"""
+
+
+def measure(options: dict, calls: int, repeat: int) -> dict:
+    executor = WasmtimePythonExecutor(additional_authorized_imports=[], **options)
+    executor.send_tools({"echo": lambda value: value})
+    try:
+        timings = {}
+        for function in ("local_echo", "echo"):
+            code = LOOP.format(calls=calls, function=function)
+            # Warm up the runtime and the interpreter pool
+            executor(code)
+            samples = []
+            host = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                executor(code)
+                samples.append(time.perf_counter() - started)
+                host.append(executor.last_metrics.tool_seconds)
+            timings[function] = statistics.median(samples)
+            timings[f"{function}_host"] = statistics.median(host)
+        return timings
+    finally:
+        executor.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.calls} calls per loop, median of {args.repeat} runs")
+    print(f"{'mode':>8} {'local ms':>9} {'tool ms':>9} {'us/call':>8} {'host us':>8}")
+    for mode, options in MODES.items():
+        timings = measure(options, args.calls, args.repeat)
+        per_call = (timings["echo"] - timings["local_echo"]) / args.calls * 1e6
+        host = timings["echo_host"] / args.calls * 1e6
+        print(
+            f"{mode:>8} {timings['local_echo'] * 1000:>9.1f} {timings['echo'] * 1000:>9.1f}"
+            f" {per_call:>8.1f} {host:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
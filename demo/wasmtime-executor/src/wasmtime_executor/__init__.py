@@ -5,7 +5,35 @@ This package provides a sandboxed Python execution environment using WASMTIME
 WebAssembly runtime with the real python.wasm binary for strong isolation guarantees.
 """
 
+from .attachments import DataAttachments
+from .bundle import build_stdlib_bundle
+from .cache import CompiledModuleCache
 from .executor import WasmtimePythonExecutor
+from .limits import StoreLimits
+from .metrics import ExecutionMetrics, MetricsRegistry, get_process_metrics
+from .pool import InterpreterPool
+from .profiling import GuestProfile
+from .pycache import BytecodeCache
+from .runtime import WasmRuntime, clear_runtimes, get_runtime
+from .sessions import SessionManager
+from .workers import WorkerPool
 
 __version__ = "0.1.0"
-__all__ = ["WasmtimePythonExecutor"]
+__all__ = [
+    "BytecodeCache",
+    "CompiledModuleCache",
+    "DataAttachments",
+    "ExecutionMetrics",
+    "GuestProfile",
+    "InterpreterPool",
+    "MetricsRegistry",
+    "SessionManager",
+    "StoreLimits",
+    "WasmRuntime",
+    "WasmtimePythonExecutor",
+    "WorkerPool",
+    "build_stdlib_bundle",
+    "clear_runtimes",
+    "get_process_metrics",
+    "get_runtime",
+]
@@ -0,0 +1,142 @@
+"""
+Read-only data attached to the guest filesystem.
+
+Variables reach the guest as pickles or as source, which suits values of a few
+megabytes at most. Datasets are attached instead: each attachment is a file or a
+directory tree in a host directory that every guest mounts read-only at
+``GUEST_DATA_DIR``, so guest code opens it by name and reads it like any file,
+seeking and streaming it in chunks, without it ever being encoded.
+
+Host files are hard-linked into the attachment directory when they live on the
+same filesystem, which costs no copy, and copied otherwise; buffers are written
+once. Guest reads are then served by the host page cache. Symbolic links are not
+used since WASI refuses to follow links leaving a mounted directory. Because the
+whole directory is a single mount, attachments added later are visible to guests
+that are already running, such as pooled and session interpreters.
+"""
+
+import inspect
+import logging
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Union
+
+from wasmtime import WasiConfig
+
+
+logger = logging.getLogger(__name__)
+
+# Guest path of the attachment directory
+GUEST_DATA_DIR = "/data"
+
+# Names of attachments: one path component, without leading dot
+_NAME_PATTERN = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9._-]*")
+
+AttachmentSource = Union[str, Path, bytes, bytearray, memoryview]
+
+
+def supports_read_only_mounts() -> bool:
+    """Whether this wasmtime-py can mount a directory without write access for the guest."""
+    return "fs_mutable" in inspect.signature(WasiConfig.preopen_dir).parameters
+
+
+def mount_read_only(config: WasiConfig, directory: Union[str, Path], guest_path: str) -> None:
+    """Mount ``directory`` at ``guest_path`` without write access for the guest."""
+    config.preopen_dir(str(directory), guest_path, fs_mutable=False)
+
+
+class DataAttachments:
+    """
+    Named files and directories exposed read-only to the guest under ``GUEST_DATA_DIR``.
+
+    Args:
+        directory (str | Path, optional): Host directory holding the attachments. Defaults
+            to a new temporary directory, removed by ``close``.
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None):
+        if not supports_read_only_mounts():
+            raise RuntimeError("Data attachments need read-only mounts from wasmtime-py")
+        self._temp_dir: Optional[tempfile.TemporaryDirectory] = None
+        if directory is None:
+            self._temp_dir = tempfile.TemporaryDirectory(prefix="wasmtime-data-")
+            directory = self._temp_dir.name
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def add(self, name: str, source: AttachmentSource) -> str:
+        """
+        Attach ``source`` as ``name``, replacing an attachment of the same name.
+
+        Args:
+            name (str): File name of the attachment inside ``GUEST_DATA_DIR``.
+            source (str | Path | bytes | bytearray | memoryview): A host file or directory,
+                linked or copied into the attachment directory, or a buffer written to it.
+
+        Returns:
+            str: Guest path of the attachment.
+
+        Raises:
+            ValueError: If the name is not a plain file name.
+            FileNotFoundError: If a source path does not exist.
+        """
+        target = self.directory / self._check_name(name)
+        staging = Path(tempfile.mkdtemp(dir=self.directory, prefix=".staging-"))
+        try:
+            staged = staging / name
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                with open(staged, "wb") as f:
+                    f.write(source)
+            elif Path(source).is_dir():
+                shutil.copytree(source, staged, copy_function=_link_or_copy)
+            elif Path(source).exists():
+                _link_or_copy(source, staged)
+            else:
+                raise FileNotFoundError(f"No file or directory to attach at {source}")
+            if target.is_dir() and not target.is_symlink():
+                shutil.rmtree(target)
+            os.replace(staged, target)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        logger.info(f"Attached {name} at {self.guest_path(name)}")
+        return self.guest_path(name)
+
+    def remove(self, name: str) -> None:
+        """Detach ``name``; guests that already opened it keep reading it."""
+        target = self.directory / self._check_name(name)
+        if target.is_dir():
+            shutil.rmtree(target)
+        else:
+            target.unlink(missing_ok=True)
+
+    def names(self) -> List[str]:
+        """Return the names of the attachments."""
+        return sorted(
+            entry.name for entry in self.directory.iterdir() if not entry.name.startswith(".")
+        )
+
+    def guest_path(self, name: str) -> str:
+        """Return the path under which the guest finds ``name``."""
+        return f"{GUEST_DATA_DIR}/{self._check_name(name)}"
+
+    def close(self) -> None:
+        """Remove the attachment directory if it was created for these attachments."""
+        if self._temp_dir is not None:
+            self._temp_dir.cleanup()
+
+    @staticmethod
+    def _check_name(name: str) -> str:
+        if not _NAME_PATTERN.fullmatch(name):
+            raise ValueError(f"Invalid attachment name {name!r}, expected a plain file name")
+        return name
+
+
+def _link_or_copy(source: Union[str, Path], target: Union[str, Path]) -> None:
+    """Hard-link ``source`` at ``target``, or copy it when it is on another filesystem."""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
@@ -0,0 +1,323 @@
+"""
+Trimmed standard library bundles for the guest.
+
+The guest imports its standard library from ``python311.zip``, which holds the
+precompiled bytecode of every module. Each interpreter reads the directory of
+the whole archive and inflates the modules it imports. A bundle is a smaller
+archive holding only the modules reachable from a list of imports, stored
+uncompressed, which the executor mounts in place of the full zip.
+
+Modules are collected in two passes. The guest first imports the requested
+modules, along with those the executor itself needs, and reports every module
+loaded from the archive. The bytecode of those modules is then scanned on the
+host for further imports, including imports inside functions, when the host
+runs the same CPython version as the guest.
+
+Usage:
+    python -m wasmtime_executor.bundle OUTPUT_DIR [--imports MODULE ...]
+"""
+
+import argparse
+import dis
+import hashlib
+import importlib.util
+import json
+import logging
+import marshal
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from wasmtime import Store, WasiConfig
+
+from .interpreter import DEFAULT_PRELOAD_IMPORTS, GUEST_STDLIB_DIR, configure_guest
+from .interrupt import watch_store
+from .runtime import WasmRuntime, find_wasm_runtime_dir, get_runtime
+from .state import GUEST_PICKLE_MODULES
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of a bundle directory changes
+BUNDLE_FORMAT_VERSION = 1
+
+# Files of a bundle directory, mounted at GUEST_STDLIB_DIR
+STDLIB_ARCHIVE = "python311.zip"
+BUNDLE_MANIFEST = "bundle.json"
+
+# Modules the executor imports in profiled guests
+PROFILER_GUEST_MODULES = ["cProfile", "pstats"]
+
+# Modules the executor imports in every guest, next to the preloaded ones
+EXECUTOR_GUEST_MODULES = sorted(
+    {"atexit", "io", "pickle", "struct", "traceback"}
+    | set(GUEST_PICKLE_MODULES)
+    | set(DEFAULT_PRELOAD_IMPORTS)
+    | set(PROFILER_GUEST_MODULES)
+)
+
+# Guest program printing the archive entries of the modules it loaded
+_PROBE_SOURCE = """import sys
+for _name in {modules!r}:
+    try:
+        __import__(_name)
+    except Exception:
+        pass
+_prefix = {archive!r} + "/"
+for _module in list(sys.modules.values()):
+    _file = getattr(_module, "__file__", None) or ""
+    if _file.startswith(_prefix):
+        print(_file[len(_prefix):])
+"""
+
+
+def stdlib_archive_path(wasm_runtime_dir: Union[str, Path]) -> Path:
+    """Return the host path of the full standard library archive of a runtime directory."""
+    return Path(wasm_runtime_dir) / GUEST_STDLIB_DIR.lstrip("/") / STDLIB_ARCHIVE
+
+
+def build_stdlib_bundle(
+    imports: Iterable[str],
+    output_dir: Union[str, Path],
+    wasm_runtime_dir: Optional[Union[str, Path]] = None,
+    runtime: Optional[WasmRuntime] = None,
+    follow_lazy_imports: bool = True,
+) -> dict:
+    """
+    Build a bundle of the modules reachable from ``imports`` into ``output_dir``.
+
+    Args:
+        imports (Iterable[str]): Modules the guest code may import, typically the
+            executor's ``additional_authorized_imports``.
+        output_dir (str | Path): Directory receiving the archive and its manifest.
+        wasm_runtime_dir (str | Path, optional): Runtime directory holding the full archive.
+            Defaults to the one the executor uses.
+        runtime (WasmRuntime, optional): Runtime used to run the guest probe. Defaults to
+            the shared runtime of the python.wasm binary.
+        follow_lazy_imports (bool): Whether to also include modules imported inside
+            functions, found by scanning the bytecode of the loaded modules.
+
+    Returns:
+        The bundle manifest, also written to ``bundle.json`` in ``output_dir``.
+    """
+    wasm_runtime_dir = Path(wasm_runtime_dir or find_wasm_runtime_dir())
+    source = stdlib_archive_path(wasm_runtime_dir)
+    requested = sorted(set(imports))
+
+    with zipfile.ZipFile(source) as archive:
+        entries = set(archive.namelist())
+        included = _probe_loaded_entries(
+            wasm_runtime_dir, requested + EXECUTOR_GUEST_MODULES, runtime
+        )
+        if follow_lazy_imports:
+            included = _follow_imports(archive, entries, included)
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        # Write next to the target and rename, so a running guest never sees a partial archive
+        fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".zip.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f, zipfile.ZipFile(
+                f, "w", compression=zipfile.ZIP_STORED
+            ) as bundle:
+                for name in sorted(included):
+                    info = archive.getinfo(name)
+                    info.compress_type = zipfile.ZIP_STORED
+                    bundle.writestr(info, archive.read(name))
+            os.replace(tmp_path, output_dir / STDLIB_ARCHIVE)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    manifest = {
+        "format": BUNDLE_FORMAT_VERSION,
+        "imports": requested,
+        "modules": len(included),
+        "source_digest": _file_sha256(source),
+        "size": (output_dir / STDLIB_ARCHIVE).stat().st_size,
+    }
+    (output_dir / BUNDLE_MANIFEST).write_text(json.dumps(manifest, indent=2))
+    logger.info(
+        f"Built stdlib bundle of {len(included)} modules for {requested} in {output_dir}"
+    )
+    return manifest
+
+
+def load_bundle_manifest(bundle_dir: Union[str, Path]) -> dict:
+    """
+    Check that ``bundle_dir`` holds a bundle and return its manifest.
+
+    Raises ``ValueError`` if the directory is not a bundle of a supported format.
+    """
+    bundle_dir = Path(bundle_dir)
+    try:
+        manifest = json.loads((bundle_dir / BUNDLE_MANIFEST).read_text())
+    except (OSError, ValueError) as e:
+        raise ValueError(f"No stdlib bundle manifest in {bundle_dir}: {e}") from e
+    if manifest.get("format") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported stdlib bundle format in {bundle_dir}")
+    if not (bundle_dir / STDLIB_ARCHIVE).is_file():
+        raise ValueError(f"No {STDLIB_ARCHIVE} in stdlib bundle {bundle_dir}")
+    return manifest
+
+
+def missing_bundle_modules(bundle_dir: Union[str, Path], modules: Iterable[str]) -> List[str]:
+    """Return the top-level ``modules`` the archive of the bundle in ``bundle_dir`` lacks."""
+    with zipfile.ZipFile(Path(bundle_dir) / STDLIB_ARCHIVE) as archive:
+        entries = set(archive.namelist())
+    return [
+        module
+        for module in modules
+        if f"{module}.pyc" not in entries and f"{module}/__init__.pyc" not in entries
+    ]
+
+
+def _probe_loaded_entries(
+    wasm_runtime_dir: Path, modules: List[str], runtime: Optional[WasmRuntime]
+) -> Set[str]:
+    """Run the guest on the full archive and return the entries of the modules it loads."""
+    if runtime is None:
+        runtime = get_runtime(
+            wasm_runtime_dir / "bin" / "python-3.11.1.wasm",
+            {"consume_fuel": False, "epoch_interruption": True, "cache": True},
+        )
+    archive = f"{GUEST_STDLIB_DIR}/{STDLIB_ARCHIVE}"
+    with tempfile.TemporaryDirectory() as chroot:
+        out_log = os.path.join(chroot, "out.log")
+        err_log = os.path.join(chroot, "err.log")
+        config = WasiConfig()
+        config.argv = (
+            "python",
+            "-c",
+            _PROBE_SOURCE.format(modules=modules, archive=archive),
+        )
+        config.stdout_file = out_log
+        config.stderr_file = err_log
+        configure_guest(config, wasm_runtime_dir)
+
+        store = Store(runtime.engine)
+        try:
+            if runtime.engine_settings.get("consume_fuel"):
+                store.set_fuel(100_000_000_000)
+            store.set_wasi(config)
+            # The handle must outlive the call
+            watch = watch_store(store, lambda: None)
+            instance = runtime.linker.instantiate(store, runtime.module)
+            instance.exports(store)["_start"](store)
+        except Exception as e:
+            with open(err_log, errors="replace") as f:
+                raise RuntimeError(f"Stdlib probe failed: {e}\n{f.read()}") from e
+        finally:
+            store.close()
+
+        with open(out_log) as f:
+            return {line.strip() for line in f if line.strip()}
+
+
+def _follow_imports(
+    archive: zipfile.ZipFile, entries: Set[str], included: Set[str]
+) -> Set[str]:
+    """Add the entries of modules imported by the bytecode of ``included``, transitively."""
+    magic = importlib.util.MAGIC_NUMBER
+    pending = sorted(included)
+    included = set(included)
+    while pending:
+        name = pending.pop()
+        data = archive.read(name)
+        if data[:4] != magic:
+            # The host cannot read bytecode of another CPython version
+            logger.warning("Host and guest bytecode differ; lazy imports are not followed")
+            return included
+        module, is_package = _module_of_entry(name)
+        for entry in _imported_entries(marshal.loads(data[16:]), module, is_package, entries):
+            if entry not in included:
+                included.add(entry)
+                pending.append(entry)
+    return included
+
+
+def _module_of_entry(entry: str) -> Tuple[str, bool]:
+    path = entry[: -len(".pyc")]
+    if path.endswith("/__init__"):
+        return path[: -len("/__init__")].replace("/", "."), True
+    return path.replace("/", "."), False
+
+
+def _module_entries(module: str, entries: Set[str]) -> Iterator[str]:
+    """Yield the entries of ``module`` and of its parent packages that exist in the archive."""
+    parts = module.split(".")
+    for i in range(1, len(parts) + 1):
+        path = "/".join(parts[:i])
+        for candidate in (f"{path}.pyc", f"{path}/__init__.pyc"):
+            if candidate in entries:
+                yield candidate
+
+
+def _imported_entries(
+    code, module: str, is_package: bool, entries: Set[str]
+) -> Iterator[str]:
+    package = module if is_package else module.rpartition(".")[0]
+    for name, level, fromlist in _code_imports(code):
+        if level:
+            base = package.split(".")
+            base = base[: len(base) - (level - 1)]
+            name = ".".join(base + ([name] if name else []))
+        if not name:
+            continue
+        yield from _module_entries(name, entries)
+        for item in fromlist or ():
+            if item != "*":
+                yield from _module_entries(f"{name}.{item}", entries)
+
+
+def _code_imports(code) -> Iterator[Tuple[str, int, Optional[tuple]]]:
+    """Yield the name, level and fromlist of every import statement in ``code``."""
+    constants: list = []
+    for instruction in dis.get_instructions(code):
+        if instruction.opname == "IMPORT_NAME" and len(constants) >= 2:
+            level, fromlist = constants[-2], constants[-1]
+            if isinstance(level, int):
+                yield instruction.argval, level, fromlist
+        if instruction.opname == "LOAD_CONST":
+            constants.append(instruction.argval)
+        else:
+            constants = []
+    for constant in code.co_consts:
+        if hasattr(constant, "co_code"):
+            yield from _code_imports(constant)
+
+
+def _file_sha256(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Build a trimmed standard library bundle for the guest."
+    )
+    parser.add_argument("output_dir", help="Directory receiving the bundle")
+    parser.add_argument(
+        "--imports", nargs="*", default=[], help="Modules the guest code may import"
+    )
+    parser.add_argument(
+        "--no-lazy-imports",
+        action="store_true",
+        help="Only include modules loaded when importing, not those imported in functions",
+    )
+    args = parser.parse_args(argv)
+
+    manifest = build_stdlib_bundle(
+        args.imports, args.output_dir, follow_lazy_imports=not args.no_lazy_imports
+    )
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
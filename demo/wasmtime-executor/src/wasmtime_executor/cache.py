@@ -0,0 +1,167 @@
+"""
+On-disk cache of compiled WebAssembly modules.
+
+Compiling python.wasm with Cranelift takes seconds, while loading a serialized
+artifact is a single mmap. This module stores compiled modules on disk, keyed on
+everything that affects the compiled code, so that only the first process pays
+for the compilation.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import platform
+import tempfile
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from wasmtime import Engine, Module
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the cache directory or the key changes.
+CACHE_FORMAT_VERSION = 1
+
+# Digests of wasm files, keyed on (path, size, mtime) so a file is hashed once per process.
+_file_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def default_cache_dir() -> Path:
+    """Return the default directory used for compiled module artifacts."""
+    override = os.environ.get("WASMTIME_EXECUTOR_CACHE_DIR")
+    if override:
+        return Path(override)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "wasmtime-executor"
+
+
+def _wasmtime_version() -> str:
+    try:
+        return metadata.version("wasmtime")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _file_digest(path: Path) -> str:
+    stat = path.stat()
+    digest_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    digest = _file_digests.get(digest_key)
+    if digest is None:
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        _file_digests[digest_key] = digest
+    return digest
+
+
+class CompiledModuleCache:
+    """
+    Persistent cache of compiled modules built on ``Module.serialize`` and
+    ``Module.deserialize_file``.
+
+    Artifacts are keyed on the SHA-256 of the wasm file, the wasmtime version,
+    the host platform and the engine settings, so any change to one of them
+    results in a fresh compilation instead of loading a stale artifact.
+    Artifacts are written to a temporary file and atomically renamed into place,
+    and an artifact that fails to deserialize is discarded and rebuilt.
+
+    Note that wasmtime trusts deserialized artifacts, so the cache directory
+    must only be writable by trusted users.
+
+    Args:
+        cache_dir (str | Path, optional): Directory holding the artifacts.
+            Defaults to ``$WASMTIME_EXECUTOR_CACHE_DIR`` or
+            ``~/.cache/wasmtime-executor``.
+    """
+
+    def __init__(self, cache_dir: Optional[Union[str, Path]] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+
+    def key(self, wasm_path: Union[str, Path], engine_settings: Dict[str, Any]) -> str:
+        """Return the cache key of ``wasm_path`` compiled with ``engine_settings``."""
+        material = json.dumps(
+            {
+                "format": CACHE_FORMAT_VERSION,
+                "wasm_sha256": _file_digest(Path(wasm_path)),
+                "wasmtime": _wasmtime_version(),
+                "machine": platform.machine(),
+                "system": platform.system(),
+                "engine": engine_settings,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def artifact_path(
+        self, wasm_path: Union[str, Path], engine_settings: Dict[str, Any]
+    ) -> Path:
+        """Return the path of the artifact for ``wasm_path`` and ``engine_settings``."""
+        name = f"{Path(wasm_path).stem}-{self.key(wasm_path, engine_settings)[:32]}.cwasm"
+        return self.cache_dir / name
+
+    def load(
+        self,
+        engine: Engine,
+        wasm_path: Union[str, Path],
+        engine_settings: Dict[str, Any],
+    ) -> Module:
+        """
+        Load the compiled module for ``wasm_path``, compiling and storing it on a miss.
+
+        ``engine_settings`` must describe how ``engine`` was configured, since a
+        serialized module can only be loaded into a compatible engine.
+        """
+        artifact = self.artifact_path(wasm_path, engine_settings)
+
+        if artifact.exists():
+            try:
+                module = Module.deserialize_file(engine, str(artifact))
+                logger.debug(f"Loaded compiled module from {artifact}")
+                return module
+            except Exception as e:
+                logger.warning(f"Discarding unusable compiled module {artifact}: {e}")
+                self._remove(artifact)
+
+        module = Module.from_file(engine, str(wasm_path))
+        self._store(artifact, module)
+        return module
+
+    def clear(self) -> None:
+        """Remove every artifact from the cache directory."""
+        if not self.cache_dir.exists():
+            return
+        for artifact in self.cache_dir.glob("*.cwasm"):
+            self._remove(artifact)
+
+    def _store(self, artifact: Path, module: Module) -> None:
+        try:
+            artifact.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=artifact.parent, prefix=".tmp-", suffix=".cwasm"
+            )
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(module.serialize())
+                os.replace(tmp_path, artifact)
+            except BaseException:
+                self._remove(Path(tmp_path))
+                raise
+            logger.debug(f"Stored compiled module at {artifact}")
+        except OSError as e:
+            # The cache is an optimization: failing to write it must not fail the load.
+            logger.warning(f"Could not store compiled module at {artifact}: {e}")
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove {path}: {e}")
@@ -0,0 +1,77 @@
+"""
+Compilation settings of the engine.
+
+Cranelift compiles python.wasm once per engine, or once per machine with the
+compiled module cache, and the resulting code then runs every guest call. The
+optimization level trades one against the other: ``"none"`` compiles the module
+noticeably faster but runs the interpreter slower, while ``"speed"``, the
+default of wasmtime, spends more time compiling for faster guest code. Where
+compiled modules are cached that compile time is only paid once, so the
+trade-off matters most for short-lived processes without a warm cache.
+
+Named profiles bundle settings for those situations, and individual settings
+may be overridden on top of a profile. Only settings that keep python.wasm
+valid and the process alive are accepted: the module needs bulk memory
+operations, and wasmtime aborts the process when SIMD is disabled while relaxed
+SIMD stays enabled, so disabling SIMD disables relaxed SIMD with it.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+
+# Values accepted for every compilation setting, by ``Config`` attribute
+COMPILE_SETTINGS: Dict[str, Tuple[Any, ...]] = {
+    "cranelift_opt_level": ("none", "speed", "speed_and_size"),
+    "parallel_compilation": (True, False),
+    "wasm_simd": (True, False),
+    "wasm_relaxed_simd": (True, False),
+    "cranelift_nan_canonicalization": (True, False),
+}
+
+# Named sets of compilation settings; the default profile keeps the defaults of wasmtime
+COMPILE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    # Compile as fast as possible, for processes that compile python.wasm on every start
+    "fast-start": {"cranelift_opt_level": "none", "parallel_compilation": True},
+    # Fastest guest code, for long-lived processes or a warm compiled module cache
+    "max-throughput": {"cranelift_opt_level": "speed", "parallel_compilation": True},
+    # Smaller machine code, for many engines or cached artifacts on a small disk
+    "small-code": {"cranelift_opt_level": "speed_and_size"},
+}
+
+
+def resolve_compile_settings(
+    profile: str = "default", overrides: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Return the engine settings of a compilation profile with ``overrides`` applied.
+
+    Args:
+        profile (str): Name of a profile in ``COMPILE_PROFILES``.
+        overrides (Dict[str, Any], optional): Settings of ``COMPILE_SETTINGS`` replacing
+            those of the profile.
+
+    Raises:
+        ValueError: If the profile, a setting or one of its values is unknown.
+    """
+    if profile not in COMPILE_PROFILES:
+        raise ValueError(
+            f"Unknown compile profile {profile!r}, expected one of {tuple(COMPILE_PROFILES)}"
+        )
+    settings = {**COMPILE_PROFILES[profile], **(overrides or {})}
+    for name, value in settings.items():
+        if name not in COMPILE_SETTINGS:
+            raise ValueError(
+                f"Unknown compile setting {name!r}, expected one of {tuple(COMPILE_SETTINGS)}"
+            )
+        allowed = COMPILE_SETTINGS[name]
+        if value not in allowed or type(value) is not type(allowed[0]):
+            raise ValueError(
+                f"Invalid value {value!r} for compile setting {name!r}, "
+                f"expected one of {allowed}"
+            )
+    if settings.get("wasm_simd") is False:
+        if settings.get("wasm_relaxed_simd"):
+            raise ValueError("Relaxed SIMD cannot be enabled without SIMD")
+        settings["wasm_relaxed_simd"] = False
+    return settings
@@ -5,19 +5,109 @@ This module provides a sandboxed Python execution environment using WASMTIME
 WebAssembly runtime with the real python.wasm binary for strong isolation guarantees.
 """
 
+import asyncio
 import os
+import pickle
+import shutil
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 import logging
 import json
-import ast
 
-from wasmtime import Config, Engine, Linker, Module, Store, WasiConfig
+from wasmtime import Config, ExitTrap, Store, WasiConfig
+
+from .attachments import AttachmentSource, DataAttachments, supports_read_only_mounts
+from .bundle import (
+    PROFILER_GUEST_MODULES,
+    load_bundle_manifest,
+    missing_bundle_modules,
+    stdlib_archive_path,
+)
+from .cache import CompiledModuleCache
+from .compilation import resolve_compile_settings
+from .interpreter import (
+    DEFAULT_PRELOAD_IMPORTS,
+    FRESH_CHANNEL_PRELUDE,
+    GUEST_CHANNEL_SOURCE,
+    GuestInterpreter,
+    SessionInterpreter,
+    configure_guest,
+)
+from .interrupt import Interrupt, watch_store
+from .limits import (
+    ALLOCATION_STRATEGIES,
+    DEFAULT_POOLING_SLOTS,
+    MAX_MEMORY_SIZE,
+    StoreLimits,
+    supports_pooling_allocator,
+)
+from .metrics import ExecutionMetrics, get_process_metrics
+from .pool import InterpreterPool
+from .profiling import (
+    DEFAULT_PROFILE_ROWS,
+    ENGINE_PROFILERS,
+    GUEST_PROFILE_START_SOURCE,
+    GUEST_PROFILE_STOP_SOURCE,
+    PROFILE_FILE_SENDER_SOURCE,
+    GuestProfile,
+    parse_profile,
+)
+from .pycache import (
+    DEFAULT_PYCACHE_SIZE,
+    GUEST_MODULES_DIR,
+    BytecodeCache,
+    host_compiles_guest_bytecode,
+)
+from .result import RESULT_FILE_SENDER_SOURCE, decode_result, parse_result_record
+from .runtime import find_wasm_runtime_dir, get_runtime
+from .state import (
+    GUEST_GLOBALS_EXPORT_SOURCE,
+    GUEST_GLOBALS_IMPORT_SOURCE,
+    GUEST_STATE_DIR,
+    STATE_LOADER_SOURCE,
+    STATE_STDIN_LOADER_SOURCE,
+    StateTracker,
+)
+from .streams import (
+    DEFAULT_CAPTURE_LIMIT,
+    OutputCallback,
+    capture_output,
+    encode_frame,
+    feed_stdin,
+    notify_output,
+    read_output_file,
+    supports_memory_streams,
+)
+from .tools import GUEST_TOOLS_UNAVAILABLE_SOURCE, ToolBridge
 
 
 logger = logging.getLogger(__name__)
 
+# Fuel budget of a single call
+DEFAULT_FUEL = 1_000_000_000
+
+# Wall-clock budget of a single call, in seconds, when calls are bounded by epochs
+DEFAULT_TIMEOUT = 30.0
+
+# How calls are bounded: by a fuel budget, by a wall-clock timeout, or by both
+INTERRUPTION_MODES = ("fuel", "epoch", "both")
+
+# Where fresh instances write their output: host memory, temporary files, or the best available
+OUTPUT_CAPTURE_MODES = ("auto", "memory", "file")
+
+# Seconds between two checks of the interrupt of a fresh instance
+FRESH_INSTANCE_POLL_INTERVAL = 0.05
+
+# Seconds a fresh instance past its deadline gets to trap before it is abandoned
+FRESH_INSTANCE_STOP_GRACE = 0.1
+
+# Executor state entries that are not variables of the guest program
+RESERVED_STATE_KEYS = ("__name__", "_print_outputs", "_operations_count")
+
 
 class WasmtimePythonExecutor:
     """
@@ -28,35 +118,164 @@ class WasmtimePythonExecutor:
 
     Args:
         additional_authorized_imports (List[str]): Additional Python packages to make available.
-        max_print_outputs_length (int, optional): Maximum length of the print outputs.
+        max_print_outputs_length (int, optional): Maximum length of the print outputs. Longer
+            logs keep their beginning and their end.
         additional_functions (dict, optional): Additional Python functions to be added to the executor.
+        use_module_cache (bool, optional): Whether to keep the compiled python.wasm module in an
+            on-disk cache, so that only the first executor on a machine compiles it.
+        module_cache_dir (str | Path, optional): Directory of the compiled module cache.
+            Defaults to ``$WASMTIME_EXECUTOR_CACHE_DIR`` or ``~/.cache/wasmtime-executor``.
+        preinitialize (bool, optional): Whether to keep interpreters booted in the background,
+            with the authorized imports already imported, so that calls skip the CPython boot.
+            Each interpreter still runs a single call.
+        pool_size (int, optional): Number of booted interpreters kept ready in preinitialize mode.
+        pool_refill_workers (int, optional): Number of interpreters booting at the same time
+            while the pool refills.
+        session (bool, optional): Whether to run every call in one long-lived interpreter that
+            keeps its globals between calls, instead of a new interpreter per call.
+        session_fuel (int, optional): Fuel budget of a whole session. A session that runs out
+            of fuel is replaced by a new one on the next call, losing its globals.
+        interruption (str, optional): How calls are bounded. ``"fuel"`` meters every guest
+            instruction against ``fuel``, ``"epoch"`` turns fuel metering off and stops calls
+            after ``timeout`` seconds of wall-clock time, and ``"both"`` applies both bounds.
+        fuel (int, optional): Fuel budget of a single call when fuel is metered.
+        timeout (float, optional): Wall-clock seconds allowed per call when epochs bound calls.
+        output_capture (str, optional): Where fresh instances send their stdout and stderr.
+            ``"memory"`` captures them in bounded host buffers and ships variables through a
+            stdin pipe, without touching the filesystem. ``"file"`` uses a temporary directory
+            per call. ``"auto"`` picks ``"memory"`` when this wasmtime-py supports it.
+        on_output (Callable[[str, str], None], optional): Receives the stream name (``"stdout"``
+            or ``"stderr"``) and each piece of guest output while calls run. With file capture,
+            the output is only delivered once the call is done.
+        store_limits (StoreLimits, optional): Limits on the linear memory, tables and instances
+            of every guest store. Guests growing past them fail with a ``MemoryError``.
+        allocation_strategy (str, optional): ``"on-demand"`` maps fresh memory for every store.
+            ``"pooling"`` reserves ``pooling_slots`` instance slots up front and recycles them,
+            initializing memory with copy-on-write mappings.
+        pooling_slots (int, optional): Instance slots of the pooling allocator, which bounds
+            the number of guests alive at once across executors sharing the engine.
+        stdlib_bundle (str | Path, optional): Directory of a trimmed standard library built by
+            ``build_stdlib_bundle``, mounted in place of the full ``python311.zip``. Modules
+            left out of the bundle cannot be imported.
+        use_bytecode_cache (bool, optional): Whether the code wrapped around every call is
+            compiled once on the host, and guests share a writable cache of the bytecode of
+            the source modules they import. Guests using the cache must trust each other.
+        bytecode_cache_dir (str | Path, optional): Directory of the bytecode cache. Defaults to
+            ``pycache`` in the compiled module cache directory.
+        bytecode_cache_size (int, optional): Bytes the bytecode cache is trimmed back to after
+            every call, evicting the files used least recently.
+        profile (bool, optional): Whether to run guest code under ``cProfile`` and return the
+            statistics of its hottest functions in ``last_profile``.
+        profile_rows (int, optional): Functions kept in a guest profile.
+        engine_profiler (str, optional): Native profiler of the engine, ``"perfmap"``,
+            ``"jitdump"`` or ``"vtune"``, exposing the JIT-compiled python.wasm to ``perf``
+            or VTune.
+        compile_profile (str, optional): Named set of compilation settings, ``"default"``,
+            ``"fast-start"``, ``"max-throughput"`` or ``"small-code"``, trading the time spent
+            compiling python.wasm against the speed of the compiled code.
+        compile_settings (dict, optional): Compilation settings overriding those of the
+            profile, such as ``cranelift_opt_level`` or ``parallel_compilation``.
+        data_attachments (DataAttachments, optional): Attachments to mount in the guests,
+            shared with other executors. By default every executor has attachments of its
+            own, removed by ``cleanup``.
     """
 
+    # Settings applied to the engine ``Config``. Executors with equal settings share one
+    # engine and compiled module, and the settings are part of the module cache key.
+    engine_settings = {"consume_fuel": True, "epoch_interruption": True, "cache": True}
+
     def __init__(
         self,
         additional_authorized_imports: List[str],
         max_print_outputs_length: Optional[int] = None,
         additional_functions: Optional[dict] = None,
+        use_module_cache: bool = True,
+        module_cache_dir: Optional[Union[str, Path]] = None,
+        preinitialize: bool = False,
+        pool_size: int = 1,
+        pool_refill_workers: int = 1,
+        session: bool = False,
+        session_fuel: int = 100_000_000_000,
+        interruption: str = "fuel",
+        fuel: int = DEFAULT_FUEL,
+        timeout: float = DEFAULT_TIMEOUT,
+        output_capture: str = "auto",
+        on_output: Optional[OutputCallback] = None,
+        store_limits: Optional[StoreLimits] = None,
+        allocation_strategy: str = "on-demand",
+        pooling_slots: int = DEFAULT_POOLING_SLOTS,
+        stdlib_bundle: Optional[Union[str, Path]] = None,
+        use_bytecode_cache: bool = False,
+        bytecode_cache_dir: Optional[Union[str, Path]] = None,
+        bytecode_cache_size: int = DEFAULT_PYCACHE_SIZE,
+        profile: bool = False,
+        profile_rows: int = DEFAULT_PROFILE_ROWS,
+        engine_profiler: Optional[str] = None,
+        compile_profile: str = "default",
+        compile_settings: Optional[Dict[str, Any]] = None,
+        data_attachments: Optional[DataAttachments] = None,
     ):
+        if interruption not in INTERRUPTION_MODES:
+            raise ValueError(
+                f"Unknown interruption mode {interruption!r}, expected one of {INTERRUPTION_MODES}"
+            )
+        if output_capture not in OUTPUT_CAPTURE_MODES:
+            raise ValueError(
+                f"Unknown output capture {output_capture!r}, expected one of {OUTPUT_CAPTURE_MODES}"
+            )
+        if output_capture == "memory" and not supports_memory_streams():
+            raise ValueError("In-memory output capture needs wasmtime-py custom WASI outputs")
+        if output_capture == "auto":
+            output_capture = "memory" if supports_memory_streams() else "file"
+        if allocation_strategy not in ALLOCATION_STRATEGIES:
+            raise ValueError(
+                f"Unknown allocation strategy {allocation_strategy!r}, expected one of {ALLOCATION_STRATEGIES}"
+            )
+        if allocation_strategy == "pooling" and not supports_pooling_allocator():
+            raise ValueError("The pooling allocator needs the wasmtime-py low-level bindings")
+        if pooling_slots < 1:
+            raise ValueError("The pooling allocator needs at least one slot")
+        if engine_profiler is not None and engine_profiler not in ENGINE_PROFILERS:
+            raise ValueError(
+                f"Unknown engine profiler {engine_profiler!r}, expected one of {ENGINE_PROFILERS}"
+            )
+        self.output_capture = output_capture
+        self.on_output = on_output
+        self.interruption = interruption
+        # Without fuel metering the engine compiles code without fuel checks, which runs faster
+        metered = interruption in ("fuel", "both")
+        self.engine_settings = {**self.engine_settings, "consume_fuel": metered}
+        self.store_limits = store_limits or StoreLimits()
+        self.allocation_strategy = allocation_strategy
+        if allocation_strategy == "pooling":
+            # Slots are sized for the memory limit, so a tighter limit reserves less address space
+            self.engine_settings.update(
+                allocation_strategy="pooling",
+                pooling_slots=pooling_slots,
+                pooling_max_memory_size=self.store_limits.memory_size or MAX_MEMORY_SIZE,
+            )
+            if hasattr(Config, "memory_init_cow"):
+                self.engine_settings["memory_init_cow"] = True
+        if engine_profiler is not None:
+            self.engine_settings["profiler"] = engine_profiler
+        self.compile_profile = compile_profile
+        self.engine_settings.update(resolve_compile_settings(compile_profile, compile_settings))
+        self.profile = profile
+        self.profile_rows = profile_rows
+        self.fuel = fuel if metered else 0
+        self.timeout = timeout if interruption in ("epoch", "both") else None
+
         self.additional_authorized_imports = additional_authorized_imports
         self.max_print_outputs_length = max_print_outputs_length or 50_000
+        # Bytes of each guest stream kept while a call runs; the rest is dropped as it arrives
+        self.capture_limit = max(DEFAULT_CAPTURE_LIMIT, 4 * self.max_print_outputs_length)
         self.additional_functions = additional_functions or {}
+        self.module_cache = (
+            CompiledModuleCache(module_cache_dir) if use_module_cache else None
+        )
 
         # Path to the Python WASM binary
-        # Try to find WASM runtime in package first, then fall back to development path
-        package_wasm_dir = Path(__file__).parent / "wasm-runtime"
-        dev_wasm_dir = Path(__file__).parent.parent.parent / "wasm-runtime"
-
-        if package_wasm_dir.exists():
-            self.wasm_runtime_dir = package_wasm_dir
-        elif dev_wasm_dir.exists():
-            self.wasm_runtime_dir = dev_wasm_dir
-        else:
-            raise FileNotFoundError(
-                f"WASM runtime directory not found. Checked:\n"
-                f"  - Package path: {package_wasm_dir}\n"
-                f"  - Development path: {dev_wasm_dir}"
-            )
+        self.wasm_runtime_dir = find_wasm_runtime_dir()
 
         self.python_wasm_path = self.wasm_runtime_dir / "bin" / "python-3.11.1.wasm"
 
@@ -65,30 +284,81 @@ class WasmtimePythonExecutor:
                 f"Python WASM binary not found at {self.python_wasm_path}"
             )
 
+        # Trimmed standard library mounted over the full archive
+        self.stdlib_bundle = None
+        if stdlib_bundle is not None:
+            manifest = load_bundle_manifest(stdlib_bundle)
+            missing = set(additional_authorized_imports) - set(manifest["imports"])
+            if missing:
+                logger.warning(
+                    f"Stdlib bundle {stdlib_bundle} was not built for imports {sorted(missing)}"
+                )
+            # Bundles built before the profiler was part of every bundle lack it
+            if profile and missing_bundle_modules(stdlib_bundle, PROFILER_GUEST_MODULES):
+                raise ValueError(
+                    f"Stdlib bundle {stdlib_bundle} lacks the profiler modules "
+                    f"{PROFILER_GUEST_MODULES}, rebuild it to profile guests"
+                )
+            self.stdlib_bundle = Path(stdlib_bundle)
+
+        # Bytecode of guest modules, shared by the guests of every call
+        self.bytecode_cache = (
+            BytecodeCache(
+                bytecode_cache_dir,
+                bytecode_cache_size,
+                host_compiles_guest_bytecode(stdlib_archive_path(self.wasm_runtime_dir)),
+            )
+            if use_bytecode_cache
+            else None
+        )
+
+        # Files and buffers mounted read-only at /data in every guest
+        self._owns_attachments = data_attachments is None and supports_read_only_mounts()
+        self.data_attachments = (
+            DataAttachments() if self._owns_attachments else data_attachments
+        )
+
         # Initialize WASMTIME components
         self._initialize_wasm_environment()
 
+        # Resource usage and guest profile of the last finished call
+        self.last_metrics: Optional[ExecutionMetrics] = None
+        self.last_profile: Optional[GuestProfile] = None
+
         # State management for PythonExecutor compatibility
         self.custom_tools = {}
         self.static_tools = None
         self.state = {"__name__": "__main__"}
+        # Per-variable encodings, so unchanged variables are not pickled again
+        self._state_tracker = StateTracker()
+
+        # Interpreters booted ahead of the next calls in preinitialize mode
+        self.preinitialize = preinitialize
+        self.interpreter_pool: Optional[InterpreterPool] = None
+        if preinitialize and not session:
+            self.interpreter_pool = InterpreterPool(
+                self._boot_interpreter, size=pool_size, refill_workers=pool_refill_workers
+            )
+
+        # Long-lived interpreter in session mode, and the digests of the variables it holds
+        self.session = session
+        self.session_fuel = session_fuel if metered else 0
+        self._session: Optional[SessionInterpreter] = None
+        self._session_synced_variables: Dict[str, bytes] = {}
+        self._session_lock = threading.Lock()
+        if session:
+            self._session = self._start_session()
 
     def _initialize_wasm_environment(self):
         """Initialize the WASM execution environment with Python."""
         try:
-            # Create engine with fuel consumption for safety
-            engine_cfg = Config()
-            engine_cfg.consume_fuel = True
-            engine_cfg.cache = True
-
-            self.engine = Engine(engine_cfg)
-            self.linker = Linker(self.engine)
-            self.linker.define_wasi()
-
-            # Load the Python WASM module
-            self.python_module = Module.from_file(
-                self.engine, str(self.python_wasm_path)
+            # Borrow the engine, linker and compiled module shared by executors in this process
+            self.runtime = get_runtime(
+                self.python_wasm_path, self.engine_settings, self.module_cache
             )
+            self.engine = self.runtime.engine
+            self.linker = self.runtime.linker
+            self.python_module = self.runtime.module
 
             logger.info("Python WASM environment initialized successfully")
 
@@ -99,8 +369,30 @@ class WasmtimePythonExecutor:
         """Execute code and return the result."""
         return self._execute_python_code(code_action)
 
-    def _prepare_code_with_tools(self, code: str) -> str:
-        """Prepare code by injecting tools and variables."""
+    def _state_variables(self) -> dict:
+        """Return the state variables to send to the guest."""
+        return {
+            key: value
+            for key, value in self.state.items()
+            if key not in RESERVED_STATE_KEYS
+        }
+
+    def _encode_state(
+        self, synced: Optional[Dict[str, bytes]] = None
+    ) -> tuple[Optional[bytes], dict]:
+        """
+        Encode the state variables as a blob plus the variables left for source injection.
+
+        Variables are re-fingerprinted on every call, so values mutated in place are
+        noticed. With ``synced``, only the variables whose digest changed are encoded.
+        """
+        self._state_tracker.refresh(self._state_variables())
+        return self._state_tracker.encode(synced)
+
+    def _prepare_code_with_tools(
+        self, code: str, variables: Optional[dict] = None
+    ) -> str:
+        """Prepare code by injecting tools and variables (all of ``self.state`` by default)."""
         # Start with imports and basic setup
         prepared_code = []
 
@@ -120,34 +412,91 @@ class WasmtimePythonExecutor:
                 prepared_code.append(f"import {import_name}")
 
         # Add state variables
-        for key, value in self.state.items():
-            if key not in ["__name__", "_print_outputs", "_operations_count"]:
+        prepared_code.extend(
+            self._variable_assignments(self.state if variables is None else variables)
+        )
+
+        # The exception and tool definitions are the same on every call, so they are
+        # compiled once when the bytecode cache is enabled
+        definitions, names = self._tool_definitions()
+        prepared_code.append(
+            self._guest_module("_wasmtime_tools", definitions, exported=names)
+        )
+
+        # Add the actual user code
+        user_block = ["try:"]
+
+        # Indent the user code
+        for line in code.split("\n"):
+            user_block.append(f"    {line}")
+
+        # Report the outcome through the result channel rather than stdout
+        user_block.append("except FinalAnswerException as e:")
+        user_block.append("    __send_result__(('answer', e.value))")
+        user_block.append("    sys.exit(0)")
+        user_block.append("except Exception as e:")
+        user_block.append("    __send_result__(('error', type(e).__name__, str(e)))")
+        user_block.append("    sys.exit(1)")
+
+        if self.profile:
+            # Profile from the imports on, and send the statistics however the code ends
+            prepared_code.insert(0, GUEST_PROFILE_START_SOURCE)
+            stop = GUEST_PROFILE_STOP_SOURCE.format(rows=self.profile_rows)
+            user_block = (
+                ["try:"]
+                + [f"    {line}" for line in user_block]
+                + ["finally:"]
+                + [f"    {line}" for line in stop.splitlines()]
+            )
+
+        prepared_code.append("")
+        prepared_code.append("# User code starts here")
+        prepared_code.extend(user_block)
+
+        return "\n".join(prepared_code)
+
+    def _variable_assignments(self, variables: dict) -> List[str]:
+        """Return the source lines assigning ``variables`` in the guest."""
+        lines = []
+        for key, value in variables.items():
+            if key not in RESERVED_STATE_KEYS:
                 try:
                     # Try to serialize the value as JSON first
                     if isinstance(
                         value, (str, int, float, bool, list, dict, type(None))
                     ):
-                        prepared_code.append(f"{key} = {json.dumps(value)}")
+                        lines.append(f"{key} = {json.dumps(value)}")
                     else:
                         # For complex objects, convert to string representation
-                        prepared_code.append(f"{key} = {repr(value)}")
-                except (TypeError, ValueError):
+                        line = f"{key} = {repr(value)}"
+                        # Values like functions have no repr the guest can evaluate
+                        compile(line, "<variables>", "exec", dont_inherit=True)
+                        lines.append(line)
+                except (TypeError, ValueError, SyntaxError):
                     # Skip variables that can't be serialized
                     logger.warning(
                         f"Skipping variable {key} due to serialization issues"
                     )
                     continue
+        return lines
+
+    def _tool_definitions(self) -> tuple[str, List[str]]:
+        """Return the source defining FinalAnswerException and the tools, and the names it defines."""
+        # The user code reports its final answer by raising this exception
+        definitions = ["""
+class FinalAnswerException(Exception):
+    def __init__(self, value):
+        self.value = value
+"""]
+        names = ["FinalAnswerException"]
 
         # Add tools as functions
         if self.static_tools:
             for tool_name, tool_func in self.static_tools.items():
+                names.append(tool_name)
                 if tool_name == "final_answer":
                     # Special handling for final_answer
-                    prepared_code.append("""
-class FinalAnswerException(Exception):
-    def __init__(self, value):
-        self.value = value
-
+                    definitions.append("""
 def final_answer(*args, **kwargs):
     '''Final answer function that signals completion'''
     if args:
@@ -157,174 +506,744 @@ def final_answer(*args, **kwargs):
     raise FinalAnswerException(result)
 """)
                 else:
-                    # For other tools, create a placeholder function
-                    prepared_code.append(f"""
+                    # Other tools run on the host, called over the output channel
+                    definitions.append(f"""
 def {tool_name}(*args, **kwargs):
     '''Tool function: {tool_name}'''
-    print(f"Tool {tool_name} called with args={{args}}, kwargs={{kwargs}}")
-    return None
+    return __call_tool__({tool_name!r}, args, kwargs)
 """)
 
-        # Add the actual user code
-        prepared_code.append("")
-        prepared_code.append("# User code starts here")
-        prepared_code.append("try:")
+        return "\n".join(definitions), names
 
-        # Indent the user code
-        for line in code.split("\n"):
-            prepared_code.append(f"    {line}")
+    def _host_tools(self) -> Dict[str, Any]:
+        """Return the tools that run on the host, by name."""
+        return {
+            name: tool
+            for name, tool in (self.static_tools or {}).items()
+            if name != "final_answer"
+        }
 
-        prepared_code.append("except FinalAnswerException as e:")
-        prepared_code.append("    print(f'FINAL_ANSWER:{e.value}')")
-        prepared_code.append("    sys.exit(0)")
-        prepared_code.append("except Exception as e:")
-        prepared_code.append("    print(f'ERROR:{type(e).__name__}: {e}')")
-        prepared_code.append("    sys.exit(1)")
+    def _tool_bridge(self, metrics: ExecutionMetrics) -> Optional[ToolBridge]:
+        """Return the bridge running the host tools of one call, or None without tools."""
+        tools = self._host_tools()
+        return ToolBridge(tools, metrics) if tools else None
 
-        return "\n".join(prepared_code)
+    def _guest_module(
+        self, prefix: str, source: str, exported: Optional[List[str]] = None
+    ) -> str:
+        """
+        Return code running ``source`` in the guest as a module of its own.
 
-    def _execute_python_code(
-        self, code: str, fuel: int = 1_000_000_000
+        The names in ``exported`` are then bound in the guest's ``__main__``. With the
+        bytecode cache, ``source`` is published to it as bytecode compiled on the host and
+        imported; otherwise, or when the host cannot compile for the guest, it is compiled
+        inline.
+        """
+        module = None
+        if self.bytecode_cache is not None:
+            module = self.bytecode_cache.publish(prefix, source)
+        if module is None:
+            if exported is not None:
+                return source
+            return f"exec({source!r}, {{}})\n"
+        lines = [
+            "import sys as _sys",
+            f"if {GUEST_MODULES_DIR!r} not in _sys.path:",
+            f"    _sys.path.append({GUEST_MODULES_DIR!r})",
+            "del _sys",
+        ]
+        if exported:
+            lines.append(f"from {module} import {', '.join(exported)}")
+        else:
+            lines.append(f"__import__({module!r})")
+        return "\n".join(lines) + "\n"
+
+    def execute_many(
+        self, codes: Iterable[str], max_workers: Optional[int] = None
+    ) -> List[tuple[Any, str, bool]]:
+        """
+        Execute independent code snippets concurrently.
+
+        Every snippet runs in its own interpreter and ``Store`` over the shared engine
+        and module, even in session mode, so snippets never see each other's globals.
+        wasmtime releases the GIL while the guest runs, so throughput scales with cores.
+
+        Args:
+            codes (Iterable[str]): Code snippets to execute.
+            max_workers (int, optional): Number of snippets running at the same time.
+                Defaults to the number of CPUs.
+
+        Returns:
+            The (output, logs, is_final_answer) triple of every snippet, in order. A snippet
+            that fails reports the error in its own triple, like a failing call would.
+        """
+        codes = list(codes)
+        if not codes:
+            return []
+        workers = min(max_workers or os.cpu_count() or 1, len(codes))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="wasmtime-batch"
+        ) as batch:
+            return list(
+                batch.map(lambda code: self._execute_python_code(code, isolated=True), codes)
+            )
+
+    async def aexecute(
+        self, code: str, on_output: Optional[OutputCallback] = None
     ) -> tuple[Any, str, bool]:
-        """Execute Python code in the WASM environment."""
-        try:
-            # Prepare code with tools and variables
-            prepared_code = self._prepare_code_with_tools(code)
-
-            # Create WASI configuration
-            config = WasiConfig()
-            config.argv = ("python", "-c", prepared_code)
-
-            # Create temporary directory for output capture
-            with tempfile.TemporaryDirectory() as chroot:
-                out_log = os.path.join(chroot, "out.log")
-                err_log = os.path.join(chroot, "err.log")
-
-                config.stdout_file = out_log
-                config.stderr_file = err_log
-
-                # Mount the WASM runtime directory to provide Python libraries
-                config.preopen_dir(str(self.wasm_runtime_dir), "/")
-
-                # Set Python environment variables for library paths
-                python_lib_path = "/usr/local/lib/python311.zip"
-                config.env = [
-                    ("PYTHONPATH", python_lib_path),
-                    ("PYTHONHOME", "/usr/local"),
-                    ("PYTHONPLATLIBDIR", "lib"),
-                    ("PYTHONDONTWRITEBYTECODE", "1"),
-                ]
-
-                # Create store and set up execution environment
-                store = Store(self.engine)
-                # Set fuel limit for execution
-                if fuel > 0:
-                    store.set_fuel(fuel)
-                store.set_wasi(config)
+        """
+        Execute code on a worker thread without blocking the event loop.
 
-                # Instantiate the module
-                instance = self.linker.instantiate(store, self.python_module)
+        Cancelling the coroutine interrupts the running guest, which traps at its next
+        epoch check instead of running to completion. A cancelled session is replaced
+        on the next call and loses its globals.
 
-                # Get the _start function (WASI main function)
-                start = instance.exports(store)["_start"]
+        Args:
+            code (str): Code to execute.
+            on_output (Callable[[str, str], None], optional): Receives guest output while the
+                code runs, on the event loop thread. Defaults to the executor's ``on_output``.
 
-                # Execute the code
-                execution_successful = True
-                error_message = None
-                try:
-                    start(store)
-                except Exception as e:
-                    execution_successful = False
-                    error_message = str(e)
+        Returns:
+            The same (output, logs, is_final_answer) triple as calling the executor.
+        """
+        interrupt = Interrupt(self.engine, self.timeout)
+        loop = asyncio.get_running_loop()
+        on_output = on_output or self.on_output
+        if on_output is not None:
+            callback = on_output
 
-                # Read output and error logs
-                stdout_content = ""
-                stderr_content = ""
+            def on_output(stream: str, text: str) -> None:
+                loop.call_soon_threadsafe(callback, stream, text)
 
-                try:
-                    with open(out_log, "r") as f:
-                        stdout_content = f.read()
-                except FileNotFoundError:
-                    pass
+        execution = loop.run_in_executor(
+            None,
+            lambda: self._execute_python_code(
+                code, interrupt=interrupt, on_output=on_output
+            ),
+        )
+        try:
+            # Shielded so the worker thread is interrupted rather than abandoned
+            return await asyncio.shield(execution)
+        except asyncio.CancelledError:
+            interrupt.cancel()
+            raise
 
-                try:
-                    with open(err_log, "r") as f:
-                        stderr_content = f.read()
-                except FileNotFoundError:
-                    pass
-
-                # Parse output for final answer
-                is_final_answer = False
-                output = None
-
-                if stdout_content:
-                    lines = stdout_content.strip().split("\n")
-                    for line in lines:
-                        if line.startswith("FINAL_ANSWER:"):
-                            is_final_answer = True
-                            final_answer_str = line[
-                                13:
-                            ]  # Remove 'FINAL_ANSWER:' prefix
-
-                            # Try to parse the final answer more safely
-                            try:
-                                # First try to evaluate as a Python literal (for numbers, lists, etc.)
-                                output = ast.literal_eval(final_answer_str)
-                            except (ValueError, SyntaxError):
-                                # If that fails, try regular eval for simple expressions
-                                try:
-                                    output = eval(final_answer_str)
-                                except Exception:
-                                    # If all else fails, just use the string as-is
-                                    output = final_answer_str
-                            break
-                        elif line.startswith("ERROR:"):
-                            error_message = line[6:]  # Remove 'ERROR:' prefix
-                            execution_successful = False
-                            break
-
-                # Combine logs
-                logs = ""
-                if stdout_content:
-                    # Filter out our special markers from logs
-                    filtered_lines = []
-                    for line in stdout_content.split("\n"):
-                        if not line.startswith("FINAL_ANSWER:") and not line.startswith(
-                            "ERROR:"
-                        ):
-                            filtered_lines.append(line)
-                    if filtered_lines:
-                        logs += "\n".join(filtered_lines)
-
-                if stderr_content:
-                    if logs:
-                        logs += "\n"
-                    logs += f"STDERR: {stderr_content}"
-
-                # Determine output if not already set
-                if output is None:
-                    if not execution_successful:
-                        output = f"Execution error: {error_message}"
-                    elif logs.strip():
-                        # Try to extract the last meaningful output
-                        log_lines = logs.strip().split("\n")
-                        if log_lines and not log_lines[-1].startswith("STDERR:"):
-                            output = (
-                                log_lines[-1] if len(log_lines) == 1 else logs.strip()
-                            )
-
-                # Truncate logs if necessary
-                if len(logs) > self.max_print_outputs_length:
-                    logs = logs[: self.max_print_outputs_length] + "... (truncated)"
-
-                return output, logs, is_final_answer
+    def _execute_python_code(
+        self,
+        code: str,
+        fuel: Optional[int] = None,
+        isolated: bool = False,
+        interrupt: Optional[Interrupt] = None,
+        on_output: Optional[OutputCallback] = None,
+    ) -> tuple[Any, str, bool]:
+        """
+        Execute Python code in the WASM environment.
+
+        ``fuel`` overrides the fuel budget of the call when fuel is metered. With
+        ``isolated``, the code runs in a one-off interpreter even in session mode.
+        Cancelling ``interrupt`` stops the guest while it runs. ``on_output`` overrides
+        the executor's output callback.
+
+        The resource usage of the call is stored in ``last_metrics`` and added to the
+        process metrics. When guests are profiled, the profile is stored in ``last_profile``.
+        """
+        if fuel is None or not self.fuel:
+            fuel = self.fuel
+        if interrupt is None:
+            interrupt = Interrupt(self.engine, self.timeout)
+        on_output = on_output or self.on_output
+        if self.session and not isolated:
+            metrics = ExecutionMetrics("session")
+        else:
+            metrics = ExecutionMetrics("pooled" if self.preinitialize else "fresh")
+        started = time.perf_counter()
+        try:
+            if interrupt.timeout is None:
+                stdout_content, stderr_content, error_message, result = self._run_code(
+                    code, fuel, isolated, interrupt, on_output, metrics
+                )
+            else:
+                # Advance the epoch while the call runs, so its timeout is noticed
+                with self.runtime.epoch_ticker.running():
+                    stdout_content, stderr_content, error_message, result = (
+                        self._run_code(
+                            code, fuel, isolated, interrupt, on_output, metrics
+                        )
+                    )
+
+            # Report why an interrupted guest stopped instead of its trap backtrace
+            if error_message is not None and interrupt.cancelled:
+                error_message = interrupt.check()
+
+            return self._parse_execution_output(
+                stdout_content, stderr_content, error_message, result, metrics
+            )
 
         except Exception as e:
+            metrics.failed = True
             return (
                 f"WASM execution error: {e}",
                 f"Failed to execute code in WASM environment: {e}",
                 False,
             )
+        finally:
+            if self.bytecode_cache is not None:
+                # Any guest can write bytecode, so the cache is trimmed after every call
+                self.bytecode_cache.evict()
+            metrics.total_seconds = time.perf_counter() - started
+            self.last_metrics = metrics
+            self.last_profile = metrics.profile
+            get_process_metrics().record(metrics)
+
+    def _run_code(
+        self,
+        code: str,
+        fuel: int,
+        isolated: bool,
+        interrupt: Interrupt,
+        on_output: Optional[OutputCallback],
+        metrics: ExecutionMetrics,
+    ) -> tuple[str, str, Optional[str], Optional[bytes]]:
+        """Run code in the interpreter matching the execution mode; returns stdout, stderr, error and result."""
+        if self.session and not isolated:
+            return self._run_in_session(code, interrupt, on_output, metrics)
+
+        # Ship variables as a pickled blob, and only fall back to source for the rest
+        state_blob, source_variables = self._encode_state()
+
+        # Prepare code with tools and variables
+        prepared_code = self._prepare_code_with_tools(code, source_variables)
+
+        if self.preinitialize:
+            interpreter = self._checkout_interpreter(fuel)
+            return interpreter.run(
+                prepared_code,
+                state_blob,
+                interrupt,
+                on_output,
+                metrics,
+                self._tool_bridge(metrics),
+            )
+        return self._run_in_fresh_instance(
+            prepared_code, fuel, state_blob, interrupt, on_output, metrics
+        )
+
+    def _run_in_fresh_instance(
+        self,
+        prepared_code: str,
+        fuel: int,
+        state_blob: Optional[bytes] = None,
+        interrupt: Optional[Interrupt] = None,
+        on_output: Optional[OutputCallback] = None,
+        metrics: Optional[ExecutionMetrics] = None,
+    ) -> tuple[str, str, Optional[str], Optional[bytes]]:
+        """Boot a new interpreter with the prepared code and return its stdout, stderr, error and result."""
+        metrics = metrics or ExecutionMetrics()
+        if self.output_capture == "memory":
+            return self._run_with_memory_streams(
+                prepared_code, fuel, state_blob, interrupt, on_output, metrics
+            )
+        stdout_content, stderr_content, error_message, result = (
+            self._run_with_temp_files(prepared_code, fuel, state_blob, interrupt, metrics)
+        )
+        # Output files are only read once the guest is done
+        notify_output(on_output, "stdout", stdout_content)
+        notify_output(on_output, "stderr", stderr_content)
+        return stdout_content, stderr_content, error_message, result
+
+    def _run_with_memory_streams(
+        self,
+        prepared_code: str,
+        fuel: int,
+        state_blob: Optional[bytes],
+        interrupt: Optional[Interrupt],
+        on_output: Optional[OutputCallback],
+        metrics: ExecutionMetrics,
+    ) -> tuple[str, str, Optional[str], Optional[bytes]]:
+        """Run a fresh instance whose stdio lives in host memory and pipes only."""
+        config = WasiConfig()
+        # Tool calls are answered on stdin from the output callback, while the guest waits
+        tools = self._tool_bridge(metrics)
+        output = capture_output(
+            config,
+            self.capture_limit,
+            on_output,
+            (lambda call: feed.send(tools.reply(call))) if tools else None,
+        )
+
+        # Ship the pickled state through stdin, loaded before the prepared code
+        feed = feed_stdin(
+            config,
+            None if state_blob is None else encode_frame(b"s", state_blob),
+            keep_open=tools is not None,
+        )
+        if state_blob is not None:
+            prepared_code = STATE_STDIN_LOADER_SOURCE + prepared_code
+
+        # Output and the result record share the guest stdout as frames; they are
+        # sent line by line when a callback follows the output
+        prepared_code = (
+            FRESH_CHANNEL_PRELUDE.format(
+                channel=self._guest_module(
+                    "_wasmtime_channel",
+                    f"_live = {on_output is not None!r}\n" + GUEST_CHANNEL_SOURCE,
+                )
+            )
+            + prepared_code
+        )
+        abandoned = False
+        try:
+            error_message, abandoned = self._start_fresh_instance(
+                config,
+                prepared_code,
+                fuel,
+                interrupt,
+                metrics,
+                stop=feed.end if feed is not None else None,
+                release=feed.close if feed is not None else None,
+            )
+        finally:
+            if feed is not None and not abandoned:
+                feed.close()
+        output.close()
+        metrics.stdout_bytes = output.stdout.written
+        metrics.stderr_bytes = output.stderr.written
+        metrics.profile = parse_profile(output.profile)
+
+        return (
+            output.stdout.getvalue(),
+            output.stderr.getvalue(),
+            error_message,
+            output.result,
+        )
+
+    def _run_with_temp_files(
+        self,
+        prepared_code: str,
+        fuel: int,
+        state_blob: Optional[bytes],
+        interrupt: Optional[Interrupt],
+        metrics: ExecutionMetrics,
+    ) -> tuple[str, str, Optional[str], Optional[bytes]]:
+        """Run a fresh instance whose stdio, state and result go through a temporary directory."""
+        # Create WASI configuration
+        config = WasiConfig()
+
+        # Create temporary directory for output capture; an abandoned guest removes it on exit
+        chroot = tempfile.mkdtemp()
+        abandoned = False
+        try:
+            out_log = os.path.join(chroot, "out.log")
+            err_log = os.path.join(chroot, "err.log")
+
+            config.stdout_file = out_log
+            config.stderr_file = err_log
+
+            # The guest writes its result record to a file in the mounted state directory
+            state_dir = os.path.join(chroot, "state")
+            os.mkdir(state_dir)
+            config.preopen_dir(state_dir, GUEST_STATE_DIR)
+            prepared_code = (
+                self._guest_module("_wasmtime_result", RESULT_FILE_SENDER_SOURCE)
+                + prepared_code
+            )
+            if self.profile:
+                prepared_code = (
+                    self._guest_module("_wasmtime_profile", PROFILE_FILE_SENDER_SOURCE)
+                    + prepared_code
+                )
+            if self._host_tools():
+                prepared_code = (
+                    self._guest_module("_wasmtime_no_tools", GUEST_TOOLS_UNAVAILABLE_SOURCE)
+                    + prepared_code
+                )
+
+            # Ship the pickled state as a file the guest loads before the prepared code
+            if state_blob is not None:
+                with open(os.path.join(state_dir, "state.pkl"), "wb") as f:
+                    f.write(state_blob)
+                prepared_code = STATE_LOADER_SOURCE + prepared_code
+
+            error_message, abandoned = self._start_fresh_instance(
+                config,
+                prepared_code,
+                fuel,
+                interrupt,
+                metrics,
+                release=lambda: shutil.rmtree(chroot, ignore_errors=True),
+            )
+            metrics.stdout_bytes = _file_size(out_log)
+            metrics.stderr_bytes = _file_size(err_log)
+
+            # Read the head and tail of the output and error logs
+            stdout_content = read_output_file(out_log, self.capture_limit)
+            stderr_content = read_output_file(err_log, self.capture_limit)
+
+            result = _read_optional(os.path.join(state_dir, "result.bin"))
+            metrics.profile = parse_profile(
+                _read_optional(os.path.join(state_dir, "profile.bin"))
+            )
+
+            return stdout_content, stderr_content, error_message, result
+        finally:
+            if not abandoned:
+                shutil.rmtree(chroot, ignore_errors=True)
+
+    def _start_fresh_instance(
+        self,
+        config: WasiConfig,
+        prepared_code: str,
+        fuel: int,
+        interrupt: Optional[Interrupt],
+        metrics: Optional[ExecutionMetrics] = None,
+        stop: Optional[Callable[[], None]] = None,
+        release: Optional[Callable[[], None]] = None,
+    ) -> Tuple[Optional[str], bool]:
+        """
+        Run the prepared code in a new instance on a thread of its own.
+
+        Epoch interruption only traps a guest running code, not one blocked in a
+        host call such as sleeping. A guest still running once ``interrupt`` fires
+        is abandoned: ``stop`` is called to help it return, the call returns right
+        away, and ``release`` frees what the guest uses besides its store once it
+        exits. The caller frees them itself when the guest was not abandoned.
+
+        Returns the trap message, the interrupt's reason for an abandoned guest,
+        and whether the guest was abandoned.
+        """
+        metrics = metrics or ExecutionMetrics()
+        outcome: List[Any] = []
+        abandoned = False
+        lock = threading.Lock()
+
+        def run() -> None:
+            try:
+                outcome.append(
+                    self._run_instance(config, prepared_code, fuel, interrupt, metrics)
+                )
+            except Exception as e:
+                # Raised again by the calling thread
+                outcome.append(e)
+            finally:
+                with lock:
+                    if abandoned and release is not None:
+                        release()
+
+        thread = threading.Thread(target=run, name="wasmtime-guest", daemon=True)
+        thread.start()
+        while thread.is_alive():
+            thread.join(FRESH_INSTANCE_POLL_INTERVAL)
+            reason = interrupt.check() if interrupt is not None else None
+            if reason is None:
+                continue
+            # A guest running code traps at the next epoch tick
+            thread.join(FRESH_INSTANCE_STOP_GRACE)
+            with lock:
+                if thread.is_alive():
+                    abandoned = True
+            if abandoned:
+                logger.info(f"Abandoning a guest blocked past its deadline: {reason}")
+                # The guest traps as soon as it runs code again
+                self.engine.increment_epoch()
+                if stop is not None:
+                    stop()
+                return reason, True
+        if isinstance(outcome[0], Exception):
+            raise outcome[0]
+        return outcome[0], False
+
+    def _run_instance(
+        self,
+        config: WasiConfig,
+        prepared_code: str,
+        fuel: int,
+        interrupt: Optional[Interrupt],
+        metrics: ExecutionMetrics,
+    ) -> Optional[str]:
+        """
+        Instantiate python.wasm with ``config`` and run the prepared code; returns the trap message.
+
+        Timings, fuel consumed and peak memory are recorded in ``metrics``.
+        """
+        started = time.perf_counter()
+        config.argv = ("python", "-c", prepared_code)
+
+        # Mount the Python runtime and set its environment variables
+        configure_guest(
+            config,
+            self.wasm_runtime_dir,
+            self.stdlib_bundle,
+            self.bytecode_cache,
+            self._data_dir(),
+        )
+
+        # Create store and set up execution environment
+        store = Store(self.engine)
+        try:
+            # Set fuel limit for execution
+            if fuel > 0:
+                store.set_fuel(fuel)
+            self.store_limits.apply(store)
+            store.set_wasi(config)
+            # Let a cancellation trap the guest; the handle must outlive the call
+            watch = watch_store(
+                store, interrupt.check if interrupt is not None else lambda: None
+            )
+
+            # Instantiate the module
+            instantiating = time.perf_counter()
+            metrics.setup_seconds = instantiating - started
+            instance = self.linker.instantiate(store, self.python_module)
+
+            # Get the _start function (WASI main function)
+            exports = instance.exports(store)
+            start = exports["_start"]
+
+            # Execute the code
+            running = time.perf_counter()
+            metrics.instantiate_seconds = running - instantiating
+            try:
+                start(store)
+            except ExitTrap as e:
+                # sys.exit(0), as after a final answer, is a successful run
+                return str(e) if e.code else None
+            except Exception as e:
+                return str(e)
+            finally:
+                metrics.run_seconds = time.perf_counter() - running
+                # Linear memory never shrinks, so its final size is its peak
+                metrics.peak_memory_pages = exports["memory"].size(store)
+                if fuel > 0:
+                    metrics.fuel_consumed = fuel - store.get_fuel()
+            return None
+        finally:
+            # Release the guest file descriptors now rather than on garbage collection
+            store.close()
+
+    def _boot_interpreter(self, fuel: Optional[int] = None) -> GuestInterpreter:
+        """Start booting an interpreter that preloads the authorized imports."""
+        return GuestInterpreter(
+            self.runtime,
+            self.wasm_runtime_dir,
+            DEFAULT_PRELOAD_IMPORTS + list(self.additional_authorized_imports),
+            fuel=self.fuel if fuel is None else fuel,
+            output_limit=self.capture_limit,
+            store_limits=self.store_limits,
+            stdlib_dir=self.stdlib_bundle,
+            bytecode_cache=self.bytecode_cache,
+            data_dir=self._data_dir(),
+        )
+
+    def _checkout_interpreter(self, fuel: int) -> GuestInterpreter:
+        """Take a booted interpreter from the pool, or boot one with a non-default fuel budget."""
+        if self.interpreter_pool is None or fuel != self.fuel:
+            return self._boot_interpreter(fuel)
+        return self.interpreter_pool.acquire()
+
+    def pool_stats(self) -> Optional[dict]:
+        """Return the interpreter pool counters, or None when not in preinitialize mode."""
+        if self.interpreter_pool is None:
+            return None
+        return self.interpreter_pool.stats()
+
+    def _start_session(self) -> SessionInterpreter:
+        """Start booting a session interpreter; it has received none of the variables yet."""
+        self._session_synced_variables = {}
+        return SessionInterpreter(
+            self.runtime,
+            self.wasm_runtime_dir,
+            DEFAULT_PRELOAD_IMPORTS + list(self.additional_authorized_imports),
+            fuel=self.session_fuel,
+            output_limit=self.capture_limit,
+            store_limits=self.store_limits,
+            stdlib_dir=self.stdlib_bundle,
+            bytecode_cache=self.bytecode_cache,
+            data_dir=self._data_dir(),
+        )
+
+    def _run_in_session(
+        self,
+        code: str,
+        interrupt: Optional[Interrupt] = None,
+        on_output: Optional[OutputCallback] = None,
+        metrics: Optional[ExecutionMetrics] = None,
+    ) -> tuple[str, str, Optional[str], Optional[bytes]]:
+        """Run code in the session interpreter, sending only new or changed variables."""
+        with self._session_lock:
+            if self._session is None or not self._session.alive:
+                if self._session is not None:
+                    self._session.close()
+                self._session = self._start_session()
+
+            state_blob, source_variables = self._encode_state(
+                self._session_synced_variables
+            )
+            prepared_code = self._prepare_code_with_tools(code, source_variables)
+            return self._session.run(
+                prepared_code,
+                state_blob,
+                interrupt,
+                on_output,
+                metrics,
+                self._tool_bridge(metrics),
+            )
+
+    def export_session(self) -> Optional[bytes]:
+        """
+        Return a snapshot of the globals of the session interpreter, for ``import_session``.
+
+        Data is pickled inside the guest and modules are saved by name. Functions defined
+        in the session are saved as their code unless they are closures; classes, their
+        instances and other values the guest cannot pickle are dropped with a warning.
+        The snapshot is opaque to the host, which never unpickles it.
+
+        Returns None when no session interpreter is running.
+
+        Raises:
+            ValueError: If the executor is not in session mode.
+            RuntimeError: If the guest fails to export its globals.
+        """
+        if not self.session:
+            raise ValueError("Only session executors have globals to export")
+        with self._session_lock:
+            if self._session is None or not self._session.alive:
+                return None
+            _, names = self._tool_definitions()
+            _, stderr, error_message, result = self._session.run(
+                GUEST_GLOBALS_EXPORT_SOURCE.format(skip=set(names))
+            )
+        try:
+            snapshot, dropped = decode_result(result) if result is not None else (None, None)
+        except (TypeError, ValueError) as e:
+            raise RuntimeError(f"Malformed session snapshot: {e}")
+        if error_message is not None or not isinstance(snapshot, bytes):
+            raise RuntimeError(
+                f"Failed to export session globals: {error_message} {stderr}".strip()
+            )
+        if dropped:
+            logger.warning(f"Session globals that cannot be saved were dropped: {dropped}")
+        return snapshot
+
+    def import_session(self, snapshot: bytes) -> None:
+        """
+        Load a snapshot taken by ``export_session`` into the session interpreter.
+
+        The variables of ``state`` are sent first, so values the guest changed after
+        receiving them keep their guest version, as they would in the original session.
+
+        Raises:
+            ValueError: If the executor is not in session mode.
+            RuntimeError: If the guest fails to load the snapshot.
+        """
+        if not self.session:
+            raise ValueError("Only session executors can import globals")
+        with self._session_lock:
+            if self._session is None or not self._session.alive:
+                if self._session is not None:
+                    self._session.close()
+                self._session = self._start_session()
+            state_blob, source_variables = self._encode_state(
+                self._session_synced_variables
+            )
+            chunks = [
+                ("\n".join(self._variable_assignments(source_variables)), state_blob),
+                (
+                    GUEST_GLOBALS_IMPORT_SOURCE,
+                    pickle.dumps({"__globals_snapshot__": pickle.dumps(snapshot)}),
+                ),
+            ]
+            for source, state in chunks:
+                _, stderr, error_message, _ = self._session.run(source, state)
+                if error_message is not None:
+                    raise RuntimeError(
+                        f"Failed to import session globals: {error_message} {stderr}".strip()
+                    )
+                if stderr:
+                    logger.warning(stderr.strip())
+
+    def _parse_execution_output(
+        self,
+        stdout_content: str,
+        stderr_content: str,
+        error_message: Optional[str],
+        result: Optional[bytes] = None,
+        metrics: Optional[ExecutionMetrics] = None,
+    ) -> tuple[Any, str, bool]:
+        """
+        Turn the guest output and result record into the (output, logs, is_final_answer) triple.
+
+        Whether the call failed or gave a final answer is recorded in ``metrics``.
+        """
+        # The final answer or the raised error comes from the result record
+        try:
+            is_final_answer, output, raised = parse_result_record(result)
+        except ValueError as e:
+            is_final_answer, output, raised = False, None, str(e)
+        if raised is not None:
+            error_message = raised
+        execution_successful = error_message is None
+        if metrics is not None:
+            metrics.failed = not execution_successful
+            metrics.final_answer = is_final_answer
+
+        # Combine logs
+        logs = stdout_content or ""
+
+        if stderr_content:
+            if logs:
+                logs += "\n"
+            logs += f"STDERR: {stderr_content}"
+
+        # Determine output if no final answer was given
+        if not is_final_answer:
+            if not execution_successful:
+                output = f"Execution error: {error_message}"
+            elif logs.strip():
+                # Try to extract the last meaningful output
+                log_lines = logs.strip().split("\n")
+                if log_lines and not log_lines[-1].startswith("STDERR:"):
+                    output = log_lines[-1] if len(log_lines) == 1 else logs.strip()
+
+        # Truncate logs if necessary, keeping their beginning and their end
+        if len(logs) > self.max_print_outputs_length:
+            head = self.max_print_outputs_length // 2
+            tail = self.max_print_outputs_length - head
+            truncated = len(logs) - self.max_print_outputs_length
+            logs = (
+                logs[:head]
+                + f"\n... ({truncated} characters truncated) ...\n"
+                + logs[len(logs) - tail :]
+            )
+
+        return output, logs, is_final_answer
+
+    def attach_data(self, name: str, source: AttachmentSource) -> str:
+        """
+        Expose a host file, directory or buffer read-only to guest code as ``/data/<name>``.
+
+        Unlike variables, attachments are never encoded: guest code opens and reads them
+        as files. Running session and pooled interpreters see new attachments at once.
+
+        Returns:
+            str: Guest path of the attachment.
+
+        Raises:
+            RuntimeError: If this wasmtime-py cannot mount directories read-only.
+        """
+        if self.data_attachments is None:
+            raise RuntimeError("Data attachments need read-only mounts from wasmtime-py")
+        return self.data_attachments.add(name, source)
+
+    def detach_data(self, name: str) -> None:
+        """Remove the attachment ``name``."""
+        if self.data_attachments is not None:
+            self.data_attachments.remove(name)
+
+    def _data_dir(self) -> Optional[Path]:
+        """Return the host directory of the attachments, if guests mount one."""
+        if self.data_attachments is None or not self.data_attachments.directory.is_dir():
+            return None
+        return self.data_attachments.directory
 
     def send_variables(self, variables: dict):
         """Send variables to the execution environment."""
@@ -341,7 +1260,18 @@ def {tool_name}(*args, **kwargs):
     def cleanup(self):
         """Clean up resources used by the executor."""
         try:
-            # WASM resources are automatically cleaned up
+            # Stop background interpreters; other WASM resources are cleaned up automatically
+            pool, self.interpreter_pool = self.interpreter_pool, None
+            if pool is not None:
+                pool.close()
+            with self._session_lock:
+                session, self._session = self._session, None
+            if session is not None:
+                session.close()
+            if self._owns_attachments:
+                self.data_attachments.close()
+            if self.bytecode_cache is not None:
+                self.bytecode_cache.close()
             logger.info("Cleanup completed")
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
@@ -351,3 +1281,19 @@ def {tool_name}(*args, **kwargs):
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.cleanup()
+
+
+def _read_optional(path: str) -> Optional[bytes]:
+    """Return the content of ``path``, or None if the guest did not write it."""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
@@ -0,0 +1,655 @@
+"""
+Python interpreters booted ahead of the code they run.
+
+Booting CPython inside python.wasm and importing the authorized modules often
+costs more than the code an agent runs. The interpreters in this module start
+the guest on a background thread as soon as they are created, import the
+preloaded modules and then park on their stdin, which is a FIFO owned by the
+host.
+
+``SessionInterpreter`` runs any number of code chunks in one long-lived
+``__main__`` namespace, like a REPL. ``GuestInterpreter`` runs a single
+program, so executions stay as isolated as with a fresh instance per call.
+"""
+
+import os
+import select
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from wasmtime import Store, WasiConfig
+
+from .attachments import GUEST_DATA_DIR, mount_read_only, supports_read_only_mounts
+from .interrupt import Interrupt, watch_store
+from .limits import StoreLimits
+from .metrics import ExecutionMetrics
+from .profiling import parse_profile
+from .pycache import GUEST_MODULES_DIR, GUEST_PYCACHE_DIR, BytecodeCache
+from .result import RESULT_ENCODER_SOURCE
+from .runtime import WasmRuntime
+from .state import GUEST_STATE_DECODER_SOURCE
+from .streams import (
+    DEFAULT_CAPTURE_LIMIT,
+    FRAME_MARKER,
+    MAX_FRAME_SIZE,
+    FrameParser,
+    OutputBuffer,
+    OutputCallback,
+    read_output_file,
+    take_frame,
+)
+from .tools import ToolBridge
+
+
+# Environment of the guest interpreter, relative to the mounted WASM runtime directory
+GUEST_ENV = [
+    ("PYTHONPATH", "/usr/local/lib/python311.zip"),
+    ("PYTHONHOME", "/usr/local"),
+    ("PYTHONPLATLIBDIR", "lib"),
+    ("PYTHONDONTWRITEBYTECODE", "1"),
+]
+
+# Guest directory holding the standard library archive named in PYTHONPATH
+GUEST_STDLIB_DIR = "/usr/local/lib"
+
+# Modules imported by every prepared program
+DEFAULT_PRELOAD_IMPORTS = ["sys", "json", "math"]
+
+# Guest output travels as frames made of ``FRAME_MARKER``, a 1-byte tag, a 4-byte
+# big-endian length and the payload: b"o" carries stdout text, b"e" stderr text,
+# b"v" a result record (see ``result.py``), b"p" a profile record (see
+# ``profiling.py``) and b"t" a tool call, answered by a b"a" frame on stdin (see
+# ``tools.py``). Output is split into frames of at most ``MAX_FRAME_SIZE`` bytes,
+# so the host holds no more than that before it reaches the bounded output
+# buffers. Every frame is flushed whole, so bytes guest code writes to its stdout
+# file descriptor directly fall between frames and are read as stdout.
+# This source installs the writers and the tool caller on a guest, and hides
+# stdin from guest code; it expects ``_live``, true when output must be sent line
+# by line, in its namespace.
+GUEST_CHANNEL_SOURCE = (
+    """
+import builtins
+import io
+import sys
+
+_channel = sys.stdout.buffer
+_marker = """
+    + repr(FRAME_MARKER)
+    + """
+_max_frame = """
+    + str(MAX_FRAME_SIZE)
+    + """
+
+
+def _send(tag, payload):
+    _channel.write(_marker + tag + len(payload).to_bytes(4, "big") + payload)
+    _channel.flush()
+
+
+class _FrameWriter(io.TextIOBase):
+    def __init__(self, tag):
+        self._tag = tag
+        self._parts = []
+        self._size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= 65536 or (_live and "\\n" in text):
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self._parts:
+            data = "".join(self._parts).encode("utf-8", "backslashreplace")
+            for start in range(0, len(data), _max_frame):
+                _send(self._tag, data[start : start + _max_frame])
+            self._parts = []
+            self._size = 0
+"""
+    + RESULT_ENCODER_SOURCE
+    + """
+
+def _send_result(record):
+    _send(b"v", _encode_result(record))
+
+
+def _send_profile(record):
+    _send(b"p", _encode_result(record))
+
+
+def _call_tool(name, args, kwargs):
+    _send(b"t", _encode_result((name, args, kwargs)))
+    header = sys.__stdin__.buffer.read(5)
+    if header[:1] != b"a" or len(header) < 5:
+        raise RuntimeError(f"Tool {name} got no reply from the host")
+    import pickle
+    reply = pickle.loads(sys.__stdin__.buffer.read(int.from_bytes(header[1:], "big")))
+    if reply[0] == "error":
+        error = getattr(builtins, reply[1], None)
+        if not (isinstance(error, type) and issubclass(error, Exception)):
+            error = RuntimeError
+        raise error(reply[2])
+    return reply[1]
+
+
+builtins.__send_result__ = _send_result
+builtins.__send_profile__ = _send_profile
+builtins.__call_tool__ = _call_tool
+sys.stdout = _FrameWriter(b"o")
+sys.stderr = _FrameWriter(b"e")
+sys.stdin = io.StringIO()
+"""
+)
+
+# Program prefix sending the output of a fresh instance as frames on its stdout;
+# ``channel`` is code running GUEST_CHANNEL_SOURCE in a namespace of its own
+FRESH_CHANNEL_PRELUDE = """import atexit as _atexit
+{channel}
+
+
+def _flush_channel():
+    import sys
+    sys.stdout.flush()
+    sys.stderr.flush()
+    sys.__stdout__.flush()
+
+
+_atexit.register(_flush_channel)
+del _atexit, _flush_channel
+"""
+
+# Long-lived interpreters read frames from stdin too: b"s" carries a state blob
+# (see ``state.py``) to merge into the namespace and b"c" carries UTF-8 source to
+# run; b"l" is like b"c" but output is sent line by line while the chunk runs.
+# On stdout, b"r" is sent once the preloaded modules are imported, and b"d"
+# carries the exit status once a chunk is done.
+GUEST_SCRIPT = (
+    """
+import sys
+for _name in {preload!r}:
+    try:
+        __import__(_name)
+    except Exception:
+        pass
+
+import traceback
+
+_live = False
+"""
+    + GUEST_CHANNEL_SOURCE.replace("{", "{{").replace("}", "}}")
+    + """
+{state_decoder}
+_stdin = sys.__stdin__.buffer
+_globals = {{"__name__": "__main__", "__builtins__": builtins}}
+_send(b"r", b"")
+
+while True:
+    _header = _stdin.read(5)
+    if len(_header) < 5:
+        break
+    _payload = _stdin.read(int.from_bytes(_header[1:], "big"))
+    if _header[:1] == b"s":
+        _globals.update(_decode_state(_payload))
+        continue
+    _live = _header[:1] == b"l"
+    _source = _payload.decode()
+    _status = 0
+    try:
+        exec(compile(_source, "<string>", "exec"), _globals)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            _status = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            _status = 1
+    except BaseException:
+        traceback.print_exc()
+        _status = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    _send(b"d", str(_status).encode())
+"""
+)
+
+
+def configure_guest(
+    config: WasiConfig,
+    wasm_runtime_dir: Union[str, Path],
+    stdlib_dir: Optional[Union[str, Path]] = None,
+    bytecode_cache: Optional[BytecodeCache] = None,
+    data_dir: Optional[Union[str, Path]] = None,
+) -> None:
+    """
+    Mount the Python runtime and set the interpreter environment on ``config``.
+
+    The runtime, and ``stdlib_dir``, a stdlib bundle directory (see ``bundle.py``)
+    mounted over the runtime's own standard library directory, are read-only when
+    wasmtime-py supports it, so that no guest changes the code later guests run.
+    With ``bytecode_cache``, the guest keeps the bytecode of the modules it compiles
+    in its writable directory, and imports the published modules from a read-only
+    one. ``data_dir``, a directory of data attachments, is mounted read-only.
+    """
+    # Mount the WASM runtime directory to provide Python libraries
+    _mount_runtime(config, wasm_runtime_dir, "/")
+    if stdlib_dir is not None:
+        # The most specific mount wins, so the bundle shadows the full archive
+        _mount_runtime(config, stdlib_dir, GUEST_STDLIB_DIR)
+    # Set Python environment variables for library paths; each assignment adds to the last
+    if bytecode_cache is None:
+        config.env = GUEST_ENV
+    else:
+        config.preopen_dir(str(bytecode_cache.bytecode_directory), GUEST_PYCACHE_DIR)
+        mount_read_only(config, bytecode_cache.modules_directory, GUEST_MODULES_DIR)
+        config.env = bytecode_cache.guest_env(GUEST_ENV)
+    if data_dir is not None:
+        mount_read_only(config, data_dir, GUEST_DATA_DIR)
+
+
+def _mount_runtime(
+    config: WasiConfig, directory: Union[str, Path], guest_path: str
+) -> None:
+    """Mount runtime files read-only, or writable with a wasmtime-py that cannot."""
+    if supports_read_only_mounts():
+        mount_read_only(config, directory, guest_path)
+    else:
+        config.preopen_dir(str(directory), guest_path)
+
+
+class SessionInterpreter:
+    """
+    A long-lived python.wasm instance that runs code chunks in one persistent namespace.
+
+    The guest boots on a background thread as soon as the interpreter is created.
+    Globals defined by a chunk stay alive in the guest for the following chunks,
+    including values that cannot be turned back into source code.
+
+    Args:
+        runtime (WasmRuntime): Shared engine, linker and module to instantiate.
+        wasm_runtime_dir (str | Path): Directory mounted as the guest root.
+        preload_imports (List[str]): Modules imported while booting. Modules that
+            fail to import are skipped, so the code using them reports the error itself.
+        fuel (int): Fuel budget of the instance, covering boot and every chunk.
+            An interpreter that runs out of fuel traps and must be replaced.
+        output_limit (int): Bytes of stdout and of stderr kept per chunk.
+        store_limits (StoreLimits, optional): Limits on the memory, tables and instances
+            of the guest store.
+        stdlib_dir (str | Path, optional): Stdlib bundle mounted over the full archive.
+        bytecode_cache (BytecodeCache, optional): Cache keeping the bytecode the guest compiles.
+        data_dir (str | Path, optional): Directory of data attachments, mounted read-only.
+    """
+
+    # Frames of a chunk, and those announcing that the guest is ready or done
+    FRAME_TAGS = FrameParser.TAGS | {b"r", b"d"}
+
+    def __init__(
+        self,
+        runtime: WasmRuntime,
+        wasm_runtime_dir: Union[str, Path],
+        preload_imports: List[str],
+        fuel: int = 100_000_000_000,
+        output_limit: int = DEFAULT_CAPTURE_LIMIT,
+        store_limits: Optional[StoreLimits] = None,
+        stdlib_dir: Optional[Union[str, Path]] = None,
+        bytecode_cache: Optional[BytecodeCache] = None,
+        data_dir: Optional[Union[str, Path]] = None,
+    ):
+        self.fuel = fuel
+        self.output_limit = output_limit
+        self.ready = False
+        self._release_on_exit = False
+        self._release_lock = threading.RLock()
+        self._chroot = tempfile.mkdtemp(prefix="wasmtime-executor-")
+        self._err_log = os.path.join(self._chroot, "err.log")
+        self._error_message: Optional[str] = None
+        self._stdin_fd: Optional[int] = None
+        self._stdout_fd: Optional[int] = None
+        self._pending = bytearray()
+        self._interrupt: Optional[Interrupt] = None
+        # Setup and instantiation times, reported by the first chunk
+        self._boot_metrics: Optional[Tuple[float, float]] = None
+
+        started = time.perf_counter()
+        try:
+            # Opening the FIFOs read-write on the host keeps the guest from blocking when it
+            # opens the other ends, and lets the host signal EOF by closing its only writer.
+            stdin_path = os.path.join(self._chroot, "stdin")
+            stdout_path = os.path.join(self._chroot, "stdout")
+            os.mkfifo(stdin_path, 0o600)
+            os.mkfifo(stdout_path, 0o600)
+            self._stdin_fd = os.open(stdin_path, os.O_RDWR)
+            self._stdout_fd = os.open(stdout_path, os.O_RDWR | os.O_NONBLOCK)
+
+            config = WasiConfig()
+            config.argv = (
+                "python",
+                "-c",
+                GUEST_SCRIPT.format(
+                    preload=preload_imports, state_decoder=GUEST_STATE_DECODER_SOURCE
+                ),
+            )
+            config.stdin_file = stdin_path
+            config.stdout_file = stdout_path
+            config.stderr_file = self._err_log
+            configure_guest(config, wasm_runtime_dir, stdlib_dir, bytecode_cache, data_dir)
+
+            self._store = Store(runtime.engine)
+            if fuel > 0:
+                self._store.set_fuel(fuel)
+            if store_limits is not None:
+                store_limits.apply(self._store)
+            self._store.set_wasi(config)
+            self._watch = watch_store(self._store, self._check_interrupt)
+            instantiating = time.perf_counter()
+            instance = runtime.linker.instantiate(self._store, runtime.module)
+            self._start = instance.exports(self._store)["_start"]
+            self._boot_metrics = (
+                instantiating - started,
+                time.perf_counter() - instantiating,
+            )
+        except BaseException:
+            self._release()
+            raise
+
+        self._thread = threading.Thread(
+            target=self._boot, name="wasmtime-guest", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def alive(self) -> bool:
+        """Whether the guest is still running and has not been stopped."""
+        return self._thread.is_alive() and self._stdout_fd is not None
+
+    def _check_interrupt(self) -> Optional[str]:
+        interrupt = self._interrupt
+        return interrupt.check() if interrupt is not None else None
+
+    def _boot(self) -> None:
+        try:
+            self._start(self._store)
+        except Exception as e:
+            self._error_message = str(e)
+        finally:
+            if self._release_on_exit:
+                self._release()
+
+    def wait_ready(self) -> bool:
+        """Wait until the guest has booted and preloaded its imports; False if it died instead."""
+        while not self.ready:
+            frame = self._read_frame()
+            if frame is None:
+                return False
+            self._handle_frame(*frame, FrameParser(OutputBuffer(0), OutputBuffer(0)))
+        return True
+
+    def run(
+        self,
+        source: str,
+        state: Optional[bytes] = None,
+        interrupt: Optional[Interrupt] = None,
+        on_output: Optional[OutputCallback] = None,
+        metrics: Optional[ExecutionMetrics] = None,
+        tools: Optional[ToolBridge] = None,
+    ) -> Tuple[str, str, Optional[str], Optional[bytes]]:
+        """
+        Run ``source`` in the interpreter namespace and wait for it to finish.
+
+        ``state`` is a state blob whose variables are merged into the namespace first.
+        Cancelling ``interrupt`` traps the guest, which ends the interpreter.
+        ``on_output`` receives the chunk output line by line while it runs.
+        ``metrics`` receives the run time and output size of the chunk, and for the
+        first chunk the setup and instantiation times of the interpreter.
+        ``tools`` runs the host tools the chunk calls.
+
+        Returns the chunk stdout, the chunk stderr, an error message when the chunk
+        exited with a non-zero status or the guest died (None otherwise), and the
+        last record the chunk passed to ``__send_result__`` (None if there was none).
+        """
+        if self._stdin_fd is None:
+            raise RuntimeError("Guest interpreter has been closed")
+
+        metrics = metrics or ExecutionMetrics()
+        if self._boot_metrics is not None:
+            metrics.setup_seconds, metrics.instantiate_seconds = self._boot_metrics
+            self._boot_metrics = None
+
+        self._interrupt = interrupt
+        started = time.perf_counter()
+        try:
+            return self._run_chunk(source, state, on_output, metrics, tools)
+        finally:
+            self._interrupt = None
+            metrics.run_seconds = time.perf_counter() - started
+
+    def _run_chunk(
+        self,
+        source: str,
+        state: Optional[bytes],
+        on_output: Optional[OutputCallback],
+        metrics: ExecutionMetrics,
+        tools: Optional[ToolBridge] = None,
+    ) -> Tuple[str, str, Optional[str], Optional[bytes]]:
+        if state is not None:
+            self._write_stdin(b"s" + len(state).to_bytes(4, "big"))
+            self._write_stdin(state)
+        data = source.encode()
+        tag = b"c" if on_output is None else b"l"
+        self._write_stdin(tag + len(data).to_bytes(4, "big") + data)
+
+        output = FrameParser(
+            OutputBuffer(self.output_limit, "stdout", on_output),
+            OutputBuffer(self.output_limit, "stderr", on_output),
+            (lambda call: self._write_stdin(tools.reply(call))) if tools else None,
+        )
+        while True:
+            frame = self._read_frame()
+            if frame is None:
+                # The guest died or was stopped: report what it wrote before
+                stopped = self._stdout_fd is None
+                if not stopped:
+                    self._thread.join()
+                error_message = self._error_message or "Guest interpreter exited"
+                err_log = read_output_file(self._err_log, self.output_limit)
+                self.close(wait=not stopped)
+                metrics.stdout_bytes = output.stdout.written
+                metrics.stderr_bytes = output.stderr.written + len(err_log.encode())
+                metrics.profile = parse_profile(output.profile)
+                return (
+                    output.stdout.getvalue(),
+                    output.stderr.getvalue() + err_log,
+                    error_message,
+                    output.result,
+                )
+
+            status = self._handle_frame(*frame, output)
+            if status is not None:
+                metrics.stdout_bytes = output.stdout.written
+                metrics.stderr_bytes = output.stderr.written
+                metrics.profile = parse_profile(output.profile)
+                error_message = (
+                    f"Exited with i32 exit status {status}" if status else None
+                )
+                return (
+                    output.stdout.getvalue(),
+                    output.stderr.getvalue(),
+                    error_message,
+                    output.result,
+                )
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stop the guest and release its resources.
+
+        With ``wait=False`` the guest shuts its interpreter down in the background
+        and releases its resources once it has exited. A stopped guest is never
+        waited for, since it may be blocked in a host call for a long time.
+        """
+        # EOF on stdin makes the guest exit once it has booted
+        self._close_stdin()
+        if not wait or self._release_on_exit:
+            self._release_on_exit = True
+            if self._thread.is_alive():
+                return
+        self._thread.join()
+        self._release()
+
+    def _handle_frame(
+        self, tag: bytes, payload: bytes, output: FrameParser
+    ) -> Optional[int]:
+        """Record a frame; returns the exit status when it ends a chunk."""
+        if output.handle(tag, payload):
+            return None
+        if tag == b"r":
+            self.ready = True
+        elif tag == b"d":
+            return int(payload)
+        return None
+
+    def _stop(self, reason: str) -> None:
+        """
+        Give up on a guest past the deadline of its call, whatever it is waiting for.
+
+        Epoch interruption only traps a guest running code, not one blocked in a
+        host call such as reading its stdin or sleeping. Closing the pipes makes
+        the guest read EOF or fail its next write, and it is released once it exits.
+        """
+        self._error_message = reason
+        self._release_on_exit = True
+        self._release()
+
+    def _read_frame(self) -> Optional[Tuple[bytes, bytes]]:
+        while True:
+            frame = take_frame(self._pending, self.FRAME_TAGS)
+            if frame is not None:
+                return frame
+
+            reason = self._check_interrupt()
+            if reason is not None:
+                self._stop(reason)
+            if self._stdout_fd is None:
+                return None
+            readable, _, _ = select.select([self._stdout_fd], [], [], 0.1)
+            if not readable:
+                if not self.alive:
+                    return None
+                continue
+            try:
+                chunk = os.read(self._stdout_fd, 1 << 16)
+            except BlockingIOError:
+                continue
+            self._pending += chunk
+
+    def _write_stdin(self, data: bytes) -> None:
+        # The guest only drains the FIFO once it has booted, and a guest that died
+        # never will, so never block on a full pipe indefinitely.
+        if self._stdin_fd is None:
+            return
+        view = memoryview(data)
+        os.set_blocking(self._stdin_fd, False)
+        while view:
+            _, writable, _ = select.select([], [self._stdin_fd], [], 0.1)
+            if not writable:
+                reason = self._check_interrupt()
+                if reason is not None:
+                    self._stop(reason)
+                if not self.alive:
+                    return
+                continue
+            try:
+                written = os.write(self._stdin_fd, view)
+            except BlockingIOError:
+                continue
+            view = view[written:]
+
+    def _close_stdin(self) -> None:
+        with self._release_lock:
+            if self._stdin_fd is not None:
+                os.close(self._stdin_fd)
+                self._stdin_fd = None
+
+    def _release(self) -> None:
+        with self._release_lock:
+            self._close_stdin()
+            if self._stdout_fd is not None:
+                os.close(self._stdout_fd)
+                self._stdout_fd = None
+            shutil.rmtree(self._chroot, ignore_errors=True)
+
+
+class GuestInterpreter(SessionInterpreter):
+    """
+    A python.wasm instance that boots in the background and runs exactly one program.
+
+    Args:
+        runtime (WasmRuntime): Shared engine, linker and module to instantiate.
+        wasm_runtime_dir (str | Path): Directory mounted as the guest root.
+        preload_imports (List[str]): Modules imported while booting.
+        fuel (int): Fuel budget of the instance, covering boot and the program.
+        output_limit (int): Bytes of stdout and of stderr kept.
+        store_limits (StoreLimits, optional): Limits on the memory, tables and instances
+            of the guest store.
+        stdlib_dir (str | Path, optional): Stdlib bundle mounted over the full archive.
+        bytecode_cache (BytecodeCache, optional): Cache keeping the bytecode the guest compiles.
+        data_dir (str | Path, optional): Directory of data attachments, mounted read-only.
+    """
+
+    def __init__(
+        self,
+        runtime: WasmRuntime,
+        wasm_runtime_dir: Union[str, Path],
+        preload_imports: List[str],
+        fuel: int = 1_000_000_000,
+        output_limit: int = DEFAULT_CAPTURE_LIMIT,
+        store_limits: Optional[StoreLimits] = None,
+        stdlib_dir: Optional[Union[str, Path]] = None,
+        bytecode_cache: Optional[BytecodeCache] = None,
+        data_dir: Optional[Union[str, Path]] = None,
+    ):
+        super().__init__(
+            runtime,
+            wasm_runtime_dir,
+            preload_imports,
+            fuel,
+            output_limit,
+            store_limits,
+            stdlib_dir,
+            bytecode_cache,
+            data_dir,
+        )
+
+    def run(
+        self,
+        program: str,
+        state: Optional[bytes] = None,
+        interrupt: Optional[Interrupt] = None,
+        on_output: Optional[OutputCallback] = None,
+        metrics: Optional[ExecutionMetrics] = None,
+        tools: Optional[ToolBridge] = None,
+    ) -> Tuple[str, str, Optional[str], Optional[bytes]]:
+        """
+        Run ``program`` as the guest's ``__main__``, then stop the guest.
+
+        ``state`` is a state blob whose variables are defined before the program runs.
+        Cancelling ``interrupt`` traps the guest. ``on_output`` receives the program
+        output line by line while it runs. ``metrics`` receives its resource usage.
+        ``tools`` runs the host tools the program calls.
+
+        Returns the program stdout, the program stderr, an error message when the
+        program exited with a non-zero status or trapped (None otherwise), and its
+        result record.
+        """
+        if self._stdin_fd is None:
+            raise RuntimeError("Guest interpreter has already been used")
+        try:
+            return super().run(program, state, interrupt, on_output, metrics, tools)
+        finally:
+            # Interpreter finalization is not part of the call
+            self.close(wait=False)
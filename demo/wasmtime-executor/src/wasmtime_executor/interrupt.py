@@ -0,0 +1,174 @@
+"""
+Interruption of running guests through wasmtime epochs.
+
+With ``epoch_interruption`` enabled, compiled code checks the engine epoch at
+function entries and loop headers. Every store watched by this module gets an
+epoch deadline callback that decides, whenever the epoch moves past the store's
+deadline, whether the guest keeps running or traps. Cancelling an execution
+bumps the engine epoch, so every running guest consults its callback promptly
+and only the cancelled one traps. Wall-clock timeouts rely on an ``EpochTicker``
+that advances the epoch at a fixed interval while timed executions run, which
+costs far less than metering every instruction with fuel.
+
+The deadline callback is only reachable through the low-level bindings of
+wasmtime-py. When they are missing, stores get a deadline far in the future, and
+guests run to completion despite cancellations and timeouts.
+"""
+
+import ctypes
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from wasmtime import Engine, Store
+
+try:
+    from wasmtime import _bindings as _ffi
+
+    _EPOCH_CALLBACK_TYPE = _ffi._wasmtime_store_epoch_deadline_callback.argtypes[1]
+    _NO_FINALIZER = ctypes.cast(
+        0, _ffi._wasmtime_store_epoch_deadline_callback.argtypes[3]
+    )
+except (ImportError, AttributeError, IndexError):  # pragma: no cover - depends on wasmtime
+    _ffi = None
+
+
+logger = logging.getLogger(__name__)
+
+# Deadline of stores that cannot be interrupted
+_FAR_DEADLINE = 1 << 62
+
+# Value of ``wasmtime_update_deadline_kind_t`` that keeps running synchronously
+_UPDATE_DEADLINE_CONTINUE = 0
+
+# Interval between two epoch ticks, which bounds how late a timeout is noticed
+DEFAULT_TICK_INTERVAL = 0.01
+
+
+class Interrupt:
+    """
+    A request to stop one execution, shared between the caller and the guest.
+
+    Args:
+        engine (Engine): Engine of the stores running the execution.
+        timeout (float, optional): Wall-clock seconds after which the execution stops,
+            counted from now. Only enforced while the engine's ``EpochTicker`` runs.
+    """
+
+    def __init__(self, engine: Engine, timeout: Optional[float] = None):
+        self._engine = engine
+        self._reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self.timeout = timeout
+        self._deadline = time.monotonic() + timeout if timeout is not None else None
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the execution has been asked to stop."""
+        return self._reason is not None
+
+    def cancel(self, reason: str = "Execution cancelled") -> None:
+        """Ask the execution to stop; the guest traps with ``reason`` at its next epoch check."""
+        with self._lock:
+            if self._reason is not None:
+                return
+            self._reason = reason
+        self._engine.increment_epoch()
+
+    def check(self) -> Optional[str]:
+        """Return why the execution must stop, or None to keep running."""
+        if self._reason is None and self._deadline is not None:
+            if time.monotonic() >= self._deadline:
+                self._reason = f"Execution timed out after {self.timeout} seconds"
+        return self._reason
+
+
+class EpochTicker:
+    """
+    A background thread advancing the epoch of an engine while timed executions run.
+
+    One ticker serves every execution on its engine. The thread only runs while at
+    least one execution is inside ``running()``, so an idle process never wakes up.
+
+    Args:
+        engine (Engine): Engine whose epoch is advanced.
+        interval (float): Seconds between two ticks.
+    """
+
+    def __init__(self, engine: Engine, interval: float = DEFAULT_TICK_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self._users = 0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+
+    @contextmanager
+    def running(self) -> Iterator[None]:
+        """Keep the ticker running for the duration of the block."""
+        with self._lock:
+            self._users += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._tick, name="wasmtime-epoch-ticker", daemon=True
+                )
+                self._thread.start()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._users -= 1
+                self._wakeup.notify_all()
+
+    @property
+    def active(self) -> bool:
+        """Whether the ticker thread is running."""
+        with self._lock:
+            return self._thread is not None
+
+    def _tick(self) -> None:
+        with self._lock:
+            while self._users > 0:
+                self._wakeup.wait(self.interval)
+                if self._users > 0:
+                    self.engine.increment_epoch()
+            self._thread = None
+
+
+def supports_interruption() -> bool:
+    """Whether running guests can be interrupted with this wasmtime-py."""
+    return _ffi is not None
+
+
+def watch_store(store: Store, check: Callable[[], Optional[str]]) -> Any:
+    """
+    Make ``store`` trap as soon as ``check`` returns a reason.
+
+    The engine must have ``epoch_interruption`` enabled. ``check`` runs on the
+    thread executing the guest every time the engine epoch advances, and should
+    be cheap. The caller must keep the returned handle alive as long as the store.
+    """
+    if _ffi is None:
+        store.set_epoch_deadline(_FAR_DEADLINE)
+        return None
+
+    def on_deadline(context, data, delta, kind) -> int:
+        try:
+            reason = check()
+        except Exception as e:
+            reason = f"Interruption check failed: {e}"
+        if reason is not None:
+            error = _ffi.wasmtime_error_new(reason.encode("utf-8"))
+            return ctypes.cast(error, ctypes.c_void_p).value or 0
+        delta[0] = 1
+        kind[0] = _UPDATE_DEADLINE_CONTINUE
+        return 0
+
+    callback = _EPOCH_CALLBACK_TYPE(on_deadline)
+    _ffi.wasmtime_store_epoch_deadline_callback(store.ptr(), callback, None, _NO_FINALIZER)
+    # A deadline at the current epoch makes the guest consult ``check`` once it
+    # starts, so a cancellation that lands before the store runs is not missed.
+    store.set_epoch_deadline(0)
+    return callback
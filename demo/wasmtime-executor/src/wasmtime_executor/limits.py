@@ -0,0 +1,132 @@
+"""
+Resource limits of guest stores and the pooling instance allocator.
+
+By default every ``Store`` may grow its linear memory up to the 4 GiB of wasm32,
+and instances are allocated on demand, with fresh memory mappings per call.
+``StoreLimits`` caps what one store may allocate, so a greedy snippet fails with
+a ``MemoryError`` inside the guest instead of ballooning host memory.
+
+The pooling allocator reserves a fixed number of instance slots when the engine
+is created and recycles them between stores, initializing linear memory from
+the module image with copy-on-write mappings. Memory use per worker becomes
+predictable, and short-lived stores skip most of the mapping work. It is only
+reachable through the low-level bindings of wasmtime-py.
+"""
+
+from typing import Any, Dict, Optional
+
+from wasmtime import Config, Store
+
+try:
+    from wasmtime import _bindings as _ffi
+
+    _ffi.wasmtime_pooling_allocation_strategy_set
+except (ImportError, AttributeError):  # pragma: no cover - depends on wasmtime
+    _ffi = None
+
+
+# How instances are allocated: fresh mappings per store, or slots reserved up front
+ALLOCATION_STRATEGIES = ("on-demand", "pooling")
+
+# Instance slots reserved by the pooling allocator, which bounds the concurrent stores
+DEFAULT_POOLING_SLOTS = 64
+
+# Largest linear memory of a wasm32 instance
+MAX_MEMORY_SIZE = 1 << 32
+
+
+class StoreLimits:
+    """
+    Limits applied to every guest store; None leaves a resource unlimited.
+
+    Args:
+        memory_size (int, optional): Bytes each linear memory may grow to. Growing past it
+            fails, which the guest reports as a ``MemoryError``.
+        table_elements (int, optional): Elements each table may grow to.
+        instances (int, optional): Instances a store may hold.
+        tables (int, optional): Tables a store may hold.
+        memories (int, optional): Linear memories a store may hold.
+    """
+
+    def __init__(
+        self,
+        memory_size: Optional[int] = None,
+        table_elements: Optional[int] = None,
+        instances: Optional[int] = None,
+        tables: Optional[int] = None,
+        memories: Optional[int] = None,
+    ):
+        for name, value in (
+            ("memory_size", memory_size),
+            ("table_elements", table_elements),
+            ("instances", instances),
+            ("tables", tables),
+            ("memories", memories),
+        ):
+            if value is not None and value < 0:
+                raise ValueError(f"Store limit {name} must not be negative")
+        self.memory_size = memory_size
+        self.table_elements = table_elements
+        self.instances = instances
+        self.tables = tables
+        self.memories = memories
+
+    def as_dict(self) -> Dict[str, Optional[int]]:
+        """Return the limits as a dict."""
+        return {
+            "memory_size": self.memory_size,
+            "table_elements": self.table_elements,
+            "instances": self.instances,
+            "tables": self.tables,
+            "memories": self.memories,
+        }
+
+    def apply(self, store: Store) -> None:
+        """Set the limits on ``store``; wasmtime-py takes -1 for no limit."""
+        store.set_limits(
+            **{name: -1 if value is None else value for name, value in self.as_dict().items()}
+        )
+
+    def __repr__(self) -> str:
+        limits = ", ".join(
+            f"{name}={value}" for name, value in self.as_dict().items() if value is not None
+        )
+        return f"StoreLimits({limits})"
+
+
+def supports_pooling_allocator() -> bool:
+    """Whether the pooling allocator can be enabled with this wasmtime-py."""
+    return _ffi is not None
+
+
+def configure_pooling_allocator(
+    config: Config, slots: int, max_memory_size: int = MAX_MEMORY_SIZE
+) -> None:
+    """
+    Make engines created from ``config`` allocate instances from a pool of ``slots``.
+
+    Each slot holds one instance, one linear memory of at most ``max_memory_size``
+    bytes and one table, so at most ``slots`` stores can be alive at once; further
+    instantiations fail until a store is closed.
+    """
+    if _ffi is None:
+        raise RuntimeError("The pooling allocator needs the wasmtime-py low-level bindings")
+    pooling = _ffi.wasmtime_pooling_allocation_config_new()
+    try:
+        _ffi.wasmtime_pooling_allocation_config_total_core_instances_set(pooling, slots)
+        _ffi.wasmtime_pooling_allocation_config_total_memories_set(pooling, slots)
+        _ffi.wasmtime_pooling_allocation_config_total_tables_set(pooling, slots)
+        _ffi.wasmtime_pooling_allocation_config_max_memory_size_set(
+            pooling, max_memory_size
+        )
+        _ffi.wasmtime_pooling_allocation_strategy_set(config.ptr(), pooling)
+    finally:
+        _ffi.wasmtime_pooling_allocation_config_delete(pooling)
+
+
+def apply_allocation_settings(config: Config, settings: Dict[str, Any]) -> None:
+    """Configure the allocator described by the ``allocation_strategy`` engine settings."""
+    if settings.get("allocation_strategy", "on-demand") == "pooling":
+        configure_pooling_allocator(
+            config, settings["pooling_slots"], settings["pooling_max_memory_size"]
+        )
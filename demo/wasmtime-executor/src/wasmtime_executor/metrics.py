@@ -0,0 +1,162 @@
+"""
+Resource metrics of executions, per call and aggregated over the process.
+
+Every call of an executor fills an ``ExecutionMetrics`` with the time spent
+setting up and instantiating its guest, running the code, the fuel and linear
+memory it used, and the size of its output. Each finished call is also added to
+a process-wide ``MetricsRegistry``, which can be read as a dict or rendered in
+the Prometheus text format for scraping.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from .profiling import GuestProfile
+
+
+class ExecutionMetrics:
+    """
+    Resource usage of one execution.
+
+    Durations are in seconds. Setup covers building the WASI configuration and the
+    ``Store``, and instantiation covers linking the module into it; both are zero
+    when the call reused a running interpreter. For pooled interpreters, they were
+    spent ahead of the call while booting. Fuel consumed and peak memory are only
+    known when the guest is not running anymore once the call returns, that is for
+    fresh instances, and are None otherwise or when fuel is not metered. Tool
+    calls count the host tools the guest called, and tool time is spent running
+    them on the host. ``profile`` holds the guest profile when the executor
+    profiles its guests.
+
+    Args:
+        mode (str): How the call ran: ``"fresh"``, ``"pooled"`` or ``"session"``.
+    """
+
+    FIELDS = (
+        "setup_seconds",
+        "instantiate_seconds",
+        "run_seconds",
+        "total_seconds",
+        "fuel_consumed",
+        "peak_memory_pages",
+        "stdout_bytes",
+        "stderr_bytes",
+        "tool_calls",
+        "tool_seconds",
+    )
+
+    def __init__(self, mode: str = "fresh"):
+        self.mode = mode
+        self.setup_seconds = 0.0
+        self.instantiate_seconds = 0.0
+        self.run_seconds = 0.0
+        self.total_seconds = 0.0
+        self.fuel_consumed: Optional[int] = None
+        self.peak_memory_pages: Optional[int] = None
+        self.stdout_bytes = 0
+        self.stderr_bytes = 0
+        self.tool_calls = 0
+        self.tool_seconds = 0.0
+        self.profile: Optional[GuestProfile] = None
+        self.failed = False
+        self.final_answer = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the metrics as a dict."""
+        metrics = {"mode": self.mode}
+        metrics.update((field, getattr(self, field)) for field in self.FIELDS)
+        metrics["failed"] = self.failed
+        metrics["final_answer"] = self.final_answer
+        return metrics
+
+    def __repr__(self) -> str:
+        return f"ExecutionMetrics({self.as_dict()})"
+
+
+class MetricsRegistry:
+    """
+    Thread-safe totals and maxima of the metrics of finished executions.
+
+    For every metric, the registry keeps the sum and the maximum over the calls
+    that reported it, next to call, failure and final answer counts per mode.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every recorded execution."""
+        with self._lock:
+            self._calls: Dict[str, int] = {}
+            self._failures: Dict[str, int] = {}
+            self._final_answers: Dict[str, int] = {}
+            self._sums: Dict[str, float] = {}
+            self._maxima: Dict[str, float] = {}
+            self._reported: Dict[str, int] = {}
+
+    def record(self, metrics: ExecutionMetrics) -> None:
+        """Add a finished execution to the totals."""
+        with self._lock:
+            mode = metrics.mode
+            self._calls[mode] = self._calls.get(mode, 0) + 1
+            if metrics.failed:
+                self._failures[mode] = self._failures.get(mode, 0) + 1
+            if metrics.final_answer:
+                self._final_answers[mode] = self._final_answers.get(mode, 0) + 1
+            for field in ExecutionMetrics.FIELDS:
+                value = getattr(metrics, field)
+                if value is None:
+                    continue
+                self._sums[field] = self._sums.get(field, 0) + value
+                self._maxima[field] = max(self._maxima.get(field, value), value)
+                self._reported[field] = self._reported.get(field, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the aggregate as a dict.
+
+        ``calls``, ``failures`` and ``final_answers`` map execution modes to counts.
+        ``metrics`` maps every metric to its ``sum``, ``max`` and the ``count`` of
+        calls that reported it.
+        """
+        with self._lock:
+            return {
+                "calls": dict(self._calls),
+                "failures": dict(self._failures),
+                "final_answers": dict(self._final_answers),
+                "metrics": {
+                    field: {
+                        "count": self._reported[field],
+                        "sum": self._sums[field],
+                        "max": self._maxima[field],
+                    }
+                    for field in ExecutionMetrics.FIELDS
+                    if field in self._reported
+                },
+            }
+
+    def render(self, prefix: str = "wasmtime_executor") -> str:
+        """Render the aggregate in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name in ("calls", "failures", "final_answers"):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for mode, count in sorted(snapshot[name].items()):
+                lines.append(f'{prefix}_{name}_total{{mode="{mode}"}} {count}')
+        for field, values in snapshot["metrics"].items():
+            lines.append(f"# TYPE {prefix}_{field} summary")
+            lines.append(f"{prefix}_{field}_sum {values['sum']}")
+            lines.append(f"{prefix}_{field}_count {values['count']}")
+            lines.append(f"# TYPE {prefix}_{field}_max gauge")
+            lines.append(f"{prefix}_{field}_max {values['max']}")
+        return "\n".join(lines) + "\n"
+
+
+# Aggregate of every execution in this process
+_process_metrics = MetricsRegistry()
+
+
+def get_process_metrics() -> MetricsRegistry:
+    """Return the registry aggregating the executions of every executor in this process."""
+    return _process_metrics
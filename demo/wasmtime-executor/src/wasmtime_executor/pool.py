@@ -0,0 +1,134 @@
+"""
+Pool of interpreters booted ahead of time.
+
+Building a ``WasiConfig`` and a ``Store``, instantiating the module and booting
+CPython all happen off the critical path: background workers keep a number of
+booted interpreters ready, executions check one out and discard it after use,
+and the pool immediately starts booting a replacement.
+"""
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict
+
+from .interpreter import GuestInterpreter
+
+
+logger = logging.getLogger(__name__)
+
+
+class InterpreterPool:
+    """
+    A pool of booted interpreters refilled by background workers.
+
+    Args:
+        factory (Callable[[], GuestInterpreter]): Creates a new interpreter.
+        size (int): Number of booted interpreters to keep ready.
+        refill_workers (int): Number of interpreters booting at the same time.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], GuestInterpreter],
+        size: int = 1,
+        refill_workers: int = 1,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        if refill_workers < 1:
+            raise ValueError("Pool needs at least one refill worker")
+
+        self.size = size
+        self.refill_workers = refill_workers
+        self._factory = factory
+        self._ready: Deque[GuestInterpreter] = deque()
+        self._booting = 0
+        self._hits = 0
+        self._misses = 0
+        self._refill_errors = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._refills = ThreadPoolExecutor(
+            max_workers=refill_workers, thread_name_prefix="wasmtime-pool"
+        )
+
+        with self._lock:
+            self._schedule_refills()
+
+    def acquire(self) -> GuestInterpreter:
+        """
+        Check out a booted interpreter, or create one on the spot if none is ready.
+
+        The caller owns the returned interpreter and must run or close it.
+        """
+        interpreter = None
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Interpreter pool has been closed")
+            while self._ready and interpreter is None:
+                candidate = self._ready.popleft()
+                if candidate.alive:
+                    interpreter = candidate
+                else:
+                    candidate.close()
+            if interpreter is not None:
+                self._hits += 1
+            else:
+                self._misses += 1
+            self._schedule_refills()
+
+        if interpreter is None:
+            interpreter = self._factory()
+        return interpreter
+
+    def stats(self) -> Dict[str, int]:
+        """Return the pool configuration, its current occupancy and its hit/miss counters."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "refill_workers": self.refill_workers,
+                "ready": len(self._ready),
+                "booting": self._booting,
+                "hits": self._hits,
+                "misses": self._misses,
+                "refill_errors": self._refill_errors,
+            }
+
+    def close(self) -> None:
+        """Stop refilling and shut down every ready interpreter."""
+        with self._lock:
+            self._closed = True
+            ready, self._ready = list(self._ready), deque()
+        self._refills.shutdown(wait=True, cancel_futures=True)
+        for interpreter in ready:
+            interpreter.close()
+
+    def _schedule_refills(self) -> None:
+        # Called with the lock held
+        while not self._closed and len(self._ready) + self._booting < self.size:
+            self._booting += 1
+            self._refills.submit(self._refill)
+
+    def _refill(self) -> None:
+        interpreter = None
+        try:
+            interpreter = self._factory()
+            if not interpreter.wait_ready():
+                raise RuntimeError("Interpreter died while booting")
+        except Exception as e:
+            logger.warning(f"Failed to boot a pooled interpreter: {e}")
+            if interpreter is not None:
+                interpreter.close()
+            with self._lock:
+                self._booting -= 1
+                self._refill_errors += 1
+            return
+
+        with self._lock:
+            self._booting -= 1
+            if not self._closed:
+                self._ready.append(interpreter)
+                return
+        interpreter.close()
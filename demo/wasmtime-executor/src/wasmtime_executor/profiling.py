@@ -0,0 +1,148 @@
+"""
+Profiling of guest executions.
+
+Two profilers answer different questions. The engine profiler of wasmtime
+(``perfmap``, ``jitdump`` or ``vtune``) makes the JIT-compiled python.wasm code
+visible to ``perf`` and VTune, which shows where the interpreter itself spends
+native time. The guest profiler runs the prepared program under ``cProfile``
+inside the sandbox and sends the aggregated statistics of the Python functions
+back to the host, next to the result record, so hot spots in imports and user
+code show up without leaving the sandbox.
+
+Statistics travel as a record of the result encoding: the number of profiled
+functions, their total own time, and one row per function sorted by cumulative
+time, cut after a fixed number of rows.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from .result import RESULT_ENCODER_SOURCE, decode_result
+from .state import GUEST_STATE_DIR
+
+
+logger = logging.getLogger(__name__)
+
+# Native profilers wasmtime can enable on an engine
+ENGINE_PROFILERS = ("perfmap", "jitdump", "vtune")
+
+# Functions kept in a guest profile, by decreasing cumulative time
+DEFAULT_PROFILE_ROWS = 50
+
+# Path of the profile record inside the guest when it is returned as a file
+GUEST_PROFILE_FILE = f"{GUEST_STATE_DIR}/profile.bin"
+
+# Program prefix starting the guest profiler, before the imports of the prepared program
+GUEST_PROFILE_START_SOURCE = """import cProfile as _cProfile
+_profiler = _cProfile.Profile()
+_profiler.enable()
+del _cProfile
+"""
+
+# Block stopping the guest profiler and sending its statistics to the host;
+# it runs in the ``finally`` clause around the user code
+GUEST_PROFILE_STOP_SOURCE = """_profiler.disable()
+import pstats as _pstats
+_rows = sorted(
+    (
+        (_key[0], _key[1], _key[2], _value[1], _value[0], _value[2], _value[3])
+        for _key, _value in _pstats.Stats(_profiler).stats.items()
+    ),
+    key=lambda _row: -_row[6],
+)
+__send_profile__((len(_rows), sum(_row[5] for _row in _rows), _rows[:{rows}]))
+del _profiler, _pstats, _rows
+"""
+
+# Program prefix making ``__send_profile__`` write the profile record to GUEST_PROFILE_FILE
+PROFILE_FILE_SENDER_SOURCE = f"""def _install_profile_sender():
+    import builtins
+    namespace = {{}}
+    exec({RESULT_ENCODER_SOURCE!r}, namespace)
+
+    def send_profile(record):
+        with open({GUEST_PROFILE_FILE!r}, "wb") as f:
+            f.write(namespace["_encode_result"](record))
+
+    builtins.__send_profile__ = send_profile
+
+
+_install_profile_sender()
+del _install_profile_sender
+"""
+
+# Columns of a profile row, as sent by the guest
+PROFILE_COLUMNS = (
+    "file",
+    "line",
+    "function",
+    "calls",
+    "primitive_calls",
+    "own_seconds",
+    "cumulative_seconds",
+)
+
+
+class GuestProfile:
+    """
+    Aggregated ``cProfile`` statistics of one guest execution.
+
+    Times are measured by the guest clock, so they include the slowdown of running
+    under wasm and fuel metering, but compare well with each other.
+
+    Args:
+        functions (int): Number of functions the profiler saw.
+        total_seconds (float): Own time of all those functions.
+        rows (List[Dict[str, Any]]): The functions with the highest cumulative time,
+            with the keys of ``PROFILE_COLUMNS``.
+    """
+
+    def __init__(self, functions: int, total_seconds: float, rows: List[Dict[str, Any]]):
+        self.functions = functions
+        self.total_seconds = total_seconds
+        self.rows = rows
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the profile as a dict."""
+        return {
+            "functions": self.functions,
+            "total_seconds": self.total_seconds,
+            "rows": [dict(row) for row in self.rows],
+        }
+
+    def format(self, limit: Optional[int] = None) -> str:
+        """Render the rows as a table in the layout of ``pstats``."""
+        lines = [
+            f"{self.functions} functions in {self.total_seconds:.3f} seconds",
+            "",
+            "   ncalls  tottime  cumtime filename:lineno(function)",
+        ]
+        for row in self.rows[:limit]:
+            calls = str(row["calls"])
+            if row["primitive_calls"] != row["calls"]:
+                calls = f"{row['calls']}/{row['primitive_calls']}"
+            lines.append(
+                f"{calls:>9} {row['own_seconds']:>8.3f} {row['cumulative_seconds']:>8.3f}"
+                f" {row['file']}:{row['line']}({row['function']})"
+            )
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return f"GuestProfile(functions={self.functions}, total_seconds={self.total_seconds})"
+
+
+def parse_profile(data: Optional[bytes]) -> Optional[GuestProfile]:
+    """Decode a profile record sent by the guest; None when there is none or it is malformed."""
+    if data is None:
+        return None
+    try:
+        functions, total_seconds, rows = decode_result(data)
+        profile = GuestProfile(
+            int(functions),
+            float(total_seconds),
+            [dict(zip(PROFILE_COLUMNS, row, strict=True)) for row in rows],
+        )
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Discarding malformed guest profile: {e}")
+        return None
+    return profile
@@ -0,0 +1,245 @@
+"""
+Persistent bytecode cache shared by guest interpreters.
+
+The guest runs with bytecode writing disabled, so every module it compiles from
+source is compiled again on every call. A ``BytecodeCache`` is a host directory
+mounted writable into every guest, which points ``PYTHONPYCACHEPREFIX`` at it:
+CPython then keeps the bytecode of the source modules it imports there, and
+later guests load it instead of compiling. Since any guest can write to it, the
+directory only ever holds bytecode compiled by guests, and it is trimmed back to
+its size limit after every call.
+
+The executor also publishes the code it wraps around every action as modules
+named after a digest of their source. They are compiled on the host, which needs
+the CPython version of the guest, and written as bytecode-only modules into a
+private directory that guests mount read-only. Every publication checks the
+module file against the digest of what was written, and writes it again if it
+changed, so the wrapper code a call runs is always the executor's own.
+"""
+
+import hashlib
+import importlib.util
+import logging
+import marshal
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .attachments import supports_read_only_mounts
+from .cache import default_cache_dir
+
+
+logger = logging.getLogger(__name__)
+
+# Guest path of the writable bytecode directory
+GUEST_PYCACHE_DIR = "/__pycache__"
+
+# Guest path of the read-only directory holding the published modules
+GUEST_MODULES_DIR = "/__modules__"
+
+# Subdirectory of the cache holding the bytecode written by guests
+BYTECODE_DIR = "bytecode"
+
+# Default size limit of the cache, in bytes
+DEFAULT_PYCACHE_SIZE = 64 << 20
+
+# Bytes every file and directory is charged at least, so that many small entries
+# count against the size limit too
+MIN_ENTRY_SIZE = 4096
+
+
+def host_compiles_guest_bytecode(stdlib_archive: Union[str, Path]) -> bool:
+    """Whether the host writes the same bytecode as the guest's standard library archive."""
+    try:
+        with zipfile.ZipFile(stdlib_archive) as archive:
+            for name in archive.namelist():
+                if name.endswith(".pyc"):
+                    with archive.open(name) as f:
+                        return f.read(4) == importlib.util.MAGIC_NUMBER
+    except (OSError, zipfile.BadZipFile) as e:
+        logger.warning(f"Cannot read the guest bytecode version from {stdlib_archive}: {e}")
+    return False
+
+
+class BytecodeCache:
+    """
+    A size-bounded directory of guest bytecode, and the modules published to guests.
+
+    Args:
+        directory (str | Path, optional): Host directory of the cache. Defaults to
+            ``pycache`` in the compiled module cache directory.
+        max_bytes (int): Size the bytecode written by guests is trimmed back to.
+        compile_modules (bool): Whether the host compiles bytecode for the guest, as
+            checked by ``host_compiles_guest_bytecode``. Otherwise nothing is published.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        max_bytes: int = DEFAULT_PYCACHE_SIZE,
+        compile_modules: bool = True,
+    ):
+        if max_bytes < 0:
+            raise ValueError("Bytecode cache size must not be negative")
+        if not supports_read_only_mounts():
+            raise RuntimeError("The bytecode cache needs read-only mounts from wasmtime-py")
+        self.directory = Path(directory) if directory else default_cache_dir() / "pycache"
+        self.max_bytes = max_bytes
+        self.compile_modules = compile_modules
+        self.bytecode_directory = self.directory / BYTECODE_DIR
+        self.bytecode_directory.mkdir(parents=True, exist_ok=True)
+        # Published modules stay out of the shared directory, which guests can write to
+        self.modules_directory = Path(tempfile.mkdtemp(prefix="wasmtime-modules-"))
+        self._remove_modules = weakref.finalize(
+            self, shutil.rmtree, str(self.modules_directory), True
+        )
+        # Digest of every published module file, by module name
+        self._published: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._evicting = threading.Lock()
+
+    def guest_env(self, env: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Return ``env`` with bytecode writing enabled and redirected to the cache."""
+        return [
+            (name, value) for name, value in env if name != "PYTHONDONTWRITEBYTECODE"
+        ] + [("PYTHONPYCACHEPREFIX", GUEST_PYCACHE_DIR)]
+
+    def publish(self, prefix: str, source: str) -> Optional[str]:
+        """
+        Make ``source`` importable by the guest from ``GUEST_MODULES_DIR`` and return its name.
+
+        The name is ``prefix`` followed by a digest of ``source``. The module is a
+        bytecode file without source, written again whenever it no longer matches
+        what was published. Returns None when the host cannot compile for the guest.
+        """
+        if not self.compile_modules:
+            return None
+        digest = hashlib.blake2b(source.encode(), digest_size=12).hexdigest()
+        module = f"{prefix}_{digest}"
+        path = self.modules_directory / f"{module}.pyc"
+        with self._lock:
+            published = self._published.get(module)
+            if published is None or _file_digest(path) != published:
+                if published is not None:
+                    logger.warning(f"Published module {module} changed, writing it again")
+                data = _compile_module(source, f"{GUEST_MODULES_DIR}/{module}.py")
+                _write_atomic(path, data)
+                self._published[module] = _digest(data)
+        return module
+
+    def size(self) -> int:
+        """Return the number of bytes charged for the bytecode written by guests."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """
+        Delete the least recently used bytecode until the cache fits its size limit.
+
+        The executor calls this after every call. Guests whose bytecode was deleted
+        compile the module again, so nothing is spared. Returns the number of bytes freed.
+        """
+        if not self._evicting.acquire(blocking=False):
+            # Another call is trimming the cache already
+            return 0
+        try:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return 0
+            freed = 0
+            for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+                if total - freed <= self.max_bytes:
+                    break
+                try:
+                    if path.is_dir() and not path.is_symlink():
+                        path.rmdir()
+                    else:
+                        path.unlink()
+                except OSError:
+                    continue
+                freed += size
+            freed += self._remove_empty_directories()
+        finally:
+            self._evicting.release()
+        logger.info(f"Evicted {freed} bytes from the bytecode cache {self.directory}")
+        return freed
+
+    def clear(self) -> None:
+        """Delete the bytecode written by guests and the published modules."""
+        shutil.rmtree(self.bytecode_directory, ignore_errors=True)
+        self.bytecode_directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            for path in self.modules_directory.iterdir():
+                path.unlink(missing_ok=True)
+            self._published.clear()
+
+    def close(self) -> None:
+        """Delete the published modules; the shared bytecode directory is kept."""
+        self._remove_modules()
+
+    def _entries(self) -> List[Tuple[Path, int, float]]:
+        """Return the path, charged size and last use of every entry of the bytecode directory."""
+        entries = []
+        for root, directories, names in os.walk(self.bytecode_directory):
+            for name in directories + names:
+                path = Path(root) / name
+                try:
+                    stat = path.lstat()
+                except OSError:
+                    continue
+                entries.append(
+                    (
+                        path,
+                        max(stat.st_size, MIN_ENTRY_SIZE),
+                        max(stat.st_atime, stat.st_mtime),
+                    )
+                )
+        return entries
+
+    def _remove_empty_directories(self) -> int:
+        """Delete the directories left empty by eviction; returns the bytes charged for them."""
+        freed = 0
+        for root, directories, _ in os.walk(self.bytecode_directory, topdown=False):
+            for name in directories:
+                try:
+                    os.rmdir(os.path.join(root, name))
+                except OSError:
+                    continue
+                freed += MIN_ENTRY_SIZE
+        return freed
+
+
+def _compile_module(source: str, filename: str) -> bytes:
+    """Return the content of a bytecode file the guest imports in place of ``source``."""
+    code = compile(source, filename, "exec", dont_inherit=True, optimize=0)
+    # Modules without source are loaded without checking the rest of the header
+    return importlib.util.MAGIC_NUMBER + bytes(12) + marshal.dumps(code)
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _file_digest(path: Path) -> Optional[bytes]:
+    try:
+        return _digest(path.read_bytes())
+    except OSError:
+        return None
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write ``data`` to ``path`` so that readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
@@ -0,0 +1,198 @@
+"""
+Typed result channel from the guest to the host.
+
+Final answers and errors leave the guest as a dedicated record instead of a
+printed line, so the host never scans stdout for them nor evaluates guest text.
+Records use a small length-prefixed encoding covering the builtin data types;
+decoding it only ever builds those types, unlike ``eval`` or ``pickle``. Other
+objects travel as their ``str``.
+
+Encoding, one tag byte per value:
+
+- ``N``, ``T``, ``F``: None, True and False.
+- ``i``: int as a 4-byte length and signed big-endian bytes.
+- ``f``: float as an 8-byte IEEE 754 double; ``c``: complex as two of them.
+- ``s``, ``b``, ``r``: str, bytes and the ``str`` of any other object, as a 4-byte
+  length and the UTF-8 or raw bytes.
+- ``l``, ``t``, ``S``, ``Z``, ``d``: list, tuple, set, frozenset and dict, as a
+  4-byte item count followed by the items, or the keys and values of a dict.
+"""
+
+import struct
+from typing import Any, Optional, Tuple
+
+from .state import GUEST_STATE_DIR
+
+
+# Guest source defining ``_encode_result``, the encoder matching ``decode_result``
+RESULT_ENCODER_SOURCE = '''
+def _encode_result(value):
+    import struct
+
+    out = bytearray()
+    active = set()
+    containers = {list: b"l", tuple: b"t", set: b"S", frozenset: b"Z", dict: b"d"}
+
+    def put_sized(tag, data):
+        out.extend(tag)
+        out.extend(len(data).to_bytes(4, "big"))
+        out.extend(data)
+
+    def put(item):
+        kind = type(item)
+        if item is None:
+            out.extend(b"N")
+        elif kind is bool:
+            out.extend(b"T" if item else b"F")
+        elif kind is int:
+            put_sized(b"i", item.to_bytes(item.bit_length() // 8 + 1, "big", signed=True))
+        elif kind is float:
+            out.extend(b"f" + struct.pack(">d", item))
+        elif kind is complex:
+            out.extend(b"c" + struct.pack(">dd", item.real, item.imag))
+        elif kind is str:
+            put_sized(b"s", item.encode("utf-8", "surrogatepass"))
+        elif kind is bytes or kind is bytearray:
+            put_sized(b"b", bytes(item))
+        elif kind in containers:
+            if id(item) in active:
+                raise ValueError("recursive container")
+            active.add(id(item))
+            out.extend(containers[kind])
+            out.extend(len(item).to_bytes(4, "big"))
+            for element in item.items() if kind is dict else item:
+                if kind is dict:
+                    put(element[0])
+                    put(element[1])
+                else:
+                    put(element)
+            active.discard(id(item))
+        else:
+            put_sized(b"r", str(item).encode("utf-8", "surrogatepass"))
+
+    try:
+        put(value)
+    except (ValueError, RecursionError):
+        out = bytearray()
+        put_sized(b"r", str(value).encode("utf-8", "surrogatepass"))
+    return bytes(out)
+'''
+
+# Path of the result record inside the guest when it is returned as a file
+GUEST_RESULT_FILE = f"{GUEST_STATE_DIR}/result.bin"
+
+# Program prefix making ``__send_result__`` write the result record to GUEST_RESULT_FILE
+RESULT_FILE_SENDER_SOURCE = f"""def _install_result_sender():
+    import builtins
+    namespace = {{}}
+    exec({RESULT_ENCODER_SOURCE!r}, namespace)
+
+    def send_result(record):
+        with open({GUEST_RESULT_FILE!r}, "wb") as f:
+            f.write(namespace["_encode_result"](record))
+
+    builtins.__send_result__ = send_result
+
+
+_install_result_sender()
+del _install_result_sender
+"""
+
+# Deepest nesting accepted by the decoder
+MAX_RESULT_DEPTH = 200
+
+_DOUBLE = struct.Struct(">d")
+_COMPLEX = struct.Struct(">dd")
+
+
+def decode_result(data: bytes) -> Any:
+    """
+    Decode a value produced by the guest ``_encode_result``.
+
+    Raises ``ValueError`` if ``data`` is not a single well-formed value.
+    """
+    try:
+        value, offset = _decode(memoryview(data), 0, 0)
+    except (IndexError, struct.error, TypeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Malformed guest result: {e}") from e
+    if offset != len(data):
+        raise ValueError("Malformed guest result: trailing bytes")
+    return value
+
+
+def _read_size(data: memoryview, offset: int) -> Tuple[int, int]:
+    if offset + 4 > len(data):
+        raise ValueError("Malformed guest result: truncated length")
+    return int.from_bytes(data[offset : offset + 4], "big"), offset + 4
+
+
+def _read_sized(data: memoryview, offset: int) -> Tuple[bytes, int]:
+    size, offset = _read_size(data, offset)
+    if offset + size > len(data):
+        raise ValueError("Malformed guest result: truncated value")
+    return bytes(data[offset : offset + size]), offset + size
+
+
+def _decode(data: memoryview, offset: int, depth: int) -> Tuple[Any, int]:
+    if depth > MAX_RESULT_DEPTH:
+        raise ValueError("Malformed guest result: nested too deeply")
+    tag = bytes(data[offset : offset + 1])
+    if not tag:
+        raise ValueError("Malformed guest result: truncated value")
+    offset += 1
+
+    if tag == b"N":
+        return None, offset
+    if tag == b"T":
+        return True, offset
+    if tag == b"F":
+        return False, offset
+    if tag == b"i":
+        raw, offset = _read_sized(data, offset)
+        return int.from_bytes(raw, "big", signed=True), offset
+    if tag == b"f":
+        return _DOUBLE.unpack_from(data, offset)[0], offset + _DOUBLE.size
+    if tag == b"c":
+        real, imag = _COMPLEX.unpack_from(data, offset)
+        return complex(real, imag), offset + _COMPLEX.size
+    if tag in (b"s", b"r"):
+        raw, offset = _read_sized(data, offset)
+        return raw.decode("utf-8", "surrogatepass"), offset
+    if tag == b"b":
+        return _read_sized(data, offset)
+
+    count, offset = _read_size(data, offset)
+    # Every item takes at least one byte, which bounds the work of a forged count
+    if count > len(data) - offset:
+        raise ValueError("Malformed guest result: item count exceeds data")
+    if tag == b"d":
+        items = {}
+        for _ in range(count):
+            key, offset = _decode(data, offset, depth + 1)
+            items[key], offset = _decode(data, offset, depth + 1)
+        return items, offset
+    if tag in (b"l", b"t", b"S", b"Z"):
+        elements = []
+        for _ in range(count):
+            element, offset = _decode(data, offset, depth + 1)
+            elements.append(element)
+        container = {b"l": list, b"t": tuple, b"S": set, b"Z": frozenset}[tag]
+        return (elements if tag == b"l" else container(elements)), offset
+    raise ValueError(f"Malformed guest result: unknown tag {tag!r}")
+
+
+def parse_result_record(data: Optional[bytes]) -> Tuple[bool, Any, Optional[str]]:
+    """
+    Interpret a result record sent by the prepared code.
+
+    Returns whether a final answer was given, the answer, and the error message
+    of an exception the code raised (None when there was none).
+    """
+    if data is None:
+        return False, None, None
+    record = decode_result(data)
+    if isinstance(record, tuple) and len(record) == 2 and record[0] == "answer":
+        return True, record[1], None
+    if isinstance(record, tuple) and len(record) == 3 and record[0] == "error":
+        return False, None, f"{record[1]}: {record[2]}"
+    raise ValueError("Malformed guest result: unknown record")
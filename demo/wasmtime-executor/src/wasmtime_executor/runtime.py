@@ -0,0 +1,131 @@
+"""
+Process-wide registry of wasmtime engines and compiled modules.
+
+An ``Engine``, its ``Linker`` and the compiled python.wasm ``Module`` are
+immutable once built and safe to share between threads, so every executor in a
+process borrows them from this registry instead of building its own copies.
+Only ``Store`` objects, which hold guest state, are created per execution.
+Each runtime also owns the epoch ticker that enforces timeouts on its engine.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from wasmtime import Config, Engine, Linker, Module
+
+from .cache import CompiledModuleCache
+from .interrupt import EpochTicker
+from .limits import apply_allocation_settings
+
+
+logger = logging.getLogger(__name__)
+
+# Engine settings describing the instance allocator rather than ``Config`` attributes
+ALLOCATION_SETTINGS = ("allocation_strategy", "pooling_slots", "pooling_max_memory_size")
+
+_runtimes: Dict[Tuple[str, str], "WasmRuntime"] = {}
+_runtimes_lock = threading.Lock()
+
+
+def find_wasm_runtime_dir() -> Path:
+    """
+    Return the directory holding python.wasm and its standard library.
+
+    The directory shipped in the package is preferred over the development checkout.
+    """
+    # Try to find WASM runtime in package first, then fall back to development path
+    package_wasm_dir = Path(__file__).parent / "wasm-runtime"
+    dev_wasm_dir = Path(__file__).parent.parent.parent / "wasm-runtime"
+
+    if package_wasm_dir.exists():
+        return package_wasm_dir
+    if dev_wasm_dir.exists():
+        return dev_wasm_dir
+    raise FileNotFoundError(
+        f"WASM runtime directory not found. Checked:\n"
+        f"  - Package path: {package_wasm_dir}\n"
+        f"  - Development path: {dev_wasm_dir}"
+    )
+
+
+class WasmRuntime:
+    """
+    An engine, a WASI linker and a compiled module that can be shared by executors.
+
+    Args:
+        wasm_path (str | Path): Path of the wasm binary to compile.
+        engine_settings (dict): Attributes set on the engine ``Config``, plus the
+            ``ALLOCATION_SETTINGS`` selecting the instance allocator.
+        module_cache (CompiledModuleCache, optional): Cache used to load the compiled module.
+    """
+
+    def __init__(
+        self,
+        wasm_path: Union[str, Path],
+        engine_settings: Dict[str, Any],
+        module_cache: Optional[CompiledModuleCache] = None,
+    ):
+        self.wasm_path = Path(wasm_path)
+        self.engine_settings = dict(engine_settings)
+
+        engine_cfg = Config()
+        for name, value in self.engine_settings.items():
+            if name not in ALLOCATION_SETTINGS:
+                setattr(engine_cfg, name, value)
+        apply_allocation_settings(engine_cfg, self.engine_settings)
+
+        self.engine = Engine(engine_cfg)
+        self.linker = Linker(self.engine)
+        self.linker.define_wasi()
+        # Shared by every timed execution on this engine
+        self.epoch_ticker = EpochTicker(self.engine)
+
+        if module_cache is not None:
+            self.module = module_cache.load(
+                self.engine, self.wasm_path, self.engine_settings
+            )
+        else:
+            self.module = Module.from_file(self.engine, str(self.wasm_path))
+
+
+def _runtime_key(
+    wasm_path: Union[str, Path], engine_settings: Dict[str, Any]
+) -> Tuple[str, str]:
+    return (
+        str(Path(wasm_path).resolve()),
+        json.dumps(engine_settings, sort_keys=True, default=str),
+    )
+
+
+def get_runtime(
+    wasm_path: Union[str, Path],
+    engine_settings: Dict[str, Any],
+    module_cache: Optional[CompiledModuleCache] = None,
+) -> WasmRuntime:
+    """
+    Return the shared runtime for ``wasm_path`` and ``engine_settings``, building it on first use.
+
+    The registry lock is held while a runtime is built, so concurrent executors
+    wait for a single compilation instead of compiling the module in parallel.
+    """
+    key = _runtime_key(wasm_path, engine_settings)
+    with _runtimes_lock:
+        runtime = _runtimes.get(key)
+        if runtime is None:
+            runtime = WasmRuntime(wasm_path, engine_settings, module_cache)
+            _runtimes[key] = runtime
+            logger.info(f"Created shared WASM runtime for {wasm_path}")
+        return runtime
+
+
+def clear_runtimes() -> None:
+    """
+    Drop every shared runtime.
+
+    Executors that already borrowed a runtime keep it alive; new executors build fresh ones.
+    """
+    with _runtimes_lock:
+        _runtimes.clear()
@@ -0,0 +1,295 @@
+"""
+Many conversations served by a bounded number of live session interpreters.
+
+A session executor keeps its guest alive between calls, which holds the linear
+memory of a whole interpreter per conversation. ``SessionManager`` maps session
+ids to session executors and keeps only the sessions used most recently alive.
+When a new session would exceed the limit, the least recently used idle session
+is spilled to disk: its guest exports its globals (see ``export_session``), the
+snapshot is written next to the variables sent from the host, and the guest is
+shut down. The next call to that session boots a new interpreter and loads the
+snapshot into it before running the code, so memory grows with the sessions in
+use rather than with all sessions.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from .executor import WasmtimePythonExecutor
+
+
+logger = logging.getLogger(__name__)
+
+# Live sessions kept by default
+DEFAULT_MAX_LIVE_SESSIONS = 64
+
+# Suffix of the files holding spilled sessions, named after a digest of their id
+SPILL_SUFFIX = ".session"
+
+# Bump when the layout of spilled sessions changes
+SPILL_FORMAT_VERSION = 1
+
+
+class _ManagedSession:
+    """A session id's executor, None while spilled, and the calls waiting to use it."""
+
+    __slots__ = ("executor", "lock", "users")
+
+    def __init__(self):
+        self.executor: Optional[WasmtimePythonExecutor] = None
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+class SessionManager:
+    """
+    Session executors by session id, spilling idle sessions to disk in LRU order.
+
+    Sessions are created on their first call. Sessions running a call are never
+    spilled, so the limit is exceeded while more sessions than it are running at once.
+    What survives a spill is what ``export_session`` can save: data the guest can
+    pickle, imported modules and plain functions. Classes defined in a session and
+    their instances are lost, as when a session runs out of fuel.
+
+    Args:
+        additional_authorized_imports (List[str]): Modules the session guests may import.
+        max_live_sessions (int, optional): Sessions kept alive at most.
+        max_memory (int, optional): Bytes of guest memory the live sessions may use
+            together. Each live session is charged the memory limit of its store, so this
+            needs ``store_limits`` with a ``memory_size``.
+        spill_dir (str | Path, optional): Directory of the spilled sessions. Sessions still
+            live when the manager is closed are spilled there too, so a later manager on
+            the same directory resumes them. Spill files are pickles loaded by the host,
+            so the directory must only be writable by this service. Defaults to a
+            temporary directory removed on close.
+        **executor_options: Options of the session executors, as for
+            ``WasmtimePythonExecutor``.
+    """
+
+    def __init__(
+        self,
+        additional_authorized_imports: List[str],
+        max_live_sessions: int = DEFAULT_MAX_LIVE_SESSIONS,
+        max_memory: Optional[int] = None,
+        spill_dir: Optional[Union[str, Path]] = None,
+        **executor_options: Any,
+    ):
+        if max_live_sessions < 1:
+            raise ValueError("A session manager needs at least one live session")
+        if max_memory is not None:
+            store_limits = executor_options.get("store_limits")
+            if store_limits is None or store_limits.memory_size is None:
+                raise ValueError("max_memory needs store_limits with a memory_size")
+            max_live_sessions = min(max_live_sessions, max_memory // store_limits.memory_size)
+            if max_live_sessions < 1:
+                raise ValueError("max_memory is smaller than the memory limit of one session")
+        self.max_live_sessions = max_live_sessions
+        self.additional_authorized_imports = list(additional_authorized_imports)
+        self.executor_options = {**executor_options, "session": True}
+
+        self._temp_dir: Optional[tempfile.TemporaryDirectory] = None
+        if spill_dir is None:
+            self._temp_dir = tempfile.TemporaryDirectory(prefix="wasmtime-sessions-")
+            self.spill_dir = Path(self._temp_dir.name)
+        else:
+            self.spill_dir = Path(spill_dir)
+            self.spill_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+        # Live sessions and sessions being restored, least recently used first
+        self._sessions: "OrderedDict[str, _ManagedSession]" = OrderedDict()
+        self._tools: Dict[str, Callable[..., Any]] = {}
+        self._evictions = 0
+        self._restores = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def execute(self, session_id: str, code: str) -> Tuple[Any, str, bool]:
+        """Run ``code`` in the session ``session_id`` and return (output, logs, is_final_answer)."""
+        with self._checkout(session_id) as executor:
+            return executor(code)
+
+    def send_variables(self, session_id: str, variables: dict) -> None:
+        """Send variables to the session ``session_id``, restoring it if it was spilled."""
+        with self._checkout(session_id) as executor:
+            executor.send_variables(variables)
+
+    def send_tools(self, tools: dict) -> None:
+        """Send tools to every session, live or not."""
+        with self._lock:
+            self._tools = dict(tools)
+            entries = list(self._sessions.values())
+        for entry in entries:
+            with entry.lock:
+                if entry.executor is not None:
+                    entry.executor.send_tools(self._tools)
+
+    def close_session(self, session_id: str) -> None:
+        """Shut the session down and forget its state, live or spilled."""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            with entry.lock:
+                if entry.executor is not None:
+                    entry.executor.cleanup()
+                    entry.executor = None
+        self._spill_path(session_id).unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of live and spilled sessions, evictions and restores."""
+        with self._lock:
+            live = sum(1 for entry in self._sessions.values() if entry.executor is not None)
+            evictions, restores = self._evictions, self._restores
+        return {
+            "live": live,
+            "spilled": sum(1 for _ in self.spill_dir.glob(f"*{SPILL_SUFFIX}")),
+            "evictions": evictions,
+            "restores": restores,
+        }
+
+    def close(self) -> None:
+        """Shut every session down, spilling them first when the spill directory is kept."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            entries = list(self._sessions.items())
+            self._sessions.clear()
+        for session_id, entry in entries:
+            with entry.lock:
+                if entry.executor is None:
+                    continue
+                if self._temp_dir is None:
+                    self._spill(session_id, entry.executor)
+                entry.executor.cleanup()
+                entry.executor = None
+        if self._temp_dir is not None:
+            self._temp_dir.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @contextmanager
+    def _checkout(self, session_id: str) -> Iterator[WasmtimePythonExecutor]:
+        """Hold the executor of ``session_id``, restoring or creating it first."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Session manager has been closed")
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = self._sessions[session_id] = _ManagedSession()
+            self._sessions.move_to_end(session_id)
+            entry.users += 1
+        try:
+            with entry.lock:
+                if entry.executor is None:
+                    # Make room first, so the live sessions never exceed the limit
+                    self._evict_idle(reserve=1)
+                    entry.executor = self._restore(session_id)
+                yield entry.executor
+        finally:
+            with self._lock:
+                entry.users -= 1
+                if entry.executor is None and entry.users == 0:
+                    # Restoring failed and nobody else is waiting for the session
+                    if self._sessions.get(session_id) is entry:
+                        del self._sessions[session_id]
+
+    def _evict_idle(self, reserve: int = 0) -> None:
+        """Spill the least recently used idle sessions until ``reserve`` more fit the limit."""
+        with self._lock:
+            live = [
+                (session_id, entry)
+                for session_id, entry in self._sessions.items()
+                if entry.executor is not None
+            ]
+            excess = len(live) + reserve - self.max_live_sessions
+            candidates = [(session_id, entry) for session_id, entry in live if not entry.users]
+        for session_id, entry in candidates:
+            if excess <= 0:
+                break
+            # A session that is busy or being spilled by another call is skipped
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.executor is None or not self._spill(session_id, entry.executor):
+                    continue
+                entry.executor.cleanup()
+                entry.executor = None
+            finally:
+                entry.lock.release()
+            excess -= 1
+            with self._lock:
+                self._evictions += 1
+                # A call waiting for the session restores it from the spill file instead
+                if not entry.users and self._sessions.get(session_id) is entry:
+                    del self._sessions[session_id]
+
+    def _spill(self, session_id: str, executor: WasmtimePythonExecutor) -> bool:
+        """Write the state of a session to its spill file; False if it cannot be saved."""
+        try:
+            data = pickle.dumps(
+                {
+                    "format": SPILL_FORMAT_VERSION,
+                    "state": executor.state,
+                    "globals": executor.export_session(),
+                },
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        except Exception as e:
+            logger.warning(f"Keeping session {session_id} alive, its state cannot be spilled: {e}")
+            return False
+        fd, temp_path = tempfile.mkstemp(dir=self.spill_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._spill_path(session_id))
+        except OSError as e:
+            logger.warning(f"Keeping session {session_id} alive, its spill file failed: {e}")
+            Path(temp_path).unlink(missing_ok=True)
+            return False
+        logger.info(f"Spilled session {session_id} ({len(data)} bytes)")
+        return True
+
+    def _restore(self, session_id: str) -> WasmtimePythonExecutor:
+        """Start the executor of a session, loading its spill file when there is one."""
+        executor = WasmtimePythonExecutor(
+            self.additional_authorized_imports, **self.executor_options
+        )
+        if self._tools:
+            executor.send_tools(self._tools)
+        path = self._spill_path(session_id)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return executor
+        try:
+            spilled = pickle.loads(data)
+            if spilled.get("format") != SPILL_FORMAT_VERSION:
+                raise ValueError(f"unknown spill format {spilled.get('format')!r}")
+            executor.state = spilled["state"]
+            if spilled["globals"] is not None:
+                executor.import_session(spilled["globals"])
+        except Exception as e:
+            executor.cleanup()
+            raise RuntimeError(f"Failed to restore session {session_id}: {e}")
+        # The live session is authoritative until it is spilled again
+        path.unlink(missing_ok=True)
+        with self._lock:
+            self._restores += 1
+        logger.info(f"Restored session {session_id}")
+        return executor
+
+    def _spill_path(self, session_id: str) -> Path:
+        digest = hashlib.blake2b(session_id.encode(), digest_size=16).hexdigest()
+        return self.spill_dir / f"{digest}{SPILL_SUFFIX}"
@@ -0,0 +1,238 @@
+"""
+Binary transfer of executor state into the guest.
+
+Writing every variable into the program as source makes the guest parse and
+compile the data on every call, which dominates the cost of large lists and
+dicts. Instead, variables are pickled into one blob that the guest loads
+directly, so the cost scales with the size of the data. Only values the guest
+cannot rebuild from a pickle fall back to source injection.
+
+Variables are tracked one by one with content digests, so interpreters that
+keep their globals only receive what changed since their last call. The globals
+of such an interpreter can be exported as a snapshot the guest pickles itself,
+and imported into a new interpreter later.
+"""
+
+import hashlib
+import io
+import pickle
+import threading
+import types
+from typing import Any, Dict, Optional, Tuple
+
+
+# Modules whose types can be unpickled inside the guest
+GUEST_PICKLE_MODULES = frozenset(
+    {"builtins", "collections", "datetime", "decimal", "fractions", "uuid"}
+)
+
+# Types whose values are pickled by reference to their module
+_BY_REFERENCE_TYPES = (
+    type,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.ModuleType,
+)
+
+# Types whose values cannot change once sent, so an unchanged object needs no new digest
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, complex, type(None))
+
+# Path of the state blob inside the guest when it is shipped as a file
+GUEST_STATE_DIR = "/__state__"
+GUEST_STATE_FILE = f"{GUEST_STATE_DIR}/state.pkl"
+
+# The state blob is a pickled dict mapping variable names to their own pickles.
+# Variables are loaded one by one, so one the guest cannot load is reported on
+# stderr and left out instead of failing the whole call.
+GUEST_STATE_DECODER_SOURCE = """def _decode_state(blob):
+    import pickle, sys
+    state = dict()
+    for name, data in pickle.loads(blob).items():
+        try:
+            state[name] = pickle.loads(data)
+        except Exception as e:
+            print(f"Could not load variable {name}: {type(e).__name__}: {e}", file=sys.stderr)
+    return state
+"""
+
+# Program prefix loading the state blob written to GUEST_STATE_FILE
+STATE_LOADER_SOURCE = (
+    GUEST_STATE_DECODER_SOURCE
+    + f"""with open({GUEST_STATE_FILE!r}, "rb") as _state_file:
+    globals().update(_decode_state(_state_file.read()))
+del _decode_state, _state_file
+"""
+)
+
+# Program prefix loading the state blob sent first on the guest stdin, as a b"s" frame
+STATE_STDIN_LOADER_SOURCE = (
+    GUEST_STATE_DECODER_SOURCE
+    + """import sys as _sys
+_header = _sys.__stdin__.buffer.read(5)
+globals().update(_decode_state(_sys.__stdin__.buffer.read(int.from_bytes(_header[1:], "big"))))
+del _decode_state, _sys, _header
+"""
+)
+
+# Chunk sending the globals of a session as a result record: a pickled dict of
+# entries and the names that could not be saved. Modules are saved by name and
+# plain functions defined in the session as their marshalled code, which only
+# ever goes back to a guest of the same Python version. ``skip`` holds the names
+# the executor defines itself.
+GUEST_GLOBALS_EXPORT_SOURCE = """def _export_globals(namespace, skip):
+    import marshal, pickle, types
+    saved = dict()
+    dropped = []
+    for name, value in list(namespace.items()):
+        if name.startswith("__") or name in skip:
+            continue
+        try:
+            if isinstance(value, types.ModuleType):
+                saved[name] = ("module", value.__name__)
+            elif (
+                isinstance(value, types.FunctionType)
+                and value.__module__ == "__main__"
+                and value.__closure__ is None
+            ):
+                defaults = pickle.dumps((value.__defaults__, value.__kwdefaults__))
+                saved[name] = ("function", marshal.dumps(value.__code__), defaults)
+            else:
+                saved[name] = ("value", pickle.dumps(value))
+        except Exception:
+            dropped.append(name)
+    __send_result__((pickle.dumps(saved), dropped))
+
+
+_export_globals(globals(), {skip!r} | {{"_export_globals"}})
+del _export_globals
+"""
+
+# Chunk restoring the globals saved by GUEST_GLOBALS_EXPORT_SOURCE, received in the
+# ``__globals_snapshot__`` variable of a state blob
+GUEST_GLOBALS_IMPORT_SOURCE = """def _import_globals(namespace, snapshot):
+    import importlib, marshal, pickle, sys, types
+    for name, entry in pickle.loads(snapshot).items():
+        try:
+            if entry[0] == "module":
+                namespace[name] = importlib.import_module(entry[1])
+            elif entry[0] == "function":
+                defaults, kwdefaults = pickle.loads(entry[2])
+                function = types.FunctionType(marshal.loads(entry[1]), namespace, name, defaults)
+                function.__kwdefaults__ = kwdefaults
+                namespace[name] = function
+            else:
+                namespace[name] = pickle.loads(entry[1])
+        except Exception as e:
+            print(f"Could not restore {name}: {type(e).__name__}: {e}", file=sys.stderr)
+
+
+_import_globals(globals(), __globals_snapshot__)
+del _import_globals, __globals_snapshot__
+"""
+
+
+class _GuestPickler(pickle.Pickler):
+    """Pickler refusing objects whose types are not available inside the guest."""
+
+    def reducer_override(self, obj: Any) -> Any:
+        # Only called for objects outside the fast paths for None, bools, ints,
+        # floats, bytes, str, dict, set, frozenset, list and tuple.
+        if isinstance(obj, _BY_REFERENCE_TYPES):
+            # Pickled as a reference to the module defining them, not by their type
+            module = getattr(obj, "__module__", None)
+            name = getattr(obj, "__qualname__", repr(obj))
+        else:
+            module, name = type(obj).__module__, type(obj).__qualname__
+        if module not in GUEST_PICKLE_MODULES:
+            raise pickle.PicklingError(f"{module}.{name} is not available in the guest")
+        return NotImplemented
+
+
+def dumps_for_guest(value: Any) -> bytes:
+    """Pickle ``value``, raising ``pickle.PicklingError`` if the guest could not load it."""
+    buffer = io.BytesIO()
+    _GuestPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+    return buffer.getvalue()
+
+
+class _TrackedVariable:
+    """Encoded form of one variable and the digest used to detect changes."""
+
+    __slots__ = ("value", "pickled", "digest")
+
+    def __init__(self, value: Any, pickled: Optional[bytes], digest: bytes):
+        self.value = value
+        self.pickled = pickled
+        self.digest = digest
+
+
+class StateTracker:
+    """
+    Per-variable encodings and content digests of the executor state.
+
+    Every variable is pickled on its own, or kept for source injection when the
+    guest could not load its pickle, and fingerprinted with a content digest.
+    Interpreters that already hold some variables, such as sessions, pass the
+    digests they have seen to ``encode`` and only receive what changed.
+    Immutable scalars that are still the same object are not re-encoded.
+    """
+
+    def __init__(self):
+        self._variables: Dict[str, _TrackedVariable] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, variables: Dict[str, Any]) -> None:
+        """Re-encode ``variables``, which replace the tracked state."""
+        with self._lock:
+            tracked = {}
+            for key, value in variables.items():
+                previous = self._variables.get(key)
+                if (
+                    previous is not None
+                    and previous.value is value
+                    and type(value) in _IMMUTABLE_TYPES
+                ):
+                    tracked[key] = previous
+                    continue
+                try:
+                    pickled = dumps_for_guest(value)
+                    digest = _digest(b"p" + pickled)
+                except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+                    pickled = None
+                    digest = _digest(b"r" + repr(value).encode("utf-8", "backslashreplace"))
+                tracked[key] = _TrackedVariable(value, pickled, digest)
+            self._variables = tracked
+
+    def encode(
+        self, synced: Optional[Dict[str, bytes]] = None
+    ) -> Tuple[Optional[bytes], Dict[str, Any]]:
+        """
+        Encode the variables for the guest.
+
+        With ``synced``, a mapping of variable names to the digests an interpreter
+        already holds, only new or changed variables are encoded, and ``synced``
+        is updated to the digests being sent.
+
+        Returns the blob of every pickled variable (None when there is none), and
+        the variables that must be injected as source.
+        """
+        with self._lock:
+            pickled = {}
+            remaining = {}
+            for key, variable in self._variables.items():
+                if synced is not None:
+                    if synced.get(key) == variable.digest:
+                        continue
+                    synced[key] = variable.digest
+                if variable.pickled is not None:
+                    pickled[key] = variable.pickled
+                else:
+                    remaining[key] = variable.value
+
+        blob = pickle.dumps(pickled, protocol=pickle.HIGHEST_PROTOCOL) if pickled else None
+        return blob, remaining
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
@@ -0,0 +1,368 @@
+"""
+Bounded capture of guest output, and in-memory standard streams for fresh instances.
+
+Pointing ``stdout_file`` and ``stderr_file`` at a temporary directory costs a
+directory creation, several file opens and reads, and a recursive delete on
+every call. When wasmtime-py supports custom WASI outputs, guest writes land
+directly in bounded host buffers instead, and the state blob reaches the guest
+through the stdin pipe, so a call touches no filesystem at all.
+
+Every execution mode keeps guest output in ``OutputBuffer`` objects, which hold
+at most a fixed number of bytes per stream however much the guest prints. Guests
+that send their output as frames, next to their result record, are read through
+a ``FrameParser``.
+"""
+
+import codecs
+import logging
+import os
+import queue
+import sys
+import threading
+from typing import Callable, Optional, Tuple
+
+from wasmtime import WasiConfig
+
+
+logger = logging.getLogger(__name__)
+
+# Bytes kept per stream; output beyond is dropped between its head and its tail
+DEFAULT_CAPTURE_LIMIT = 1 << 20
+
+# Receives the name of a guest stream ("stdout" or "stderr") and text written to it
+OutputCallback = Callable[[str, str], None]
+
+# Start of every frame sent by a guest; 0xfe never occurs in UTF-8 text
+FRAME_MARKER = b"\xfe\xfd"
+
+# Marker, tag and payload length of a guest frame
+FRAME_HEADER_SIZE = len(FRAME_MARKER) + 5
+
+# Tags of the frames carrying guest output
+OUTPUT_TAGS = frozenset((b"o", b"e"))
+
+# Largest payload of an output frame; guests split longer output into several
+# frames, and larger lengths are not a frame
+MAX_FRAME_SIZE = 1 << 16
+
+# Largest payload of any other frame, such as a result record, which the host
+# holds whole until it is complete
+MAX_RECORD_SIZE = 1 << 28
+
+
+def supports_memory_streams() -> bool:
+    """Whether guest output can be captured in memory with this wasmtime-py."""
+    return hasattr(WasiConfig, "stdout_custom") and sys.platform.startswith("linux")
+
+
+def notify_output(on_output: Optional[OutputCallback], stream: str, text: str) -> None:
+    """Pass ``text`` to ``on_output``; a failing callback is logged and never fails the guest."""
+    if on_output is None or not text:
+        return
+    try:
+        on_output(stream, text)
+    except Exception as e:
+        logger.warning(f"Output callback failed: {e}")
+
+
+def dropped_marker(dropped: int) -> str:
+    """Return the line standing in for output dropped between the head and the tail."""
+    return f"\n... [{dropped} bytes dropped] ...\n"
+
+
+class OutputBuffer:
+    """
+    A bounded in-memory buffer receiving one guest output stream.
+
+    The first half of the limit keeps the head of the output, and the second half
+    is a ring holding its tail, so the beginning and the end of a long output (such
+    as the final answer) both survive. Bytes in between are dropped as they are
+    written, and only counted, so memory stays bounded whatever the guest prints.
+
+    Args:
+        limit (int): Number of bytes kept.
+        stream (str): Name of the stream passed to ``on_output``.
+        on_output (OutputCallback, optional): Receives the output as it is written,
+            including the dropped part.
+    """
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_CAPTURE_LIMIT,
+        stream: str = "stdout",
+        on_output: Optional[OutputCallback] = None,
+    ):
+        self.limit = limit
+        self.stream = stream
+        self.written = 0
+        self.dropped = 0
+        self._head_limit = limit // 2
+        self._tail_limit = limit - self._head_limit
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._on_output = on_output
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def write(self, data: bytes) -> None:
+        """Append guest output, dropping the oldest bytes past the head once the limit is reached."""
+        self.written += len(data)
+        if self._on_output is not None:
+            notify_output(self._on_output, self.stream, self._decoder.decode(data))
+
+        room = self._head_limit - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if not data:
+            return
+
+        if len(data) >= self._tail_limit:
+            # The write replaces the whole tail
+            self.dropped += len(self._tail) + len(data) - self._tail_limit
+            self._tail = bytearray(data[len(data) - self._tail_limit :])
+            return
+        self._tail += data
+        overflow = len(self._tail) - self._tail_limit
+        if overflow > 0:
+            del self._tail[:overflow]
+            self.dropped += overflow
+
+    def getvalue(self) -> str:
+        """Return the captured output as text, with a marker where bytes were dropped."""
+        if not self.dropped:
+            return (self._head + self._tail).decode("utf-8", errors="replace")
+        return (
+            self._head.decode("utf-8", errors="replace")
+            + dropped_marker(self.dropped)
+            + self._tail.decode("utf-8", errors="replace")
+        )
+
+
+def read_output_file(path: str, limit: int = DEFAULT_CAPTURE_LIMIT) -> str:
+    """
+    Read a guest output file like an ``OutputBuffer`` would have captured it.
+
+    Only the head and the tail of a file larger than ``limit`` are read.
+    """
+    buffer = OutputBuffer(limit)
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= limit:
+                buffer.write(f.read())
+            else:
+                buffer.write(f.read(buffer._head_limit))
+                f.seek(size - buffer._tail_limit)
+                buffer.write(f.read(buffer._tail_limit))
+                buffer.dropped = size - limit
+            buffer.written = size
+    except FileNotFoundError:
+        pass
+    return buffer.getvalue()
+
+
+def encode_frame(tag: bytes, payload: bytes) -> bytes:
+    """Return a frame: the 1-byte ``tag``, the 4-byte big-endian payload length and ``payload``."""
+    return tag + len(payload).to_bytes(4, "big") + payload
+
+
+def take_frame(pending: bytearray, tags: frozenset) -> Optional[Tuple[bytes, bytes]]:
+    """
+    Take the next frame sent by a guest off the front of ``pending``.
+
+    Guest frames start with ``FRAME_MARKER``, which UTF-8 text never contains.
+    Bytes before a marker, and markers not followed by one of ``tags`` and a
+    length within ``MAX_FRAME_SIZE`` (``MAX_RECORD_SIZE`` for frames other than
+    ``OUTPUT_TAGS``), are not a frame: they are returned as an ``o`` frame, so a
+    guest writing to its stdout file descriptor directly only adds to its stdout,
+    and the frames after it are still recognized.
+
+    Returns None when ``pending`` holds no complete frame or output yet.
+    """
+    if not pending:
+        return None
+    if not pending.startswith(FRAME_MARKER):
+        end = pending.find(FRAME_MARKER)
+        if end < 0:
+            # Keep what may be the start of a marker split across writes
+            end = len(pending) - 1 if pending.endswith(FRAME_MARKER[:1]) else len(pending)
+        if end == 0:
+            return None
+        raw = bytes(pending[:end])
+        del pending[:end]
+        return b"o", raw
+    if len(pending) < FRAME_HEADER_SIZE:
+        return None
+    tag = bytes(pending[len(FRAME_MARKER) : len(FRAME_MARKER) + 1])
+    size = int.from_bytes(pending[len(FRAME_MARKER) + 1 : FRAME_HEADER_SIZE], "big")
+    limit = MAX_FRAME_SIZE if tag in OUTPUT_TAGS else MAX_RECORD_SIZE
+    if tag not in tags or size > limit:
+        raw = bytes(pending[: len(FRAME_MARKER)])
+        del pending[: len(FRAME_MARKER)]
+        return b"o", raw
+    if len(pending) < FRAME_HEADER_SIZE + size:
+        return None
+    payload = bytes(pending[FRAME_HEADER_SIZE : FRAME_HEADER_SIZE + size])
+    del pending[: FRAME_HEADER_SIZE + size]
+    return tag, payload
+
+
+class StdinFeed:
+    """
+    A pipe that feeds data to the guest stdin from a background thread.
+
+    The guest reads stdin while ``start`` blocks the calling thread, so the writer
+    must run concurrently once the data exceeds the pipe buffer.
+
+    Args:
+        data (bytes): What the guest reads from stdin first.
+        keep_open (bool): Whether more data may follow through ``send``. Otherwise the
+            guest reads EOF after ``data``.
+    """
+
+    def __init__(self, data: bytes, keep_open: bool = False):
+        self._read_fd, self._write_fd = os.pipe()
+        self._queue: "queue.SimpleQueue[Optional[bytes]]" = queue.SimpleQueue()
+        if data:
+            self._queue.put(data)
+        if not keep_open:
+            self._queue.put(None)
+        self._thread = threading.Thread(
+            target=self._feed, name="wasmtime-stdin", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def path(self) -> str:
+        """Path under which the host can reopen the read end of the pipe."""
+        return f"/proc/self/fd/{self._read_fd}"
+
+    def send(self, data: bytes) -> None:
+        """Queue ``data`` after what was fed so far; needs ``keep_open``."""
+        self._queue.put(data)
+
+    def end(self) -> None:
+        """Let the guest read EOF once it has read what was fed so far."""
+        self._queue.put(None)
+
+    def _feed(self) -> None:
+        try:
+            for data in iter(self._queue.get, None):
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(self._write_fd, view) :]
+        except OSError:
+            # The guest exited without reading everything
+            pass
+        finally:
+            os.close(self._write_fd)
+
+    def close(self) -> None:
+        """
+        Close the read end and wait for the writer.
+
+        The store using the pipe must be closed first, so that a writer blocked on a
+        guest that stopped reading early fails instead of waiting forever.
+        """
+        self._queue.put(None)
+        if self._read_fd is not None:
+            os.close(self._read_fd)
+            self._read_fd = None
+        self._thread.join()
+
+
+class FrameParser:
+    """
+    Demultiplex a guest stdout carrying frames into output buffers and a result record.
+
+    Guest frames are read with ``take_frame``. Frames tagged ``o`` and ``e`` go
+    to ``stdout`` and ``stderr``, the payload of the last ``v`` frame is kept as
+    ``result`` and that of the last ``p`` frame as ``profile``, and ``t`` frames,
+    tool calls (see ``tools.py``), are passed to ``on_tool_call``. Bytes that are
+    not a frame, such as a guest writing to its stdout file descriptor directly,
+    reach ``stdout`` as is, and the frames after them are parsed as usual.
+
+    Args:
+        stdout (OutputBuffer): Receives the guest stdout.
+        stderr (OutputBuffer): Receives the guest stderr.
+        on_tool_call (Callable[[bytes], None], optional): Receives the payload of every
+            tool call, while the guest waits for the reply.
+    """
+
+    TAGS = frozenset((b"o", b"e", b"v", b"p", b"t"))
+
+    def __init__(
+        self,
+        stdout: OutputBuffer,
+        stderr: OutputBuffer,
+        on_tool_call: Optional[Callable[[bytes], None]] = None,
+    ):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.on_tool_call = on_tool_call
+        self.result: Optional[bytes] = None
+        self.profile: Optional[bytes] = None
+        self._pending = bytearray()
+
+    def write(self, data: bytes) -> None:
+        """Parse guest stdout bytes, keeping an incomplete frame until the rest arrives."""
+        self._pending += data
+        while True:
+            frame = take_frame(self._pending, self.TAGS)
+            if frame is None:
+                return
+            self.handle(*frame)
+
+    def handle(self, tag: bytes, payload: bytes) -> bool:
+        """Route one frame; returns False when its tag is not one of ``TAGS``."""
+        if tag == b"o":
+            self.stdout.write(payload)
+        elif tag == b"e":
+            self.stderr.write(payload)
+        elif tag == b"v":
+            self.result = payload
+        elif tag == b"p":
+            self.profile = payload
+        elif tag == b"t" and self.on_tool_call is not None:
+            self.on_tool_call(payload)
+        else:
+            return False
+        return True
+
+    def close(self) -> None:
+        """Pass a trailing incomplete frame to ``stdout``, once the guest is done."""
+        if self._pending:
+            self.stdout.write(bytes(self._pending))
+            self._pending.clear()
+
+
+def capture_output(
+    config: WasiConfig,
+    limit: int = DEFAULT_CAPTURE_LIMIT,
+    on_output: Optional[OutputCallback] = None,
+    on_tool_call: Optional[Callable[[bytes], None]] = None,
+) -> FrameParser:
+    """Send the guest stdout and stderr of ``config`` to a parser filling in-memory buffers."""
+    parser = FrameParser(
+        OutputBuffer(limit, "stdout", on_output),
+        OutputBuffer(limit, "stderr", on_output),
+        on_tool_call,
+    )
+    config.stdout_custom = parser.write
+    config.stderr_custom = parser.stderr.write
+    return parser
+
+
+def feed_stdin(
+    config: WasiConfig, data: Optional[bytes], keep_open: bool = False
+) -> Optional[StdinFeed]:
+    """Make ``data`` the guest stdin of ``config``; the caller must close the returned feed."""
+    if data is None and not keep_open:
+        return None
+    feed = StdinFeed(data or b"", keep_open)
+    try:
+        config.stdin_file = feed.path
+    except BaseException:
+        feed.close()
+        raise
+    return feed
@@ -0,0 +1,98 @@
+"""
+Calls from guest code to tools running on the host.
+
+python.wasm is a prebuilt WASI program, so guest code cannot reach functions
+defined on the ``Linker``: its imports are fixed when it is built. Tool calls
+travel over the frame channel the guest already uses for its output instead.
+The guest sends a ``t`` frame holding the tool name and arguments, encoded like
+result records, then blocks reading its stdin. The host decodes the call while
+the guest is suspended in its write, runs the tool, and answers with an ``a``
+frame holding the pickled return value or error. The whole call is a pair of
+frames within the same execution; nothing is re-run or parsed out of stdout.
+
+Arguments are decoded with the result decoder, which only builds builtin data
+types; other guest objects arrive as their ``str``. Return values the guest
+cannot unpickle are sent as their ``str`` too.
+"""
+
+import logging
+import pickle
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import ExecutionMetrics
+from .result import decode_result
+from .state import dumps_for_guest
+from .streams import encode_frame
+
+
+logger = logging.getLogger(__name__)
+
+# Guest source installing ``__call_tool__`` on a guest whose stdout cannot carry
+# tool calls, so that calling a tool fails instead of waiting for a reply
+GUEST_TOOLS_UNAVAILABLE_SOURCE = """import builtins
+
+
+def _call_tool(name, args, kwargs):
+    raise RuntimeError(f"Tool {name} cannot be called with file output capture")
+
+
+builtins.__call_tool__ = _call_tool
+del _call_tool
+"""
+
+
+class ToolBridge:
+    """
+    Runs the host tools called by one guest execution.
+
+    Args:
+        tools (Dict[str, Callable]): Host callables by the name the guest calls them with.
+        metrics (ExecutionMetrics, optional): Receives the number of tool calls and the
+            time spent running them.
+    """
+
+    def __init__(
+        self,
+        tools: Dict[str, Callable[..., Any]],
+        metrics: Optional[ExecutionMetrics] = None,
+    ):
+        self.tools = tools
+        self.metrics = metrics
+
+    def reply(self, payload: bytes) -> bytes:
+        """Run the tool call encoded in a ``t`` frame payload and return the ``a`` reply frame."""
+        started = time.perf_counter()
+        try:
+            try:
+                name, args, kwargs = decode_result(payload)
+                if not (
+                    isinstance(name, str)
+                    and isinstance(args, tuple)
+                    and isinstance(kwargs, dict)
+                    and all(isinstance(key, str) for key in kwargs)
+                ):
+                    raise ValueError("unexpected layout")
+            except (TypeError, ValueError) as e:
+                return _reply(("error", "RuntimeError", f"Malformed tool call: {e}"))
+            tool = self.tools.get(name)
+            if tool is None:
+                return _reply(("error", "NameError", f"Unknown tool {name!r}"))
+            try:
+                value = tool(*args, **kwargs)
+            except Exception as e:
+                logger.info(f"Tool {name} failed: {type(e).__name__}: {e}")
+                return _reply(("error", type(e).__name__, str(e)))
+            try:
+                return _reply(("ok", value))
+            except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+                # The guest gets what it would print instead
+                return _reply(("ok", str(value)))
+        finally:
+            if self.metrics is not None:
+                self.metrics.tool_calls += 1
+                self.metrics.tool_seconds += time.perf_counter() - started
+
+
+def _reply(record: tuple) -> bytes:
+    return encode_frame(b"a", dumps_for_guest(record))
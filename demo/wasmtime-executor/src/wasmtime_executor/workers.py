@@ -0,0 +1,404 @@
+"""
+Execution in a pool of worker processes.
+
+In-process execution shares the host process with the service calling it: guest
+code competes with its threads for the CPU, and a crash of the host side of the
+runtime takes the service down with it. ``WorkerPool`` runs calls in separate
+worker processes instead. Each worker holds its own executor, and with it the
+engine and the compiled module, loaded from the compiled module cache, and is
+warmed up with one call before it takes jobs. The pool has the interface of the
+executor, so it can replace one.
+
+Jobs, guest output and results travel as pickled messages over a pipe per
+worker. Tools stay in the calling process: a worker forwards every tool call the
+guest makes over its pipe and waits for the reply. A worker that dies, or whose
+job runs past ``job_timeout``, is killed and replaced by a new one, and the job
+fails like a call whose guest trapped.
+"""
+
+import builtins
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .metrics import ExecutionMetrics, get_process_metrics
+from .streams import OutputCallback, notify_output
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks that a worker is still alive while waiting for it
+WORKER_POLL_INTERVAL = 0.1
+
+# Seconds a new worker may take to load its executor and run its warm-up call
+WORKER_START_TIMEOUT = 300.0
+
+# Workers failing to start in a row before calls fail instead of starting another
+MAX_START_FAILURES = 3
+
+
+def _worker_main(
+    conn, additional_authorized_imports: List[str], options: Dict[str, Any]
+) -> None:
+    """Run the jobs received on ``conn`` in an executor of this process until EOF."""
+    from .executor import WasmtimePythonExecutor
+
+    send_lock = threading.Lock()
+
+    def send(message: tuple) -> None:
+        with send_lock:
+            conn.send(message)
+
+    def call_tool(name: str) -> Callable[..., Any]:
+        def tool(*args, **kwargs):
+            send(("tool", name, args, kwargs))
+            reply = conn.recv()
+            if reply[0] == "error":
+                error = getattr(builtins, reply[1], None)
+                if not (isinstance(error, type) and issubclass(error, Exception)):
+                    error = RuntimeError
+                raise error(reply[2])
+            return reply[1]
+
+        return tool
+
+    executor = WasmtimePythonExecutor(additional_authorized_imports, **options)
+    try:
+        executor("pass")
+        send(("ready",))
+        while True:
+            try:
+                _, code, state, tool_names, stream = conn.recv()
+            except EOFError:
+                break
+            executor.state = state
+            executor.send_tools({name: call_tool(name) for name in tool_names})
+            executor.on_output = (
+                (lambda name, text: send(("output", name, text))) if stream else None
+            )
+            output, logs, is_final_answer = executor(code)
+            metrics = executor.last_metrics.as_dict() if executor.last_metrics else None
+            send(("result", output, logs, is_final_answer, metrics))
+    finally:
+        executor.cleanup()
+
+
+class _WorkerLost(Exception):
+    """Raised when a worker died before it received its job."""
+
+
+class _Worker:
+    """A worker process and the host end of its pipe."""
+
+    def __init__(
+        self, context, additional_authorized_imports: List[str], options: Dict[str, Any]
+    ):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, additional_authorized_imports, options),
+            name="wasmtime-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def receive(self, deadline: Optional[float] = None) -> Optional[tuple]:
+        """Return the next message, or None once the worker died or ``deadline`` passed."""
+        while True:
+            try:
+                if self.conn.poll(WORKER_POLL_INTERVAL):
+                    return self.conn.recv()
+            except (EOFError, OSError):
+                # The pipe closes as the process exits
+                self.process.join(WORKER_POLL_INTERVAL)
+                return None
+            if not self.process.is_alive():
+                # Messages sent right before exiting are still in the pipe
+                if not self.conn.poll(0):
+                    return None
+            elif deadline is not None and time.monotonic() > deadline:
+                return None
+
+    def stop(self) -> None:
+        """Kill the process and close the pipe."""
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    Executor running calls in a pool of pre-warmed worker processes.
+
+    Calls from several threads run in parallel on different workers, so throughput
+    scales with cores without the guests running in the calling process. Variables
+    are sent to the worker with every call. Session mode is not available, since
+    consecutive calls may run on different workers.
+
+    Args:
+        additional_authorized_imports (List[str]): Modules the guests may import.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        job_timeout (float, optional): Wall-clock seconds after which a call is abandoned
+            and its worker killed and replaced, on top of the limits of the executor.
+        on_output (Callable[[str, str], None], optional): Receives guest output while
+            calls run, forwarded from the workers.
+        **executor_options: Options of the executors of the workers, as for
+            ``WasmtimePythonExecutor``. They must be picklable.
+    """
+
+    def __init__(
+        self,
+        additional_authorized_imports: List[str],
+        workers: Optional[int] = None,
+        job_timeout: Optional[float] = None,
+        on_output: Optional[OutputCallback] = None,
+        **executor_options: Any,
+    ):
+        if executor_options.get("session"):
+            raise ValueError("Worker pools cannot run sessions")
+        workers = workers or os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError("A worker pool needs at least one worker")
+        self.additional_authorized_imports = list(additional_authorized_imports)
+        self.executor_options = executor_options
+        self.job_timeout = job_timeout
+        self.on_output = on_output
+        self.state: Dict[str, Any] = {"__name__": "__main__"}
+        self.static_tools: Optional[Dict[str, Callable[..., Any]]] = None
+        self.last_metrics: Optional[ExecutionMetrics] = None
+
+        # Workers loading the engine in their own process do not inherit its threads
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._jobs = 0
+        self._restarts = 0
+        self._start_failures = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        for _ in range(workers):
+            self._idle.put(self._start_worker())
+
+    def __call__(self, code_action: str) -> Tuple[Any, str, bool]:
+        """Execute code on a worker and return the result."""
+        return self.execute(code_action)
+
+    def execute(
+        self, code: str, on_output: Optional[OutputCallback] = None
+    ) -> Tuple[Any, str, bool]:
+        """
+        Execute code on the next idle worker.
+
+        ``on_output`` overrides the pool's output callback for this call. The resource
+        usage measured by the worker is stored in ``last_metrics`` and added to the
+        process metrics of the calling process.
+        """
+        on_output = on_output or self.on_output
+        started = time.perf_counter()
+        while True:
+            worker = self._acquire()
+            try:
+                output, metrics = self._run_job(worker, code, on_output)
+                break
+            except _WorkerLost:
+                # The job never reached the worker, so it can run on another one
+                worker.stop()
+            finally:
+                self._release(worker)
+        metrics.total_seconds = time.perf_counter() - started
+        self.last_metrics = metrics
+        get_process_metrics().record(metrics)
+        return output
+
+    def execute_many(
+        self, codes: Iterable[str], max_workers: Optional[int] = None
+    ) -> List[Tuple[Any, str, bool]]:
+        """
+        Execute independent code snippets concurrently, on as many workers at once.
+
+        Args:
+            codes (Iterable[str]): Code snippets to execute.
+            max_workers (int, optional): Number of snippets running at the same time.
+                Defaults to the number of workers.
+
+        Returns:
+            The (output, logs, is_final_answer) triple of every snippet, in order.
+        """
+        codes = list(codes)
+        if not codes:
+            return []
+        concurrency = min(max_workers or len(self._workers), len(codes))
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="wasmtime-worker-jobs"
+        ) as batch:
+            return list(batch.map(self.execute, codes))
+
+    def send_variables(self, variables: dict):
+        """Send variables to the guests of the following calls."""
+        self.state.update(variables)
+
+    def send_tools(self, tools: dict):
+        """Send tools, which keep running in this process when guests call them."""
+        self.static_tools = dict(tools)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of workers, idle workers, jobs run and workers restarted."""
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "idle": self._idle.qsize(),
+                "jobs": self._jobs,
+                "restarts": self._restarts,
+            }
+
+    def cleanup(self):
+        """Stop every worker process."""
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+        logger.info("Worker pool stopped")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cleanup()
+
+    def _start_worker(self) -> _Worker:
+        worker = _Worker(self._context, self.additional_authorized_imports, self.executor_options)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        """Stop a worker and start a new one in its place."""
+        worker.stop()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self._restarts += 1
+        logger.warning(f"Restarting worker process {worker.process.pid}")
+        return self._start_worker()
+
+    def _acquire(self) -> _Worker:
+        """Take an idle worker, waiting for it to finish starting if needed."""
+        while True:
+            if self._closed:
+                raise RuntimeError("Worker pool has been cleaned up")
+            try:
+                worker = self._idle.get(timeout=WORKER_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            while not worker.ready:
+                message = worker.receive(time.monotonic() + WORKER_START_TIMEOUT)
+                if message is None:
+                    worker.stop()
+                    with self._lock:
+                        self._start_failures += 1
+                        failures = self._start_failures
+                    self._release(worker)
+                    if failures >= MAX_START_FAILURES:
+                        # Workers that keep failing to start point to their options
+                        raise RuntimeError(
+                            f"Worker processes failed to start {failures} times in a row "
+                            f"(last exit code {worker.process.exitcode})"
+                        )
+                    break
+                worker.ready = message[0] == "ready"
+                if worker.ready:
+                    with self._lock:
+                        self._start_failures = 0
+            if not worker.ready:
+                continue
+            if worker.process.is_alive():
+                return worker
+            # The worker died while idle
+            self._release(worker)
+
+    def _release(self, worker: _Worker) -> None:
+        """Return a worker to the idle workers, replacing it if it is not running anymore."""
+        if self._closed:
+            worker.stop()
+        elif worker.process.is_alive():
+            self._idle.put(worker)
+        else:
+            self._idle.put(self._replace(worker))
+
+    def _run_job(
+        self, worker: _Worker, code: str, on_output: Optional[OutputCallback]
+    ) -> Tuple[Tuple[Any, str, bool], ExecutionMetrics]:
+        """Send a job to ``worker``, serve its tool calls and output, and return its result."""
+        metrics = ExecutionMetrics(
+            "pooled" if self.executor_options.get("preinitialize") else "fresh"
+        )
+        metrics.failed = True
+        tools = self.static_tools or {}
+        try:
+            worker.conn.send(("job", code, self.state, list(tools), on_output is not None))
+        except OSError:
+            raise _WorkerLost()
+        except Exception as e:
+            error = f"Failed to send the job to a worker: {e}"
+            return (f"WASM execution error: {error}", error, False), metrics
+        with self._lock:
+            self._jobs += 1
+
+        deadline = None if self.job_timeout is None else time.monotonic() + self.job_timeout
+        while True:
+            message = worker.receive(deadline)
+            if message is None:
+                if worker.process.is_alive() and deadline is not None:
+                    error = f"Worker job timed out after {self.job_timeout} seconds"
+                else:
+                    error = f"Worker process exited with code {worker.process.exitcode}"
+                worker.stop()
+                logger.warning(error)
+                return (f"WASM execution error: {error}", error, False), metrics
+            kind = message[0]
+            if kind == "output":
+                notify_output(on_output, message[1], message[2])
+            elif kind == "tool":
+                reply = _run_tool(tools, *message[1:])
+                try:
+                    worker.conn.send(reply)
+                except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+                    # The guest gets what it would print instead
+                    worker.conn.send(("ok", str(reply[1])))
+            elif kind == "result":
+                _, output, logs, is_final_answer, worker_metrics = message
+                if worker_metrics is not None:
+                    metrics = _metrics_from_dict(worker_metrics)
+                return (output, logs, is_final_answer), metrics
+
+
+def _run_tool(
+    tools: Dict[str, Callable[..., Any]], name: str, args: tuple, kwargs: dict
+) -> tuple:
+    """Run a tool called by a worker and return the reply to send back."""
+    tool = tools.get(name)
+    if tool is None:
+        return ("error", "NameError", f"Unknown tool {name!r}")
+    try:
+        return ("ok", tool(*args, **kwargs))
+    except Exception as e:
+        return ("error", type(e).__name__, str(e))
+
+
+def _metrics_from_dict(values: Dict[str, Any]) -> ExecutionMetrics:
+    metrics = ExecutionMetrics(values["mode"])
+    for field in ExecutionMetrics.FIELDS:
+        setattr(metrics, field, values[field])
+    metrics.failed = values["failed"]
+    metrics.final_answer = values["final_answer"]
+    return metrics
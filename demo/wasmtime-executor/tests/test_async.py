@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for asyncio execution and cancellation.
+"""
+
+import asyncio
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor
+from wasmtime_executor.interrupt import supports_interruption
+
+
+# Runs until interrupted while staying far below the fuel budget
+ENDLESS_LOOP = "import time\nwhile True:\n    time.sleep(0.01)"
+
+
+@pytest.fixture(params=[{}, {"preinitialize": True}, {"session": True}], ids=str)
+def executor(request):
+    """Create an executor in each execution mode."""
+    executor = WasmtimePythonExecutor(
+        additional_authorized_imports=[], max_print_outputs_length=1000, **request.param
+    )
+    yield executor
+    executor.cleanup()
+
+
+class TestAsyncExecution:
+    """Test running code from an event loop."""
+
+    @pytest.mark.asyncio
+    async def test_should_return_the_same_result_as_a_call(self, executor):
+        """aexecute should produce the usual (output, logs, is_final_answer) triple."""
+        executor.send_variables({"x": 20})
+
+        output, logs, is_final_answer = await executor.aexecute("print(x + 1)")
+
+        assert "21" in logs
+        assert is_final_answer is False
+
+    @pytest.mark.asyncio
+    async def test_should_not_block_the_event_loop(self, executor):
+        """Other tasks should keep running while a guest executes."""
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        await executor.aexecute("sum(i * i for i in range(300_000))")
+        ticker.cancel()
+
+        assert ticks > 1
+
+
+@pytest.mark.skipif(not supports_interruption(), reason="needs epoch deadline callbacks")
+class TestAsyncCancellation:
+    """Test that cancelling a coroutine interrupts its guest."""
+
+    @pytest.mark.asyncio
+    async def test_should_interrupt_a_running_guest(self, executor):
+        """Cancelling should stop an endless loop promptly."""
+        task = asyncio.create_task(executor.aexecute(ENDLESS_LOOP))
+        await asyncio.sleep(0.5)
+
+        started = time.monotonic()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert time.monotonic() - started < 5
+
+    @pytest.mark.asyncio
+    async def test_should_not_wait_for_a_sleeping_guest(self, executor):
+        """The cancelled call should end promptly even while the guest sleeps in a host call."""
+        task = asyncio.create_task(executor.aexecute("import time\ntime.sleep(10)"))
+        await asyncio.sleep(0.5)
+
+        started = time.monotonic()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The call itself runs on, shielded, until it records its metrics
+        while executor.last_metrics is None and time.monotonic() - started < 5:
+            await asyncio.sleep(0.01)
+
+        assert executor.last_metrics is not None
+        assert time.monotonic() - started < 2
+
+    @pytest.mark.asyncio
+    async def test_should_keep_working_after_a_cancellation(self, executor):
+        """The executor should run later calls normally."""
+        task = asyncio.create_task(executor.aexecute(ENDLESS_LOOP))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        output, logs, is_final_answer = await executor.aexecute("print('after')")
+
+        assert "after" in logs
+
+    @pytest.mark.asyncio
+    async def test_should_only_interrupt_the_cancelled_execution(self):
+        """Executions sharing the engine should not be affected by a cancellation."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+        try:
+            looping = asyncio.create_task(executor.aexecute(ENDLESS_LOOP))
+            working = asyncio.create_task(
+                executor.aexecute("print(sum(i for i in range(200_000)))")
+            )
+            await asyncio.sleep(0.3)
+            looping.cancel()
+
+            output, logs, is_final_answer = await working
+
+            assert str(sum(range(200_000))) in logs
+            with pytest.raises(asyncio.CancelledError):
+                await looping
+        finally:
+            executor.cleanup()
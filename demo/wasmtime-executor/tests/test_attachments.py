@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for read-only data attachments.
+"""
+
+import os
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import DataAttachments, WasmtimePythonExecutor
+
+
+class TestDataAttachments:
+    """Test the attachment directory on the host."""
+
+    def test_should_hard_link_files_on_the_same_filesystem(self, tmp_path):
+        """Attaching a file should not copy it when a hard link is possible."""
+        source = tmp_path / "sales.csv"
+        source.write_text("region,total\nnorth,3\n")
+        attachments = DataAttachments(tmp_path / "data")
+
+        guest_path = attachments.add("sales.csv", source)
+
+        assert guest_path == "/data/sales.csv"
+        assert os.stat(attachments.directory / "sales.csv").st_ino == source.stat().st_ino
+
+    def test_should_replace_and_remove_attachments(self, tmp_path):
+        """An attachment should be replaceable by name and removable."""
+        attachments = DataAttachments(tmp_path)
+        attachments.add("blob", b"old")
+        attachments.add("blob", bytearray(b"new"))
+
+        assert (tmp_path / "blob").read_bytes() == b"new"
+        attachments.remove("blob")
+        assert attachments.names() == []
+
+    @pytest.mark.parametrize("name", ["", ".hidden", "a/b", "..", "../escape"])
+    def test_should_reject_names_that_are_not_plain_file_names(self, tmp_path, name):
+        """Names with separators or leading dots should be rejected."""
+        with pytest.raises(ValueError):
+            DataAttachments(tmp_path).add(name, b"x")
+
+    def test_should_reject_missing_sources(self, tmp_path):
+        """A path that does not exist should raise FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            DataAttachments(tmp_path).add("missing", tmp_path / "missing.csv")
+
+
+class TestExecutorAttachments:
+    """Test guest access to attachments."""
+
+    def test_should_read_buffers_and_files_in_the_guest(self, tmp_path):
+        """Guest code should open attachments by name, without them being sent as variables."""
+        source = tmp_path / "table.csv"
+        source.write_text("a,b\n1,2\n")
+        executor = WasmtimePythonExecutor(additional_authorized_imports=["csv"])
+        try:
+            executor.attach_data("table.csv", source)
+            executor.attach_data("numbers.bin", bytes(range(256)) * 4)
+            output, logs, is_final_answer = executor(
+                "import csv\n"
+                "rows = list(csv.reader(open('/data/table.csv')))\n"
+                "with open('/data/numbers.bin', 'rb') as f:\n"
+                "    f.seek(1000)\n"
+                "    tail = f.read()\n"
+                "print(rows, list(tail))"
+            )
+        finally:
+            executor.cleanup()
+
+        assert logs == f"[['a', 'b'], ['1', '2']] {list(range(232, 256))}\n"
+        assert not executor.data_attachments.directory.exists()
+
+    def test_should_attach_directories(self, tmp_path):
+        """A directory should be attached with the files it contains."""
+        (tmp_path / "parts").mkdir()
+        (tmp_path / "parts" / "one.txt").write_text("1")
+        (tmp_path / "parts" / "two.txt").write_text("2")
+        executor = WasmtimePythonExecutor(additional_authorized_imports=["os"])
+        try:
+            executor.attach_data("parts", tmp_path / "parts")
+            output, logs, is_final_answer = executor("print(sorted(os.listdir('/data/parts')))")
+        finally:
+            executor.cleanup()
+
+        assert logs == "['one.txt', 'two.txt']\n"
+
+    def test_should_not_let_the_guest_write(self):
+        """Attachments should be read-only for guest code."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+        try:
+            executor.attach_data("blob", b"data")
+            output, logs, is_final_answer = executor("open('/data/blob', 'ab').write(b'x')")
+            created, _, _ = executor("open('/data/new', 'w')")
+        finally:
+            executor.cleanup()
+
+        assert "PermissionError" in output
+        assert "PermissionError" in created
+
+    def test_should_show_new_attachments_to_running_sessions(self):
+        """Attachments added after a session booted should be visible to it."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[], session=True)
+        try:
+            executor("x = 1")
+            executor.attach_data("late.txt", b"late")
+            output, logs, is_final_answer = executor("print(open('/data/late.txt').read())")
+        finally:
+            executor.cleanup()
+
+        assert logs == "late\n"
+
+    def test_should_keep_shared_attachments_on_cleanup(self, tmp_path):
+        """Attachments passed to an executor should outlive it."""
+        attachments = DataAttachments(tmp_path)
+        attachments.add("shared.txt", b"shared")
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], data_attachments=attachments
+        )
+        try:
+            output, logs, is_final_answer = executor("print(open('/data/shared.txt').read())")
+        finally:
+            executor.cleanup()
+
+        assert logs == "shared\n"
+        assert (tmp_path / "shared.txt").exists()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for concurrent batch execution.
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor
+
+
+@pytest.fixture(params=[{}, {"preinitialize": True}, {"session": True}], ids=str)
+def executor(request):
+    """Create an executor in each execution mode."""
+    executor = WasmtimePythonExecutor(
+        additional_authorized_imports=[], max_print_outputs_length=1000, **request.param
+    )
+    yield executor
+    executor.cleanup()
+
+
+class TestExecuteMany:
+    """Test running independent snippets concurrently."""
+
+    def test_should_return_results_in_order(self, executor):
+        """Results should line up with the snippets that produced them."""
+        results = executor.execute_many(
+            [f"print({i} * 10)" for i in range(6)], max_workers=3
+        )
+
+        assert [logs.strip() for _, logs, _ in results] == [
+            str(i * 10) for i in range(6)
+        ]
+
+    def test_should_report_errors_per_snippet(self, executor):
+        """A failing snippet should not affect the others."""
+        results = executor.execute_many(
+            ["print('ok')", "raise ValueError('boom')", "print('still ok')"],
+            max_workers=2,
+        )
+
+        assert "ok" in results[0][1]
+        assert "boom" in str(results[1][0]) + results[1][1]
+        assert "still ok" in results[2][1]
+
+    def test_should_isolate_snippets_from_each_other(self, executor):
+        """Globals defined by one snippet should not leak into another, even in session mode."""
+        executor("kept = 1")
+
+        results = executor.execute_many(["leaked = 1", "print('leaked' in globals())"])
+
+        assert results[1][1].strip() == "False"
+        if executor.session:
+            output, logs, _ = executor("print('leaked' in globals(), kept)")
+            assert logs.strip() == "False 1"
+
+    def test_should_share_state_variables_with_every_snippet(self, executor):
+        """Variables sent to the executor should be available to every snippet."""
+        executor.send_variables({"base": 100})
+
+        results = executor.execute_many(["print(base + 1)", "print(base + 2)"])
+
+        assert [logs.strip() for _, logs, _ in results] == ["101", "102"]
+
+    def test_should_accept_an_empty_batch(self, executor):
+        """An empty batch should return no results."""
+        assert executor.execute_many([]) == []
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for trimmed standard library bundles.
+"""
+
+import json
+import logging
+import pytest
+import sys
+import zipfile
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor, build_stdlib_bundle
+from wasmtime_executor.bundle import (
+    STDLIB_ARCHIVE,
+    _code_imports,
+    _imported_entries,
+    load_bundle_manifest,
+    main,
+    stdlib_archive_path,
+)
+from wasmtime_executor.runtime import find_wasm_runtime_dir
+
+
+@pytest.fixture(scope="module")
+def bundle_dir(tmp_path_factory):
+    """A bundle for ``re``, without lazily imported modules."""
+    output_dir = tmp_path_factory.mktemp("bundle")
+    build_stdlib_bundle(["re"], output_dir, follow_lazy_imports=False)
+    return output_dir
+
+
+def bundle_entries(bundle_dir):
+    with zipfile.ZipFile(bundle_dir / STDLIB_ARCHIVE) as archive:
+        return {info.filename: info for info in archive.infolist()}
+
+
+class TestImportScanning:
+    """Test the discovery of imports in bytecode."""
+
+    def test_should_find_imports_in_functions(self):
+        """Imports at module level and inside functions should both be found."""
+        code = compile(
+            "import os.path\nfrom json import decoder\ndef f():\n    import csv\n",
+            "<test>",
+            "exec",
+        )
+
+        imports = list(_code_imports(code))
+
+        assert ("os.path", 0, None) in imports
+        assert ("json", 0, ("decoder",)) in imports
+        assert ("csv", 0, None) in imports
+
+    def test_should_resolve_relative_imports_and_submodules(self):
+        """Relative imports and imported submodules should map to archive entries."""
+        code = compile("from . import decoder\nfrom .scanner import x\n", "<test>", "exec")
+        entries = {"json/__init__.pyc", "json/decoder.pyc", "json/scanner.pyc"}
+
+        found = set(_imported_entries(code, "json", True, entries))
+
+        assert found == entries
+
+
+class TestBundleBuilding:
+    """Test building bundles."""
+
+    def test_should_hold_requested_and_executor_modules(self, bundle_dir):
+        """The bundle should hold the requested modules and those the executor needs."""
+        entries = bundle_entries(bundle_dir)
+
+        assert "re/__init__.pyc" in entries
+        assert "pickle.pyc" in entries
+        assert "json/__init__.pyc" in entries
+        assert "cProfile.pyc" in entries
+        assert "email/__init__.pyc" not in entries
+
+    def test_should_store_precompiled_modules_uncompressed(self, bundle_dir):
+        """Entries should be bytecode stored without compression."""
+        entries = bundle_entries(bundle_dir)
+
+        assert all(name.endswith(".pyc") for name in entries)
+        assert {info.compress_type for info in entries.values()} == {zipfile.ZIP_STORED}
+
+    def test_should_be_smaller_than_the_full_archive(self, bundle_dir):
+        """The bundle should hold a fraction of the full archive."""
+        full = stdlib_archive_path(find_wasm_runtime_dir())
+        with zipfile.ZipFile(full) as archive:
+            full_count = len(archive.namelist())
+
+        manifest = load_bundle_manifest(bundle_dir)
+
+        assert manifest["imports"] == ["re"]
+        assert manifest["modules"] == len(bundle_entries(bundle_dir))
+        assert manifest["modules"] < full_count / 4
+        assert manifest["size"] < full.stat().st_size
+
+    def test_should_follow_lazy_imports_when_asked(self, bundle_dir, tmp_path):
+        """Following lazy imports should only add modules."""
+        manifest = build_stdlib_bundle(["re"], tmp_path)
+
+        assert set(bundle_entries(bundle_dir)) <= set(bundle_entries(tmp_path))
+        assert manifest["modules"] > load_bundle_manifest(bundle_dir)["modules"]
+
+    def test_should_build_from_the_command_line(self, tmp_path, capsys):
+        """The module entry point should build a bundle and print its manifest."""
+        main([str(tmp_path), "--imports", "math", "--no-lazy-imports"])
+
+        assert json.loads(capsys.readouterr().out)["imports"] == ["math"]
+        assert (tmp_path / STDLIB_ARCHIVE).is_file()
+
+    def test_should_reject_directories_without_a_bundle(self, tmp_path):
+        """Loading a directory that is not a bundle should raise ValueError."""
+        with pytest.raises(ValueError, match="manifest"):
+            load_bundle_manifest(tmp_path)
+
+
+class TestExecutorBundles:
+    """Test executors running on a bundle."""
+
+    @pytest.mark.parametrize(
+        "options",
+        [{}, {"preinitialize": True}, {"session": True}],
+        ids=["fresh", "preinitialize", "session"],
+    )
+    def test_should_import_bundled_modules_only(self, bundle_dir, options):
+        """Bundled modules should import, and modules left out should not."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=["re"], stdlib_bundle=bundle_dir, **options
+        )
+        try:
+            bundled = executor("import re\nprint(re.sub('a', 'b', 'aa'))")
+            left_out = executor("import email")
+        finally:
+            executor.cleanup()
+
+        assert bundled[1] == "bb\n"
+        assert left_out[0] == "Execution error: ModuleNotFoundError: No module named 'email'"
+
+    @pytest.mark.parametrize(
+        "options",
+        [{"output_capture": "file"}, {"preinitialize": True}, {"session": True}],
+        ids=["fresh", "preinitialize", "session"],
+    )
+    def test_should_profile_guests_on_a_bundle(self, bundle_dir, options):
+        """Profiling should work with the modules of the bundle alone."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=["re"],
+            stdlib_bundle=bundle_dir,
+            profile=True,
+            **options,
+        )
+        try:
+            output, logs, is_final_answer = executor(
+                "def work():\n    total = 0\n    for i in range(200_000):\n"
+                "        total += i\n    return total\nprint(work())"
+            )
+        finally:
+            executor.cleanup()
+
+        assert logs == "19999900000\n"
+        assert "work" in [row["function"] for row in executor.last_profile.rows]
+
+    def test_should_reject_profiling_on_bundles_without_the_profiler(self, bundle_dir, tmp_path):
+        """A bundle built without the profiler modules should be refused up front."""
+        (tmp_path / "bundle.json").write_text((bundle_dir / "bundle.json").read_text())
+        with zipfile.ZipFile(bundle_dir / STDLIB_ARCHIVE) as source, zipfile.ZipFile(
+            tmp_path / STDLIB_ARCHIVE, "w"
+        ) as bundle:
+            for name in source.namelist():
+                if name != "cProfile.pyc":
+                    bundle.writestr(source.getinfo(name), source.read(name))
+
+        with pytest.raises(ValueError, match="profiler"):
+            WasmtimePythonExecutor(
+                additional_authorized_imports=[], stdlib_bundle=tmp_path, profile=True
+            )
+
+    def test_should_reject_invalid_bundles(self, tmp_path):
+        """An executor given a directory that is not a bundle should fail to build."""
+        with pytest.raises(ValueError):
+            WasmtimePythonExecutor(additional_authorized_imports=[], stdlib_bundle=tmp_path)
+
+    def test_should_warn_about_uncovered_imports(self, bundle_dir, caplog):
+        """Authorized imports the bundle was not built for should be logged."""
+        with caplog.at_level(logging.WARNING):
+            executor = WasmtimePythonExecutor(
+                additional_authorized_imports=["csv"], stdlib_bundle=bundle_dir
+            )
+        executor.cleanup()
+
+        assert "['csv']" in caplog.text
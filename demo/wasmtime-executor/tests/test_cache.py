@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for the compiled module cache.
+
+These tests use a tiny hand-written module instead of python.wasm so that
+every cache miss stays cheap.
+"""
+
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime import Config, Engine, Module, wat2wasm
+
+from wasmtime_executor import CompiledModuleCache, WasmtimePythonExecutor, clear_runtimes
+
+
+ENGINE_SETTINGS = {"consume_fuel": True}
+
+
+@pytest.fixture
+def wasm_file(tmp_path):
+    """Write a small wasm module to disk."""
+    path = tmp_path / "add.wasm"
+    path.write_bytes(
+        wat2wasm(
+            '(module (func (export "add") (param i32 i32) (result i32)'
+            " local.get 0 local.get 1 i32.add))"
+        )
+    )
+    return path
+
+
+@pytest.fixture
+def engine():
+    """Create an engine matching ENGINE_SETTINGS."""
+    config = Config()
+    config.consume_fuel = True
+    return Engine(config)
+
+
+class TestCompiledModuleCache:
+    """Test compiled module cache behavior."""
+
+    def test_should_store_artifact_on_first_load(self, tmp_path, wasm_file, engine):
+        """The first load should compile the module and store its artifact."""
+        cache = CompiledModuleCache(tmp_path / "cache")
+
+        module = cache.load(engine, wasm_file, ENGINE_SETTINGS)
+
+        assert isinstance(module, Module)
+        assert cache.artifact_path(wasm_file, ENGINE_SETTINGS).exists()
+
+    def test_should_not_recompile_on_cache_hit(self, tmp_path, wasm_file, engine):
+        """A later load should deserialize the artifact instead of compiling."""
+        cache = CompiledModuleCache(tmp_path / "cache")
+        cache.load(engine, wasm_file, ENGINE_SETTINGS)
+
+        with patch.object(Module, "from_file") as from_file:
+            module = cache.load(engine, wasm_file, ENGINE_SETTINGS)
+
+        from_file.assert_not_called()
+        assert [export.name for export in module.exports] == ["add"]
+
+    def test_should_key_on_engine_settings_and_file_contents(
+        self, tmp_path, wasm_file
+    ):
+        """Different settings or wasm contents should map to different artifacts."""
+        cache = CompiledModuleCache(tmp_path / "cache")
+        key = cache.key(wasm_file, ENGINE_SETTINGS)
+
+        assert cache.key(wasm_file, {"consume_fuel": False}) != key
+
+        wasm_file.write_bytes(wat2wasm("(module)"))
+        assert cache.key(wasm_file, ENGINE_SETTINGS) != key
+
+    def test_should_replace_corrupted_artifacts(self, tmp_path, wasm_file, engine):
+        """An artifact that fails to deserialize should be rebuilt."""
+        cache = CompiledModuleCache(tmp_path / "cache")
+        artifact = cache.artifact_path(wasm_file, ENGINE_SETTINGS)
+        artifact.parent.mkdir(parents=True)
+        artifact.write_bytes(b"not a compiled module")
+
+        module = cache.load(engine, wasm_file, ENGINE_SETTINGS)
+
+        assert isinstance(module, Module)
+        assert artifact.read_bytes() != b"not a compiled module"
+
+    def test_should_clear_artifacts(self, tmp_path, wasm_file, engine):
+        """Clearing the cache should remove stored artifacts."""
+        cache = CompiledModuleCache(tmp_path / "cache")
+        cache.load(engine, wasm_file, ENGINE_SETTINGS)
+
+        cache.clear()
+
+        assert not cache.artifact_path(wasm_file, ENGINE_SETTINGS).exists()
+
+
+class TestExecutorModuleCache:
+    """Test how the executor uses the compiled module cache."""
+
+    def test_should_use_module_cache_by_default(self, tmp_path):
+        """The executor should store the compiled python.wasm in its cache directory."""
+        # Runtimes built by earlier tests would be reused without touching the cache
+        clear_runtimes()
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], module_cache_dir=tmp_path
+        )
+
+        assert executor.module_cache.cache_dir == tmp_path
+        assert list(tmp_path.glob("*.cwasm"))
+
+        executor.cleanup()
+
+    def test_should_allow_disabling_module_cache(self, tmp_path):
+        """The executor should compile directly when the cache is disabled."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[],
+            use_module_cache=False,
+            module_cache_dir=tmp_path,
+        )
+
+        assert executor.module_cache is None
+        assert not list(tmp_path.glob("*.cwasm"))
+
+        executor.cleanup()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for compilation profiles and settings.
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor
+from wasmtime_executor.compilation import COMPILE_PROFILES, resolve_compile_settings
+
+
+class TestCompileSettings:
+    """Test resolving profiles and overrides into engine settings."""
+
+    def test_should_keep_wasmtime_defaults_in_the_default_profile(self):
+        """The default profile should not set anything."""
+        assert resolve_compile_settings() == {}
+
+    def test_should_apply_overrides_on_top_of_a_profile(self):
+        """Overrides should replace the settings of the profile."""
+        settings = resolve_compile_settings("fast-start", {"parallel_compilation": False})
+
+        assert settings == {"cranelift_opt_level": "none", "parallel_compilation": False}
+        assert COMPILE_PROFILES["fast-start"]["parallel_compilation"] is True
+
+    def test_should_disable_relaxed_simd_with_simd(self):
+        """Disabling SIMD should disable relaxed SIMD, which wasmtime cannot keep alone."""
+        assert resolve_compile_settings("default", {"wasm_simd": False}) == {
+            "wasm_simd": False,
+            "wasm_relaxed_simd": False,
+        }
+        with pytest.raises(ValueError, match="without SIMD"):
+            resolve_compile_settings("default", {"wasm_simd": False, "wasm_relaxed_simd": True})
+
+    @pytest.mark.parametrize(
+        "profile, overrides",
+        [
+            ("turbo", None),
+            ("default", {"wasm_bulk_memory": False}),
+            ("default", {"cranelift_opt_level": "fast"}),
+            ("default", {"parallel_compilation": 1}),
+        ],
+    )
+    def test_should_reject_unknown_profiles_settings_and_values(self, profile, overrides):
+        """Unknown names and values should fail before an engine is built."""
+        with pytest.raises(ValueError):
+            resolve_compile_settings(profile, overrides)
+
+
+class TestExecutorCompileProfile:
+    """Test compilation profiles on the executor."""
+
+    def test_should_add_the_profile_to_the_engine_settings(self):
+        """The profile settings should reach the engine and run code normally."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], compile_profile="fast-start"
+        )
+        try:
+            output, logs, is_final_answer = executor("print(sum(range(10)))")
+        finally:
+            executor.cleanup()
+
+        assert executor.engine_settings["cranelift_opt_level"] == "none"
+        assert executor.runtime.engine_settings["cranelift_opt_level"] == "none"
+        assert logs == "45\n"
+
+    def test_should_reject_an_unknown_profile(self):
+        """An unknown profile should raise ValueError."""
+        with pytest.raises(ValueError, match="compile profile"):
+            WasmtimePythonExecutor(additional_authorized_imports=[], compile_profile="turbo")
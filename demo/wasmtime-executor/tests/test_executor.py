@@ -14,7 +14,7 @@ from unittest.mock import Mock, patch
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from wasmtime_executor import WasmtimePythonExecutor
+from wasmtime_executor import WasmtimePythonExecutor, clear_runtimes
 
 
 class TestWasmtimePythonExecutorInitialization:
@@ -289,8 +289,8 @@ print(f"calculator(5, 3) = {result}")
 """
         output, logs, is_final_answer = executor(code)
 
-        # The tool should be accessible (note: in current implementation, tools are placeholders)
-        assert "calculator" in logs or "calculator" in str(output)
+        # The tool runs on the host and returns its result to the guest
+        assert logs == "calculator(5, 3) = 8\n"
 
     def test_should_handle_tool_with_complex_return_types(self, executor):
         """The executor should handle tools that return complex types."""
@@ -307,8 +307,7 @@ print(f"Tool result: {result}")
 """
         output, logs, is_final_answer = executor(code)
 
-        # Tool should be called (as placeholder in current implementation)
-        assert "complex_tool" in logs or "complex_tool" in str(output)
+        assert logs == "Tool result: {'result': [1, 2, 3], 'status': 'success'}\n"
 
     def test_should_handle_tool_exceptions(self, executor):
         """The executor should handle exceptions raised by tools."""
@@ -327,8 +326,8 @@ except Exception as e:
 """
         output, logs, is_final_answer = executor(code)
 
-        # Should handle the tool call attempt
-        assert "failing_tool" in logs or "failing_tool" in str(output)
+        # The host exception is raised in the guest with the same type and message
+        assert logs == "Tool error: Tool failed\n"
 
     def test_should_handle_empty_tools(self, executor):
         """The executor should handle empty tools dictionary."""
@@ -411,8 +410,10 @@ class TestWasmtimePythonExecutorErrorHandling:
 
     def test_should_handle_wasm_initialization_errors(self):
         """The executor should handle WASM initialization errors gracefully."""
+        # Engines are shared per process, so drop them to force a fresh one
+        clear_runtimes()
         with patch(
-            "wasmtime_executor.executor.Engine",
+            "wasmtime_executor.runtime.Engine",
             side_effect=Exception("WASM init failed"),
         ):
             with pytest.raises(Exception):
@@ -492,15 +493,19 @@ class TestWasmtimePythonExecutorIntegrationCompatibility:
         assert len(result1) == 3
         assert len(result2) == 3
 
-    def test_should_maintain_state_across_calls(self, executor):
-        """The executor should maintain state across multiple calls."""
-        # First call: set a variable
-        executor("x = 10")
+    def test_should_maintain_state_across_calls(self):
+        """A session executor should maintain state across multiple calls."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[], session=True)
+        try:
+            # First call: set a variable
+            executor("x = 10")
 
-        # Second call: use the variable
-        output, logs, is_final_answer = executor("print(x)")
+            # Second call: use the variable
+            output, logs, is_final_answer = executor("print(x)")
+        finally:
+            executor.cleanup()
 
-        assert "10" in logs or "10" in str(output)
+        assert "10" in logs
 
     def test_should_handle_concurrent_variable_and_tool_usage(self, executor):
         """The executor should handle variables and tools together."""
@@ -520,8 +525,7 @@ print(f"Result: {result}")
 """
         output, logs, is_final_answer = executor(code)
 
-        # Should execute without errors (tools are placeholders in current implementation)
-        assert logs is not None or output is not None
+        assert logs == "Result: 15\n"
 
 
 if __name__ == "__main__":
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for pre-initialized guest interpreters.
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor
+from wasmtime_executor.interpreter import GuestInterpreter, SessionInterpreter
+
+
+@pytest.fixture
+def executor():
+    """Create an executor that keeps an interpreter booted ahead of each call."""
+    executor = WasmtimePythonExecutor(
+        additional_authorized_imports=["math", "json", "random"],
+        max_print_outputs_length=1000,
+        preinitialize=True,
+    )
+    yield executor
+    executor.cleanup()
+
+
+class TestGuestInterpreter:
+    """Test the behavior of a single pre-booted interpreter."""
+
+    def test_should_run_program_after_booting(self, executor):
+        """A booted interpreter should run the program written to its stdin."""
+        interpreter = GuestInterpreter(
+            executor.runtime, executor.wasm_runtime_dir, ["random"]
+        )
+
+        stdout, stderr, error_message, _ = interpreter.run(
+            "import sys\nprint('random' in sys.modules)"
+        )
+
+        assert stdout.strip() == "True"
+        assert error_message is None
+
+    def test_should_report_guest_errors(self, executor):
+        """A program raising an exception should report the exit trap and traceback."""
+        interpreter = GuestInterpreter(executor.runtime, executor.wasm_runtime_dir, [])
+
+        stdout, stderr, error_message, _ = interpreter.run("raise ValueError('boom')")
+
+        assert "ValueError: boom" in stderr
+        assert error_message is not None
+
+    def test_should_skip_unavailable_preload_imports(self, executor):
+        """Preloading a module missing from the guest should not break the boot."""
+        interpreter = GuestInterpreter(
+            executor.runtime, executor.wasm_runtime_dir, ["numpy"]
+        )
+
+        stdout, stderr, error_message, _ = interpreter.run("print('still booted')")
+
+        assert "still booted" in stdout
+
+    def test_should_refuse_to_run_twice(self, executor):
+        """An interpreter should only ever run one program."""
+        interpreter = GuestInterpreter(executor.runtime, executor.wasm_runtime_dir, [])
+        interpreter.run("pass")
+
+        with pytest.raises(RuntimeError):
+            interpreter.run("pass")
+
+    def test_should_signal_readiness_after_booting(self, executor):
+        """Waiting for readiness should return once the preloaded imports are done."""
+        interpreter = GuestInterpreter(executor.runtime, executor.wasm_runtime_dir, [])
+
+        try:
+            assert interpreter.wait_ready() is True
+            assert interpreter.ready is True
+        finally:
+            interpreter.close()
+
+    def test_should_close_without_running(self, executor):
+        """Closing an unused interpreter should stop the guest."""
+        interpreter = GuestInterpreter(executor.runtime, executor.wasm_runtime_dir, [])
+
+        interpreter.close()
+
+        assert not interpreter._thread.is_alive()
+
+
+class TestPreinitializedExecutor:
+    """Test executor behavior in preinitialize mode."""
+
+    def test_should_execute_code_like_fresh_instances(self, executor):
+        """Pre-initialized calls should produce the usual output triple."""
+        executor.send_variables({"base": 40})
+
+        output, logs, is_final_answer = executor("print(base + 2)")
+
+        assert "42" in logs
+        assert is_final_answer is False
+
+    def test_should_detect_final_answer(self, executor):
+        """Final answers should be reported from pre-initialized interpreters."""
+        executor.send_tools({"final_answer": lambda x: x})
+
+        output, logs, is_final_answer = executor("final_answer([1, 2])")
+
+        assert is_final_answer is True
+        assert output == [1, 2]
+
+    def test_should_not_share_guest_globals_between_calls(self, executor):
+        """Every call should run in a fresh interpreter."""
+        executor("leaked = 1")
+
+        output, logs, is_final_answer = executor("print(leaked)")
+
+        assert "name 'leaked' is not defined" in logs + str(output)
+
+    def test_should_serve_calls_from_the_pool(self, executor):
+        """After a call, the pool should already be booting a replacement."""
+        executor("pass")
+
+        stats = executor.pool_stats()
+        assert stats["hits"] + stats["misses"] == 1
+        assert stats["ready"] + stats["booting"] == 1
+
+    def test_should_stop_pool_on_cleanup(self, executor):
+        """Cleanup should release the pooled interpreters."""
+        executor.cleanup()
+
+        assert executor.interpreter_pool is None
+        assert executor.pool_stats() is None
+
+
+@pytest.fixture
+def session_executor():
+    """Create an executor that runs every call in one long-lived interpreter."""
+    executor = WasmtimePythonExecutor(
+        additional_authorized_imports=["math", "json"],
+        max_print_outputs_length=1000,
+        session=True,
+    )
+    yield executor
+    executor.cleanup()
+
+
+class TestSessionInterpreter:
+    """Test the behavior of a long-lived session interpreter."""
+
+    def test_should_keep_globals_between_chunks(self, executor):
+        """Names defined by one chunk should be visible to the next."""
+        session = SessionInterpreter(executor.runtime, executor.wasm_runtime_dir, [])
+
+        try:
+            session.run("counter = 41")
+            stdout, stderr, error_message, _ = session.run("counter += 1\nprint(counter)")
+        finally:
+            session.close()
+
+        assert stdout == "42\n"
+        assert error_message is None
+
+    def test_should_separate_output_per_chunk(self, executor):
+        """Each chunk should only report its own output."""
+        session = SessionInterpreter(executor.runtime, executor.wasm_runtime_dir, [])
+
+        try:
+            first = session.run("print('first')")
+            second = session.run("import sys\nprint('second', file=sys.stderr)")
+        finally:
+            session.close()
+
+        assert first[:2] == ("first\n", "")
+        assert second[:2] == ("", "second\n")
+
+    def test_should_survive_exceptions_and_exit(self, executor):
+        """Errors and sys.exit in a chunk should not end the session."""
+        session = SessionInterpreter(executor.runtime, executor.wasm_runtime_dir, [])
+
+        try:
+            _, stderr, error_message, _ = session.run("raise KeyError('missing')")
+            assert "KeyError: 'missing'" in stderr
+            assert error_message is not None
+
+            _, _, error_message, _ = session.run("import sys\nsys.exit(0)")
+            assert error_message is None
+
+            stdout, _, _, _ = session.run("print('alive')")
+            assert stdout == "alive\n"
+        finally:
+            session.close()
+
+    def test_should_report_guest_death(self, executor):
+        """A session whose guest traps should report the trap and stop."""
+        session = SessionInterpreter(
+            executor.runtime, executor.wasm_runtime_dir, [], fuel=200_000_000
+        )
+
+        stdout, stderr, error_message, _ = session.run("while True:\n    pass")
+
+        assert error_message is not None
+        assert not session.alive
+
+
+class TestSessionExecutor:
+    """Test executor behavior in session mode."""
+
+    def test_should_maintain_state_across_calls(self, session_executor):
+        """Variables assigned by code should persist natively between calls."""
+        session_executor("x = 10")
+
+        output, logs, is_final_answer = session_executor("print(x)")
+
+        assert logs == "10\n"
+
+    def test_should_keep_values_without_source_representation(self, session_executor):
+        """Objects that cannot be rebuilt from repr should survive between calls."""
+        session_executor("handle = object()\nhandle_id = id(handle)")
+
+        output, logs, is_final_answer = session_executor(
+            "print(id(handle) == handle_id)"
+        )
+
+        assert "True" in logs
+
+    def test_should_send_new_variables_once(self, session_executor):
+        """Variables should only be injected into the call after send_variables."""
+        session_executor.send_variables({"step": 1})
+        session_executor("step += 1")
+
+        output, logs, is_final_answer = session_executor("print(step)")
+
+        assert "2" in logs
+
+    def test_should_resend_updated_variables(self, session_executor):
+        """Variables updated through send_variables should reach the session."""
+        session_executor.send_variables({"step": 1})
+        session_executor("pass")
+        session_executor.send_variables({"step": 5})
+
+        output, logs, is_final_answer = session_executor("print(step)")
+
+        assert "5" in logs
+
+    def test_should_detect_final_answer(self, session_executor):
+        """Final answers should be reported from the session."""
+        session_executor.send_tools({"final_answer": lambda x: x})
+
+        output, logs, is_final_answer = session_executor("final_answer({'a': 1})")
+
+        assert is_final_answer is True
+        assert output == {"a": 1}
+
+    def test_should_restart_dead_sessions(self, session_executor):
+        """A session that died should be replaced on the next call."""
+        session_executor.send_variables({"kept": "yes"})
+        session_executor._session.close()
+
+        output, logs, is_final_answer = session_executor("print(kept)")
+
+        assert "yes" in logs
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for epoch-based interruption and wall-clock timeouts.
+"""
+
+import threading
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime import Config, Engine, Linker, Module, Store, wat2wasm
+
+from wasmtime_executor import WasmtimePythonExecutor
+from wasmtime_executor.interrupt import (
+    EpochTicker,
+    Interrupt,
+    supports_interruption,
+    watch_store,
+)
+from wasmtime_executor.streams import supports_memory_streams
+
+
+needs_interruption = pytest.mark.skipif(
+    not supports_interruption(), reason="needs epoch deadline callbacks"
+)
+
+ENDLESS_LOOP = "while True:\n    pass"
+
+# Guest code announcing a frame it never sends, then waiting for its next chunk
+FORGED_FRAME_HEADER = (
+    "import sys\n"
+    "sys.__stdout__.buffer.write(b'\\xfe\\xfdo\\x00\\x00\\x10\\x00')\n"
+    "sys.__stdout__.flush()"
+)
+
+
+@pytest.fixture
+def engine():
+    """Create an engine with epoch interruption."""
+    config = Config()
+    config.epoch_interruption = True
+    return Engine(config)
+
+
+def run_endless_loop(engine, interrupt):
+    """Run a wasm infinite loop until ``interrupt`` stops it; returns the trap message."""
+    module = Module(engine, wat2wasm('(module (func (export "run") (loop br 0)))'))
+    store = Store(engine)
+    watch = watch_store(store, interrupt.check)
+    instance = Linker(engine).instantiate(store, module)
+    try:
+        instance.exports(store)["run"](store)
+    except Exception as e:
+        return str(e)
+    finally:
+        del watch
+    return None
+
+
+class TestInterrupt:
+    """Test interrupts and the epoch ticker."""
+
+    def test_should_report_cancellation_reason(self, engine):
+        """A cancelled interrupt should report the first reason it was given."""
+        interrupt = Interrupt(engine)
+        assert interrupt.check() is None
+
+        interrupt.cancel("first")
+        interrupt.cancel("second")
+
+        assert interrupt.cancelled
+        assert interrupt.check() == "first"
+
+    def test_should_expire_after_timeout(self, engine):
+        """An interrupt with a timeout should report it once the time has passed."""
+        interrupt = Interrupt(engine, timeout=0.05)
+        assert interrupt.check() is None
+
+        time.sleep(0.1)
+
+        assert "timed out" in interrupt.check()
+
+    def test_should_only_tick_while_in_use(self, engine):
+        """The ticker thread should stop once no execution needs it."""
+        ticker = EpochTicker(engine, interval=0.005)
+
+        with ticker.running():
+            assert ticker.active
+
+        deadline = time.monotonic() + 2
+        while ticker.active and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not ticker.active
+
+    @needs_interruption
+    def test_should_stop_a_guest_at_its_timeout(self, engine):
+        """A guest should trap once its timeout passes while the ticker runs."""
+        ticker = EpochTicker(engine)
+        interrupt = Interrupt(engine, timeout=0.2)
+
+        with ticker.running():
+            message = run_endless_loop(engine, interrupt)
+
+        assert "timed out" in message
+
+    @needs_interruption
+    def test_should_only_stop_the_cancelled_guest(self, engine):
+        """Cancelling one guest should leave others on the same engine running."""
+        first, second = Interrupt(engine), Interrupt(engine)
+        results = {}
+        threads = [
+            threading.Thread(target=lambda: results.update(first=run_endless_loop(engine, first))),
+            threading.Thread(target=lambda: results.update(second=run_endless_loop(engine, second))),
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+
+        first.cancel()
+        threads[0].join(5)
+        assert "first" in results and "second" not in results
+
+        second.cancel()
+        threads[1].join(5)
+        assert "second" in results
+
+
+class TestExecutorInterruptionModes:
+    """Test how the interruption mode bounds calls."""
+
+    def test_should_reject_unknown_modes(self):
+        """An unknown interruption mode should be refused."""
+        with pytest.raises(ValueError):
+            WasmtimePythonExecutor(additional_authorized_imports=[], interruption="never")
+
+    def test_should_disable_fuel_metering_in_epoch_mode(self):
+        """Epoch mode should build an engine without fuel metering."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], interruption="epoch"
+        )
+        try:
+            assert executor.runtime.engine_settings["consume_fuel"] is False
+            assert executor.fuel == 0
+
+            output, logs, is_final_answer = executor("print(6 * 7)")
+
+            assert "42" in logs
+        finally:
+            executor.cleanup()
+
+    def test_should_stop_calls_when_fuel_runs_out(self):
+        """Fuel mode should stop a call once its fuel budget is spent."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], interruption="fuel", fuel=200_000_000
+        )
+        try:
+            output, logs, is_final_answer = executor(ENDLESS_LOOP)
+
+            assert "fuel" in str(output)
+        finally:
+            executor.cleanup()
+
+    @needs_interruption
+    @pytest.mark.parametrize("interruption", ["epoch", "both"])
+    @pytest.mark.parametrize(
+        "mode", [{}, {"preinitialize": True}, {"session": True}], ids=str
+    )
+    def test_should_stop_calls_at_their_timeout(self, interruption, mode):
+        """Epoch modes should stop a call after its wall-clock timeout."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[],
+            interruption=interruption,
+            fuel=10**12,
+            timeout=0.5,
+            **mode,
+        )
+        try:
+            started = time.monotonic()
+            output, logs, is_final_answer = executor(ENDLESS_LOOP)
+            elapsed = time.monotonic() - started
+
+            assert output == "Execution error: Execution timed out after 0.5 seconds"
+            assert elapsed < 5
+
+            output, logs, is_final_answer = executor("print('next')")
+            assert "next" in logs
+        finally:
+            executor.cleanup()
+
+    @needs_interruption
+    @pytest.mark.parametrize(
+        "mode",
+        [{"output_capture": "file"}]
+        + ([{"output_capture": "memory"}] if supports_memory_streams() else []),
+        ids=str,
+    )
+    def test_should_abandon_fresh_instances_blocked_in_host_calls(self, mode):
+        """A fresh instance sleeping past the timeout should not hold the call until it wakes."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], interruption="epoch", timeout=0.5, **mode
+        )
+        try:
+            started = time.monotonic()
+            output, logs, is_final_answer = executor("import time\ntime.sleep(10)")
+            elapsed = time.monotonic() - started
+
+            assert output == "Execution error: Execution timed out after 0.5 seconds"
+            assert elapsed < 2
+
+            output, logs, is_final_answer = executor("print('next')")
+            assert "next" in logs
+        finally:
+            executor.cleanup()
+
+    @needs_interruption
+    @pytest.mark.parametrize("mode", [{"preinitialize": True}, {"session": True}], ids=str)
+    @pytest.mark.parametrize(
+        "code", [FORGED_FRAME_HEADER, "import time\ntime.sleep(10)"], ids=["frame", "sleep"]
+    )
+    def test_should_stop_guests_blocked_in_host_calls(self, mode, code):
+        """A guest waiting in a host call, where epochs cannot trap it, should still time out."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], interruption="both", timeout=0.5, **mode
+        )
+        try:
+            started = time.monotonic()
+            output, logs, is_final_answer = executor(code)
+            elapsed = time.monotonic() - started
+
+            assert output == "Execution error: Execution timed out after 0.5 seconds"
+            assert elapsed < 5
+
+            output, logs, is_final_answer = executor("print('next')")
+            assert "next" in logs
+        finally:
+            executor.cleanup()
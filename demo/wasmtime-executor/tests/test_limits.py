@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for store limits and the pooling allocator.
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime import Engine, Store
+
+from wasmtime_executor import StoreLimits, WasmtimePythonExecutor
+from wasmtime_executor.limits import supports_pooling_allocator
+
+
+needs_pooling = pytest.mark.skipif(
+    not supports_pooling_allocator(), reason="needs the pooling allocator bindings"
+)
+
+GREEDY_CODE = "data = bytearray(200 << 20)\nprint(len(data))"
+
+
+class TestStoreLimits:
+    """Test the store limits object."""
+
+    def test_should_leave_resources_unlimited_by_default(self):
+        """Limits left out should stay unlimited."""
+        limits = StoreLimits(memory_size=1 << 20)
+
+        assert limits.as_dict() == {
+            "memory_size": 1 << 20,
+            "table_elements": None,
+            "instances": None,
+            "tables": None,
+            "memories": None,
+        }
+        assert repr(limits) == "StoreLimits(memory_size=1048576)"
+
+    def test_should_reject_negative_limits(self):
+        """Negative limits should be rejected."""
+        with pytest.raises(ValueError, match="table_elements"):
+            StoreLimits(table_elements=-1)
+
+    def test_should_apply_to_stores(self):
+        """Applying limits to a store should succeed, with or without values."""
+        store = Store(Engine())
+
+        StoreLimits().apply(store)
+        StoreLimits(memory_size=1 << 20, instances=1).apply(store)
+
+
+class TestExecutorMemoryLimits:
+    """Test memory limits of executor guests."""
+
+    @pytest.mark.parametrize(
+        "options",
+        [{}, {"preinitialize": True}, {"session": True}],
+        ids=["fresh", "preinitialize", "session"],
+    )
+    def test_should_fail_guests_growing_past_the_limit(self, options):
+        """A guest allocating past its memory limit should get a MemoryError."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[],
+            store_limits=StoreLimits(memory_size=64 << 20),
+            **options,
+        )
+        try:
+            output, logs, is_final_answer = executor(GREEDY_CODE)
+            after = executor("print('still fine')")
+        finally:
+            executor.cleanup()
+
+        assert output == "Execution error: MemoryError: "
+        assert after[1] == "still fine\n"
+
+    def test_should_allow_allocations_without_limits(self):
+        """Without limits, the same allocation should succeed."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+        try:
+            output, logs, is_final_answer = executor(GREEDY_CODE)
+        finally:
+            executor.cleanup()
+
+        assert output == str(200 << 20)
+
+
+class TestPoolingAllocator:
+    """Test executors using the pooling allocator."""
+
+    def test_should_reject_unknown_strategies(self):
+        """Unknown allocation strategies should be rejected."""
+        with pytest.raises(ValueError, match="allocation strategy"):
+            WasmtimePythonExecutor(
+                additional_authorized_imports=[], allocation_strategy="arena"
+            )
+
+    def test_should_reject_empty_pools(self):
+        """A pooling allocator without slots should be rejected."""
+        with pytest.raises(ValueError, match="slot"):
+            WasmtimePythonExecutor(
+                additional_authorized_imports=[],
+                allocation_strategy="pooling",
+                pooling_slots=0,
+            )
+
+    @needs_pooling
+    def test_should_recycle_slots_between_calls(self):
+        """Calls should reuse the slot of the previous store."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[],
+            allocation_strategy="pooling",
+            pooling_slots=1,
+            store_limits=StoreLimits(memory_size=128 << 20),
+        )
+        try:
+            results = [executor(f"print({i} * 2)") for i in range(3)]
+        finally:
+            executor.cleanup()
+
+        assert [logs for _, logs, _ in results] == ["0\n", "2\n", "4\n"]
+
+    @needs_pooling
+    def test_should_use_a_separate_engine(self):
+        """Pooling executors should not share the engine of on-demand executors."""
+        pooled = WasmtimePythonExecutor(
+            additional_authorized_imports=[], allocation_strategy="pooling"
+        )
+        on_demand = WasmtimePythonExecutor(additional_authorized_imports=[])
+        try:
+            assert pooled.engine_settings["allocation_strategy"] == "pooling"
+            assert "allocation_strategy" not in on_demand.engine_settings
+            assert pooled.runtime is not on_demand.runtime
+        finally:
+            pooled.cleanup()
+            on_demand.cleanup()
+
+    @needs_pooling
+    def test_should_bound_memory_with_the_slot_size(self):
+        """Pooled guests should fail past the memory limit that sizes their slots."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[],
+            allocation_strategy="pooling",
+            store_limits=StoreLimits(memory_size=64 << 20),
+        )
+        try:
+            output, logs, is_final_answer = executor(GREEDY_CODE)
+        finally:
+            executor.cleanup()
+
+        assert output == "Execution error: MemoryError: "
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for execution metrics.
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import (
+    ExecutionMetrics,
+    MetricsRegistry,
+    WasmtimePythonExecutor,
+    get_process_metrics,
+)
+
+
+def make_metrics(mode="fresh", **values):
+    """Create metrics with the given field values."""
+    metrics = ExecutionMetrics(mode)
+    for name, value in values.items():
+        setattr(metrics, name, value)
+    return metrics
+
+
+class TestMetricsRegistry:
+    """Test the aggregation of execution metrics."""
+
+    def test_should_count_calls_per_mode(self):
+        """Calls, failures and final answers should be counted per mode."""
+        registry = MetricsRegistry()
+
+        registry.record(make_metrics("fresh"))
+        registry.record(make_metrics("fresh", failed=True))
+        registry.record(make_metrics("session", final_answer=True))
+        snapshot = registry.snapshot()
+
+        assert snapshot["calls"] == {"fresh": 2, "session": 1}
+        assert snapshot["failures"] == {"fresh": 1}
+        assert snapshot["final_answers"] == {"session": 1}
+
+    def test_should_sum_and_track_maxima(self):
+        """Each metric should keep its sum, maximum and the number of calls reporting it."""
+        registry = MetricsRegistry()
+
+        registry.record(make_metrics(run_seconds=1.0, fuel_consumed=100))
+        registry.record(make_metrics(run_seconds=3.0, fuel_consumed=None))
+        metrics = registry.snapshot()["metrics"]
+
+        assert metrics["run_seconds"] == {"count": 2, "sum": 4.0, "max": 3.0}
+        assert metrics["fuel_consumed"] == {"count": 1, "sum": 100, "max": 100}
+
+    def test_should_reset(self):
+        """Reset should forget every recorded call."""
+        registry = MetricsRegistry()
+        registry.record(make_metrics(stdout_bytes=5))
+
+        registry.reset()
+
+        assert registry.snapshot() == {
+            "calls": {},
+            "failures": {},
+            "final_answers": {},
+            "metrics": {},
+        }
+
+    def test_should_render_prometheus_text(self):
+        """The aggregate should render in the Prometheus text format."""
+        registry = MetricsRegistry()
+        registry.record(make_metrics("pooled", stdout_bytes=12))
+
+        text = registry.render(prefix="sandbox")
+
+        assert 'sandbox_calls_total{mode="pooled"} 1' in text
+        assert "sandbox_stdout_bytes_sum 12" in text
+        assert "sandbox_stdout_bytes_count 1" in text
+        assert "sandbox_stdout_bytes_max 12" in text
+        assert text.endswith("\n")
+
+
+class TestExecutorMetrics:
+    """Test the metrics reported by executor calls."""
+
+    @pytest.mark.parametrize("output_capture", ["auto", "file"])
+    def test_should_measure_fresh_instances(self, output_capture):
+        """Fresh instances should report timings, fuel, memory and output sizes."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], output_capture=output_capture
+        )
+        try:
+            executor("import sys\nprint('x' * 9)\nprint('err', file=sys.stderr)")
+        finally:
+            executor.cleanup()
+
+        metrics = executor.last_metrics
+        assert metrics.mode == "fresh"
+        assert metrics.setup_seconds > 0
+        assert metrics.instantiate_seconds > 0
+        assert metrics.run_seconds > 0
+        assert metrics.total_seconds >= metrics.run_seconds
+        assert 0 < metrics.fuel_consumed <= executor.fuel
+        assert metrics.peak_memory_pages > 0
+        assert metrics.stdout_bytes == 10
+        assert metrics.stderr_bytes == 4
+        assert metrics.failed is False
+
+    def test_should_report_failures_and_final_answers(self):
+        """Failed calls and final answers should be flagged."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+        executor.send_tools({"final_answer": lambda x: x})
+        try:
+            executor("raise ValueError('nope')")
+            failed = executor.last_metrics
+            executor("final_answer(1)")
+            answered = executor.last_metrics
+        finally:
+            executor.cleanup()
+
+        assert failed.failed is True
+        assert failed.final_answer is False
+        assert answered.failed is False
+        assert answered.final_answer is True
+
+    def test_should_not_report_fuel_without_metering(self):
+        """Calls bounded by epochs only should not report fuel."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], interruption="epoch"
+        )
+        try:
+            executor("print(1)")
+        finally:
+            executor.cleanup()
+
+        assert executor.last_metrics.fuel_consumed is None
+        assert executor.last_metrics.peak_memory_pages > 0
+
+    def test_should_measure_session_chunks(self):
+        """Session calls should report their run time, and setup only for the first chunk."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[], session=True)
+        try:
+            executor("x = 1")
+            first = executor.last_metrics
+            executor("print(x)")
+            second = executor.last_metrics
+        finally:
+            executor.cleanup()
+
+        assert first.mode == "session"
+        assert first.instantiate_seconds > 0
+        assert second.instantiate_seconds == 0
+        assert second.run_seconds > 0
+        assert second.stdout_bytes == 2
+        assert second.fuel_consumed is None
+
+    def test_should_aggregate_calls_in_the_process(self):
+        """Every call should be added to the process metrics."""
+        registry = get_process_metrics()
+        before = registry.snapshot()["calls"].get("pooled", 0)
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], preinitialize=True
+        )
+        try:
+            executor("print(1)")
+            executor.execute_many(["print(2)", "print(3)"])
+        finally:
+            executor.cleanup()
+
+        assert registry.snapshot()["calls"]["pooled"] == before + 3
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for the interpreter pool.
+
+Most tests use stand-in interpreters so that they exercise the pool logic
+without booting python.wasm.
+"""
+
+import threading
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import InterpreterPool, WasmtimePythonExecutor
+
+
+class FakeInterpreter:
+    """Stand-in for GuestInterpreter that boots instantly."""
+
+    def __init__(self, boots=True):
+        self.alive = boots
+        self.closed = False
+        self._boots = boots
+
+    def wait_ready(self):
+        return self._boots
+
+    def close(self):
+        self.closed = True
+        self.alive = False
+
+
+def wait_until(predicate, timeout=5.0):
+    """Poll ``predicate`` until it holds or ``timeout`` expires."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not reached in time")
+        time.sleep(0.01)
+
+
+class TestInterpreterPool:
+    """Test interpreter pool behavior."""
+
+    def test_should_fill_to_size_in_background(self):
+        """A new pool should boot interpreters until it holds ``size`` of them."""
+        pool = InterpreterPool(FakeInterpreter, size=3, refill_workers=2)
+
+        try:
+            wait_until(lambda: pool.stats()["ready"] == 3)
+        finally:
+            pool.close()
+
+    def test_should_count_hits_and_refill(self):
+        """Checking out a ready interpreter should be a hit and trigger a refill."""
+        pool = InterpreterPool(FakeInterpreter, size=2)
+
+        try:
+            wait_until(lambda: pool.stats()["ready"] == 2)
+            interpreter = pool.acquire()
+
+            assert isinstance(interpreter, FakeInterpreter)
+            assert pool.stats()["hits"] == 1
+            wait_until(lambda: pool.stats()["ready"] == 2)
+        finally:
+            pool.close()
+
+    def test_should_count_misses_when_empty(self):
+        """Checking out from an empty pool should create an interpreter on the spot."""
+        release = threading.Event()
+
+        def slow_factory():
+            release.wait()
+            return FakeInterpreter()
+
+        pool = InterpreterPool(slow_factory, size=1)
+
+        try:
+            worker = threading.Thread(target=pool.acquire)
+            worker.start()
+            wait_until(lambda: pool.stats()["misses"] == 1)
+            release.set()
+            worker.join()
+        finally:
+            release.set()
+            pool.close()
+
+    def test_should_discard_dead_interpreters(self):
+        """Interpreters that died while waiting should never be handed out."""
+        pool = InterpreterPool(FakeInterpreter, size=1)
+
+        try:
+            wait_until(lambda: pool.stats()["ready"] == 1)
+            pool._ready[0].alive = False
+
+            interpreter = pool.acquire()
+
+            assert interpreter.alive
+            assert pool.stats()["misses"] == 1
+        finally:
+            pool.close()
+
+    def test_should_count_refill_errors(self):
+        """Interpreters that fail to boot should be counted and dropped."""
+        pool = InterpreterPool(lambda: FakeInterpreter(boots=False), size=2)
+
+        try:
+            wait_until(lambda: pool.stats()["refill_errors"] == 2)
+            assert pool.stats()["ready"] == 0
+        finally:
+            pool.close()
+
+    def test_should_close_ready_interpreters(self):
+        """Closing the pool should close every interpreter it still holds."""
+        pool = InterpreterPool(FakeInterpreter, size=2)
+        wait_until(lambda: pool.stats()["ready"] == 2)
+        ready = list(pool._ready)
+
+        pool.close()
+
+        assert all(interpreter.closed for interpreter in ready)
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+    def test_should_reject_invalid_sizes(self):
+        """A pool needs at least one slot and one refill worker."""
+        with pytest.raises(ValueError):
+            InterpreterPool(FakeInterpreter, size=0)
+        with pytest.raises(ValueError):
+            InterpreterPool(FakeInterpreter, refill_workers=0)
+
+
+class TestExecutorInterpreterPool:
+    """Test how the executor uses the interpreter pool."""
+
+    def test_should_hit_the_pool_once_warm(self):
+        """Calls made after the pool has booted should be served from it."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], preinitialize=True, pool_size=2
+        )
+
+        try:
+            wait_until(lambda: executor.pool_stats()["ready"] == 2, timeout=30)
+            output, logs, is_final_answer = executor("print('pooled')")
+
+            assert "pooled" in logs
+            assert executor.pool_stats()["hits"] == 1
+        finally:
+            executor.cleanup()
+
+    def test_should_keep_serving_after_raw_stdout_writes_and_timeouts(self):
+        """A guest writing around its frames or timing out should not take a pool slot with it."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[],
+            preinitialize=True,
+            pool_size=1,
+            interruption="both",
+            timeout=0.5,
+        )
+
+        try:
+            output, logs, is_final_answer = executor("import os\nos.write(1, b'hello\\n')")
+            assert logs == "hello\n"
+
+            output, logs, is_final_answer = executor("import time\ntime.sleep(10)")
+            assert output == "Execution error: Execution timed out after 0.5 seconds"
+
+            wait_until(lambda: executor.pool_stats()["ready"] == 1, timeout=30)
+            output, logs, is_final_answer = executor("print('pooled')")
+            assert "pooled" in logs
+        finally:
+            executor.cleanup()
+
+    def test_should_not_create_pool_by_default(self):
+        """Executors should only keep a pool in preinitialize mode."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+
+        assert executor.pool_stats() is None
+
+        executor.cleanup()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for guest and engine profiling.
+"""
+
+import os
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import GuestProfile, WasmtimePythonExecutor
+from wasmtime_executor.profiling import parse_profile
+from wasmtime_executor.result import RESULT_ENCODER_SOURCE
+
+
+SLOW_CODE = """
+def slow(n):
+    return sum(i * i for i in range(n))
+
+total = slow(50_000)
+"""
+
+
+def encode(value):
+    """Encode ``value`` with the guest encoder, run on the host."""
+    namespace = {}
+    exec(RESULT_ENCODER_SOURCE, namespace)
+    return namespace["_encode_result"](value)
+
+
+class TestProfileRecords:
+    """Test decoding and rendering guest profiles."""
+
+    def test_should_decode_rows(self):
+        """A profile record should decode into named columns."""
+        profile = parse_profile(
+            encode((2, 0.5, [("<string>", 3, "slow", 4, 1, 0.25, 0.5)]))
+        )
+
+        assert isinstance(profile, GuestProfile)
+        assert profile.functions == 2
+        assert profile.total_seconds == 0.5
+        assert profile.rows == [
+            {
+                "file": "<string>",
+                "line": 3,
+                "function": "slow",
+                "calls": 4,
+                "primitive_calls": 1,
+                "own_seconds": 0.25,
+                "cumulative_seconds": 0.5,
+            }
+        ]
+
+    def test_should_render_a_pstats_table(self):
+        """Formatting should list calls, times and the location of every function."""
+        profile = parse_profile(encode((1, 0.5, [("<string>", 3, "slow", 4, 1, 0.25, 0.5)])))
+
+        table = profile.format()
+
+        assert "1 functions in 0.500 seconds" in table
+        assert "      4/1    0.250    0.500 <string>:3(slow)" in table
+
+    def test_should_discard_malformed_records(self):
+        """Records that are not profiles should be dropped."""
+        assert parse_profile(None) is None
+        assert parse_profile(encode(("answer", 1))) is None
+        assert parse_profile(b"garbage") is None
+
+
+class TestGuestProfiling:
+    """Test executors profiling their guests."""
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {"output_capture": "memory"},
+            {"output_capture": "file"},
+            {"preinitialize": True},
+            {"session": True},
+        ],
+        ids=["memory", "file", "preinitialize", "session"],
+    )
+    def test_should_return_the_hot_functions(self, options):
+        """The profile should rank the slow user function near the top."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], profile=True, profile_rows=5, **options
+        )
+        try:
+            output, logs, is_final_answer = executor(SLOW_CODE + "print(total)")
+        finally:
+            executor.cleanup()
+
+        profile = executor.last_profile
+        assert logs == f"{sum(i * i for i in range(50_000))}\n"
+        assert len(profile.rows) == 5
+        assert "slow" in [row["function"] for row in profile.rows[:2]]
+        assert executor.last_metrics.profile is profile
+
+    def test_should_profile_failing_code(self):
+        """Code raising an exception should still be profiled."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[], profile=True)
+        try:
+            output, logs, is_final_answer = executor(SLOW_CODE + "raise ValueError('late')")
+        finally:
+            executor.cleanup()
+
+        assert output == "Execution error: ValueError: late"
+        assert "slow" in [row["function"] for row in executor.last_profile.rows]
+
+    def test_should_not_profile_by_default(self):
+        """Executors should not profile unless asked to."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+        try:
+            executor(SLOW_CODE)
+        finally:
+            executor.cleanup()
+
+        assert executor.last_profile is None
+
+
+class TestEngineProfiler:
+    """Test the native profiler of the engine."""
+
+    def test_should_reject_unknown_profilers(self):
+        """Unknown engine profilers should be rejected."""
+        with pytest.raises(ValueError, match="engine profiler"):
+            WasmtimePythonExecutor(additional_authorized_imports=[], engine_profiler="gprof")
+
+    def test_should_write_a_perf_map(self):
+        """The perfmap profiler should describe the compiled code for perf."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], engine_profiler="perfmap"
+        )
+        try:
+            output, logs, is_final_answer = executor("print(1)")
+        finally:
+            executor.cleanup()
+
+        assert executor.engine_settings["profiler"] == "perfmap"
+        assert logs == "1\n"
+        assert os.path.getsize(f"/tmp/perf-{os.getpid()}.map") > 0
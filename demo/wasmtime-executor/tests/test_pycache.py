@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for the persistent bytecode cache.
+"""
+
+import importlib.util
+import os
+import pytest
+import sys
+import time
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import BytecodeCache, WasmtimePythonExecutor
+from wasmtime_executor.interpreter import GUEST_ENV
+from wasmtime_executor.pycache import MIN_ENTRY_SIZE
+
+
+def age(path, seconds):
+    """Make ``path`` look unused for ``seconds``."""
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+class TestBytecodeCache:
+    """Test the bytecode cache directory."""
+
+    def test_should_name_modules_after_their_source(self, tmp_path):
+        """Publishing should write a bytecode module named after a digest of its source."""
+        cache = BytecodeCache(tmp_path)
+
+        first = cache.publish("_helpers", "x = 1\n")
+        again = cache.publish("_helpers", "x = 1\n")
+        other = cache.publish("_helpers", "x = 2\n")
+
+        assert first == again != other
+        assert first.startswith("_helpers_")
+        data = (cache.modules_directory / f"{first}.pyc").read_bytes()
+        assert data[:4] == importlib.util.MAGIC_NUMBER
+        assert not (cache.modules_directory / f"{first}.py").exists()
+
+    def test_should_keep_published_modules_out_of_the_shared_directory(self, tmp_path):
+        """Published modules should not live where guests can write."""
+        cache = BytecodeCache(tmp_path)
+        cache.publish("_helpers", "x = 1\n")
+
+        assert tmp_path not in cache.modules_directory.parents
+        assert not list(tmp_path.rglob("*.pyc"))
+
+    def test_should_write_modules_again_when_they_change(self, tmp_path):
+        """A module file that was deleted or changed should be written again when published."""
+        cache = BytecodeCache(tmp_path)
+        module = cache.publish("_helpers", "x = 1\n")
+        path = cache.modules_directory / f"{module}.pyc"
+        original = path.read_bytes()
+
+        path.write_bytes(original[:16] + b"HIJACKED")
+        cache.publish("_helpers", "x = 1\n")
+        assert path.read_bytes() == original
+
+        path.unlink()
+        cache.publish("_helpers", "x = 1\n")
+        assert path.read_bytes() == original
+
+    def test_should_not_publish_without_guest_bytecode(self, tmp_path):
+        """A host that cannot compile for the guest should leave modules to be compiled inline."""
+        cache = BytecodeCache(tmp_path, compile_modules=False)
+
+        assert cache.publish("_helpers", "x = 1\n") is None
+
+    def test_should_enable_bytecode_writing_in_the_guest(self, tmp_path):
+        """The guest environment should write bytecode under the cache directory."""
+        env = dict(BytecodeCache(tmp_path).guest_env(GUEST_ENV))
+
+        assert "PYTHONDONTWRITEBYTECODE" not in env
+        assert env["PYTHONPYCACHEPREFIX"] == "/__pycache__"
+        assert env["PYTHONPATH"] == dict(GUEST_ENV)["PYTHONPATH"]
+
+    def test_should_evict_least_recently_used_files(self, tmp_path):
+        """Eviction should delete the oldest files until the cache fits its limit."""
+        cache = BytecodeCache(tmp_path, max_bytes=10_000)
+        paths = []
+        for i, seconds in enumerate((300, 200, 100)):
+            paths.append(cache.bytecode_directory / f"module{i}.pyc")
+            paths[-1].write_bytes(b"#" * 5000)
+            age(paths[-1], seconds)
+
+        freed = cache.evict()
+
+        assert freed == 5000
+        assert [path.exists() for path in paths] == [False, True, True]
+        assert cache.size() <= 10_000
+
+    def test_should_charge_and_evict_small_entries(self, tmp_path):
+        """Empty files and directories should count against the limit and be evicted."""
+        cache = BytecodeCache(tmp_path, max_bytes=0)
+        for i in range(20):
+            directory = cache.bytecode_directory / f"d{i}" / "nested"
+            directory.mkdir(parents=True)
+            (directory / "empty.pyc").touch()
+
+        assert cache.size() == 20 * 3 * MIN_ENTRY_SIZE
+        assert cache.evict() == 20 * 3 * MIN_ENTRY_SIZE
+        assert list(cache.bytecode_directory.iterdir()) == []
+
+    def test_should_keep_a_cache_within_its_limit(self, tmp_path):
+        """A cache within its size limit should not lose any file."""
+        cache = BytecodeCache(tmp_path)
+        (cache.bytecode_directory / "module.pyc").write_bytes(b"#" * 100)
+
+        assert cache.evict() == 0
+        assert (cache.bytecode_directory / "module.pyc").exists()
+
+    def test_should_delete_published_modules_on_close(self, tmp_path):
+        """Closing the cache should delete its published modules, but keep the shared bytecode."""
+        cache = BytecodeCache(tmp_path)
+        cache.publish("_helpers", "x = 1\n")
+
+        cache.close()
+
+        assert not cache.modules_directory.exists()
+        assert cache.bytecode_directory.exists()
+
+    def test_should_reject_negative_sizes(self, tmp_path):
+        """A negative size limit should be rejected."""
+        with pytest.raises(ValueError):
+            BytecodeCache(tmp_path, max_bytes=-1)
+
+
+class TestExecutorBytecodeCache:
+    """Test executors sharing a bytecode cache."""
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {"output_capture": "memory"},
+            {"output_capture": "file"},
+            {"preinitialize": True},
+            {"session": True},
+        ],
+        ids=["memory", "file", "preinitialize", "session"],
+    )
+    def test_should_run_final_answers_and_errors(self, tmp_path, options):
+        """Cached wrapper code should keep final answers and errors working."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[],
+            use_bytecode_cache=True,
+            bytecode_cache_dir=tmp_path,
+            **options,
+        )
+        executor.send_tools({"final_answer": None})
+        try:
+            failing = executor("raise ValueError('bad')")
+            answered = executor("print('q')\nfinal_answer(6 * 7)")
+        finally:
+            executor.cleanup()
+
+        assert failing[0] == "Execution error: ValueError: bad"
+        assert answered == (42, "q\n", True)
+
+    def test_should_publish_the_wrapper_code_as_bytecode(self, tmp_path):
+        """The wrapper code should be imported from published bytecode, not compiled by guests."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[],
+            use_bytecode_cache=True,
+            bytecode_cache_dir=tmp_path,
+        )
+        try:
+            output, logs, is_final_answer = executor("import sys\nprint(sorted(sys.modules))")
+            published = {
+                path.stem for path in executor.bytecode_cache.modules_directory.glob("*.pyc")
+            }
+        finally:
+            executor.cleanup()
+
+        assert published
+        assert all(module in logs for module in published)
+        assert not list(tmp_path.rglob("*.pyc"))
+
+    def test_should_not_let_a_guest_change_what_later_calls_run(self, tmp_path):
+        """Published modules and the runtime should be read-only for guests."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[],
+            use_bytecode_cache=True,
+            bytecode_cache_dir=tmp_path,
+        )
+        executor.send_tools({"final_answer": lambda x: x})
+        attack = """import os
+blocked = 0
+targets = ["/__modules__/" + name for name in os.listdir("/__modules__")]
+targets += ["/_wasmtime_hijack.py", "/usr/local/lib/python311.zip"]
+for path in targets:
+    try:
+        with open(path, "ab") as f:
+            f.write(b"\\nfinal_answer = lambda value: 'HIJACKED'\\n")
+    except OSError:
+        blocked += 1
+print(blocked, len(targets))
+"""
+        try:
+            output, logs, is_final_answer = executor(attack)
+            answered = executor("final_answer(1 + 1)")
+        finally:
+            executor.cleanup()
+
+        blocked, targets = logs.split()
+        assert blocked == targets
+        assert answered[0] == 2
+
+    def test_should_trim_bytecode_written_by_guests_after_every_call(self, tmp_path):
+        """Whatever a guest writes to the cache should be trimmed once its call returns."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[],
+            use_bytecode_cache=True,
+            bytecode_cache_dir=tmp_path,
+            bytecode_cache_size=64 << 10,
+        )
+        try:
+            executor(
+                "for i in range(100):\n"
+                "    open(f'/__pycache__/junk{i}.bin', 'wb').write(b'x' * 4096)"
+            )
+            size = executor.bytecode_cache.size()
+        finally:
+            executor.cleanup()
+
+        assert size <= 64 << 10
+
+    def test_should_consume_less_fuel_once_cached(self, tmp_path):
+        """Calls loading the wrapper code as bytecode should run fewer instructions."""
+        fuel = {}
+        for cached in (False, True):
+            executor = WasmtimePythonExecutor(
+                additional_authorized_imports=[],
+                output_capture="memory",
+                use_bytecode_cache=cached,
+                bytecode_cache_dir=tmp_path,
+            )
+            try:
+                executor("print(1)")
+                executor("print(1)")
+                fuel[cached] = executor.last_metrics.fuel_consumed
+            finally:
+                executor.cleanup()
+
+        assert fuel[True] < fuel[False]
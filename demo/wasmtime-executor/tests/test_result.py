@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for the structured result channel.
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor
+from wasmtime_executor.result import (
+    RESULT_ENCODER_SOURCE,
+    decode_result,
+    parse_result_record,
+)
+from wasmtime_executor.streams import (
+    FRAME_MARKER,
+    MAX_FRAME_SIZE,
+    FrameParser,
+    OutputBuffer,
+    supports_memory_streams,
+)
+
+
+def encode(value):
+    """Encode ``value`` with the guest encoder, run on the host."""
+    namespace = {}
+    exec(RESULT_ENCODER_SOURCE, namespace)
+    return namespace["_encode_result"](value)
+
+
+class TestResultEncoding:
+    """Test the typed encoding of result records."""
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            None,
+            True,
+            False,
+            0,
+            -1,
+            255,
+            -(2**100),
+            3.5,
+            float("inf"),
+            2 - 3j,
+            "line one\nFINAL_ANSWER: not really",
+            "é☃😀",
+            b"\x00\xff",
+            [1, [2, [3]]],
+            (1, "two", None),
+            {1, 2, 3},
+            frozenset({"a"}),
+            {"key": [1.5, {"nested": (True,)}], 7: None},
+        ],
+    )
+    def test_should_roundtrip_builtin_values(self, value):
+        """Builtin values should decode to an equal value of the same type."""
+        decoded = decode_result(encode(value))
+
+        assert decoded == value
+        assert type(decoded) is type(value)
+
+    def test_should_send_other_objects_as_their_str(self):
+        """Objects of other types should travel as their str."""
+
+        class Point:
+            def __str__(self):
+                return "Point(1, 2)"
+
+        assert decode_result(encode(Point())) == "Point(1, 2)"
+        assert decode_result(encode([Point()])) == ["Point(1, 2)"]
+
+    def test_should_fall_back_to_str_for_recursive_containers(self):
+        """A container holding itself should travel as its str."""
+        value = [1]
+        value.append(value)
+
+        assert decode_result(encode(value)) == "[1, [...]]"
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"",
+            b"x",
+            b"s\x00\x00\x00\x05ab",
+            b"l\xff\xff\xff\xff",
+            b"NN",
+            b"d\x00\x00\x00\x01l\x00\x00\x00\x00N",
+            b"f\x00",
+        ],
+    )
+    def test_should_reject_malformed_data(self, data):
+        """Truncated, unknown or trailing bytes should raise ValueError."""
+        with pytest.raises(ValueError):
+            decode_result(data)
+
+    def test_should_reject_deeply_nested_data(self):
+        """Nesting past the decoder limit should raise ValueError."""
+        with pytest.raises(ValueError):
+            decode_result(b"l\x00\x00\x00\x01" * 1000 + b"N")
+
+
+class TestResultRecords:
+    """Test the interpretation of result records."""
+
+    def test_should_parse_final_answers(self):
+        """An answer record should give the answer."""
+        assert parse_result_record(encode(("answer", [1, 2]))) == (True, [1, 2], None)
+
+    def test_should_parse_errors(self):
+        """An error record should give the error message."""
+        record = encode(("error", "KeyError", "'missing'"))
+
+        assert parse_result_record(record) == (False, None, "KeyError: 'missing'")
+
+    def test_should_accept_missing_records(self):
+        """No record should mean neither an answer nor an error."""
+        assert parse_result_record(None) == (False, None, None)
+
+    def test_should_reject_unknown_records(self):
+        """Records of another shape should raise ValueError."""
+        with pytest.raises(ValueError):
+            parse_result_record(encode(["answer", 1]))
+
+
+def frame(tag: bytes, payload: bytes) -> bytes:
+    """Encode a frame the way guests send them."""
+    return FRAME_MARKER + tag + len(payload).to_bytes(4, "big") + payload
+
+
+class TestFrameParser:
+    """Test the demultiplexing of framed guest stdout."""
+
+    def test_should_route_frames_split_across_writes(self):
+        """Frames should be reassembled whatever the write boundaries."""
+        parser = FrameParser(OutputBuffer(), OutputBuffer())
+        data = frame(b"o", b"hi\n") + frame(b"e", b"oops") + frame(b"v", b"N")
+
+        for i in range(len(data)):
+            parser.write(data[i : i + 1])
+        parser.close()
+
+        assert parser.stdout.getvalue() == "hi\n"
+        assert parser.stderr.getvalue() == "oops"
+        assert parser.result == b"N"
+
+    def test_should_pass_unframed_output_through_and_resync(self):
+        """Bytes that are not a frame should reach stdout, and later frames still be parsed."""
+        parser = FrameParser(OutputBuffer(), OutputBuffer())
+
+        parser.write(frame(b"o", b"ok"))
+        parser.write(b"o\x00\x00\x10\x00raw output\n")
+        parser.write(frame(b"o", b"x") + frame(b"v", b"N"))
+        parser.close()
+
+        assert parser.stdout.getvalue() == "oko\x00\x00\x10\x00raw output\nx"
+        assert parser.result == b"N"
+
+    def test_should_treat_markers_without_a_valid_header_as_output(self):
+        """A marker followed by an unknown tag or an oversized length should not swallow frames."""
+        parser = FrameParser(OutputBuffer(), OutputBuffer())
+
+        parser.write(FRAME_MARKER + b"a\x00\x00\x00\x01")
+        parser.write(FRAME_MARKER + b"o\xff\xff\xff\xff")
+        parser.write(frame(b"v", b"N"))
+        parser.close()
+
+        assert parser.result == b"N"
+        assert parser.stdout.written == 2 * (len(FRAME_MARKER) + 5)
+
+    def test_should_not_hold_output_frames_above_the_size_limit(self):
+        """An output frame announcing more than MAX_FRAME_SIZE should be passed on as output."""
+        parser = FrameParser(OutputBuffer(), OutputBuffer())
+        header = FRAME_MARKER + b"o" + (MAX_FRAME_SIZE + 1).to_bytes(4, "big")
+
+        parser.write(header + b"x" * 100)
+
+        assert parser.stdout.written == len(header) + 100
+        assert not parser._pending
+
+    def test_should_hold_result_frames_above_the_output_limit(self):
+        """Result records may be larger than an output frame."""
+        parser = FrameParser(OutputBuffer(), OutputBuffer())
+        payload = b"r" * (MAX_FRAME_SIZE + 1)
+
+        parser.write(frame(b"v", payload))
+
+        assert parser.result == payload
+
+
+class TestExecutorResults:
+    """Test final answers and errors returned by every execution mode."""
+
+    MODES = [
+        {"output_capture": "file"},
+        pytest.param(
+            {"output_capture": "memory"},
+            marks=pytest.mark.skipif(
+                not supports_memory_streams(), reason="needs custom WASI outputs"
+            ),
+        ),
+        {"preinitialize": True, "pool_size": 1},
+        {"session": True},
+    ]
+
+    @pytest.fixture(params=MODES, ids=["file", "memory", "preinitialize", "session"])
+    def executor(self, request):
+        """Create an executor with final_answer available, in each execution mode."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], **request.param
+        )
+        executor.send_tools({"final_answer": lambda x: x})
+        yield executor
+        executor.cleanup()
+
+    def test_should_return_typed_final_answers(self, executor):
+        """Final answers should keep their type, even for strings spanning lines."""
+        output, logs, is_final_answer = executor(
+            "print('working')\nfinal_answer({'text': 'a\\nb', 'values': (1, 2.5)})"
+        )
+
+        assert is_final_answer is True
+        assert output == {"text": "a\nb", "values": (1, 2.5)}
+        assert logs == "working\n"
+
+    def test_should_not_evaluate_answers(self, executor):
+        """A string answer should be returned as is, never evaluated."""
+        output, logs, is_final_answer = executor("final_answer('__import__(\"os\")')")
+
+        assert is_final_answer is True
+        assert output == '__import__("os")'
+
+    def test_should_ignore_printed_markers(self, executor):
+        """Printed lines that look like the old markers should stay plain output."""
+        output, logs, is_final_answer = executor("print('FINAL_ANSWER:42')")
+
+        assert is_final_answer is False
+        assert output == "FINAL_ANSWER:42"
+        assert "FINAL_ANSWER:42" in logs
+
+    def test_should_keep_answers_after_raw_stdout_writes(self, executor):
+        """Bytes written to the stdout file descriptor directly should stay plain output."""
+        output, logs, is_final_answer = executor(
+            "import os, sys\n"
+            "os.write(1, b'hello\\n')\n"
+            "sys.__stdout__.write('a\\n')\n"
+            "sys.__stdout__.flush()\n"
+            "print('after')\n"
+            "final_answer(1 + 1)"
+        )
+
+        assert is_final_answer is True
+        assert output == 2
+        assert logs == "hello\na\nafter\n"
+
+    def test_should_report_raised_errors(self, executor):
+        """Exceptions raised by the code should be reported with their type and message."""
+        output, logs, is_final_answer = executor("raise KeyError('missing')")
+
+        assert is_final_answer is False
+        assert output == "Execution error: KeyError: 'missing'"
+
+    def test_should_report_errors_without_final_answer_tool(self):
+        """Errors should be reported even when no final_answer tool was sent."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+        try:
+            output, logs, is_final_answer = executor("print(undefined_name)")
+        finally:
+            executor.cleanup()
+
+        assert output == "Execution error: NameError: name 'undefined_name' is not defined"
+        assert "FinalAnswerException" not in logs
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for the shared runtime registry.
+"""
+
+import threading
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime import wat2wasm
+
+from wasmtime_executor import (
+    WasmtimePythonExecutor,
+    clear_runtimes,
+    get_runtime,
+)
+
+
+@pytest.fixture
+def wasm_file(tmp_path):
+    """Write a small wasm module to disk."""
+    path = tmp_path / "empty.wasm"
+    path.write_bytes(wat2wasm("(module)"))
+    return path
+
+
+class TestRuntimeRegistry:
+    """Test process-wide runtime sharing behavior."""
+
+    def test_should_return_same_runtime_for_same_settings(self, wasm_file):
+        """Equal paths and settings should share one engine and module."""
+        runtime1 = get_runtime(wasm_file, {"consume_fuel": True})
+        runtime2 = get_runtime(wasm_file, {"consume_fuel": True})
+
+        assert runtime1 is runtime2
+
+    def test_should_separate_runtimes_by_settings(self, wasm_file):
+        """Different engine settings should not share a runtime."""
+        runtime1 = get_runtime(wasm_file, {"consume_fuel": True})
+        runtime2 = get_runtime(wasm_file, {"consume_fuel": False})
+
+        assert runtime1 is not runtime2
+        assert runtime1.engine is not runtime2.engine
+
+    def test_should_build_runtime_once_under_concurrency(self, wasm_file):
+        """Concurrent lookups should all receive the same runtime."""
+        clear_runtimes()
+        runtimes = []
+
+        def lookup():
+            runtimes.append(get_runtime(wasm_file, {"consume_fuel": True}))
+
+        threads = [threading.Thread(target=lookup) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len({id(runtime) for runtime in runtimes}) == 1
+
+    def test_should_build_fresh_runtime_after_clear(self, wasm_file):
+        """Clearing the registry should make new lookups build a new runtime."""
+        runtime1 = get_runtime(wasm_file, {"consume_fuel": True})
+        clear_runtimes()
+        runtime2 = get_runtime(wasm_file, {"consume_fuel": True})
+
+        assert runtime1 is not runtime2
+
+
+class TestExecutorRuntimeSharing:
+    """Test how executors borrow shared runtimes."""
+
+    def test_should_share_engine_and_module_between_executors(self):
+        """Executors in one process should borrow the same engine and module."""
+        executor1 = WasmtimePythonExecutor(additional_authorized_imports=[])
+        executor2 = WasmtimePythonExecutor(additional_authorized_imports=["math"])
+
+        try:
+            assert executor1.engine is executor2.engine
+            assert executor1.python_module is executor2.python_module
+        finally:
+            executor1.cleanup()
+            executor2.cleanup()
+
+    def test_should_keep_per_call_stores_isolated(self):
+        """Sharing the runtime should not leak variables between executors."""
+        executor1 = WasmtimePythonExecutor(additional_authorized_imports=[])
+        executor2 = WasmtimePythonExecutor(additional_authorized_imports=[])
+
+        try:
+            executor1.send_variables({"only_in_first": 1})
+            output, logs, is_final_answer = executor2("print(only_in_first)")
+
+            assert "NameError" in logs or "NameError" in str(output)
+        finally:
+            executor1.cleanup()
+            executor2.cleanup()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for the session manager and session snapshots.
+"""
+
+import pytest
+import sys
+import threading
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import SessionManager, StoreLimits, WasmtimePythonExecutor
+
+
+SESSION_CODE = """
+import re
+counter = [1, 2]
+def double(x, factor=2):
+    return x * factor
+pattern = re.compile("a+").pattern
+"""
+
+
+class TestSessionSnapshots:
+    """Test exporting the globals of a session and importing them into another."""
+
+    def test_should_carry_data_functions_and_modules_over(self):
+        """Data, plain functions and imported modules should survive a snapshot."""
+        source = WasmtimePythonExecutor(additional_authorized_imports=["re"], session=True)
+        try:
+            source(SESSION_CODE)
+            snapshot = source.export_session()
+        finally:
+            source.cleanup()
+
+        target = WasmtimePythonExecutor(additional_authorized_imports=["re"], session=True)
+        try:
+            target.import_session(snapshot)
+            output, logs, is_final_answer = target(
+                "print(counter, double(3), pattern, re.escape('.'))"
+            )
+        finally:
+            target.cleanup()
+
+        assert logs == "[1, 2] 6 a+ \\.\n"
+
+    def test_should_keep_guest_changes_to_sent_variables(self):
+        """A sent variable changed by the guest should keep its guest value."""
+        source = WasmtimePythonExecutor(additional_authorized_imports=[], session=True)
+        try:
+            source.send_variables({"items": [1]})
+            source("items.append(2)")
+            snapshot = source.export_session()
+        finally:
+            source.cleanup()
+
+        target = WasmtimePythonExecutor(additional_authorized_imports=[], session=True)
+        try:
+            target.state = dict(source.state)
+            target.import_session(snapshot)
+            output, logs, is_final_answer = target("print(items)")
+        finally:
+            target.cleanup()
+
+        assert logs == "[1, 2]\n"
+
+    def test_should_drop_what_the_guest_cannot_save(self):
+        """Instances of session classes should be dropped, not break the snapshot."""
+        source = WasmtimePythonExecutor(additional_authorized_imports=[], session=True)
+        try:
+            source("class Point:\n    pass\norigin = Point()\nkept = 1")
+            snapshot = source.export_session()
+        finally:
+            source.cleanup()
+
+        target = WasmtimePythonExecutor(additional_authorized_imports=[], session=True)
+        try:
+            target.import_session(snapshot)
+            output, logs, is_final_answer = target("print(kept, 'origin' in globals())")
+        finally:
+            target.cleanup()
+
+        assert logs == "1 False\n"
+
+    def test_should_require_session_mode(self):
+        """Executors without a session should refuse to export globals."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+        with pytest.raises(ValueError):
+            executor.export_session()
+
+
+class TestSessionManager:
+    """Test sessions spilled to disk and restored by the manager."""
+
+    def test_should_restore_evicted_sessions_transparently(self):
+        """The least recently used session should be spilled and come back on its next call."""
+        with SessionManager([], max_live_sessions=1) as manager:
+            manager.execute("alice", "x = 41\ndef bump(v):\n    return v + 1")
+            manager.execute("bob", "x = 'bob'")
+
+            assert manager.stats()["live"] == 1
+            assert manager.stats()["spilled"] == 1
+
+            output, logs, is_final_answer = manager.execute("alice", "print(bump(x))")
+            stats = manager.stats()
+
+        assert logs == "42\n"
+        assert stats == {"live": 1, "spilled": 1, "evictions": 2, "restores": 1}
+
+    def test_should_restore_sent_variables_and_tools(self):
+        """Variables sent to a session and the manager tools should survive eviction."""
+        with SessionManager([], max_live_sessions=1) as manager:
+            manager.send_tools({"shout": lambda text: text.upper()})
+            manager.send_variables("alice", {"name": "alice"})
+            manager.execute("bob", "pass")
+
+            output, logs, is_final_answer = manager.execute("alice", "print(shout(name))")
+
+        assert logs == "ALICE\n"
+
+    def test_should_resume_sessions_from_a_kept_spill_directory(self, tmp_path):
+        """Sessions live at close should be resumed by a manager on the same directory."""
+        with SessionManager([], spill_dir=tmp_path) as manager:
+            manager.execute("alice", "total = 7")
+
+        with SessionManager([], spill_dir=tmp_path) as manager:
+            output, logs, is_final_answer = manager.execute("alice", "print(total)")
+            manager.close_session("alice")
+            stats = manager.stats()
+
+        assert logs == "7\n"
+        assert stats["spilled"] == 0
+
+    def test_should_keep_sessions_with_unspillable_state_alive(self):
+        """A session whose host variables cannot be pickled should not be evicted."""
+        with SessionManager([], max_live_sessions=1) as manager:
+            manager.send_variables("alice", {"lock": threading.Lock()})
+            manager.execute("bob", "pass")
+            stats = manager.stats()
+
+        assert stats["live"] == 2
+        assert stats["evictions"] == 0
+
+    def test_should_derive_the_live_sessions_from_the_memory_budget(self):
+        """max_memory should allow as many sessions as the store memory limits fit."""
+        manager = SessionManager(
+            [],
+            max_memory=1 << 30,
+            store_limits=StoreLimits(memory_size=256 << 20),
+        )
+        manager.close()
+
+        assert manager.max_live_sessions == 4
+        with pytest.raises(ValueError):
+            SessionManager([], max_memory=1 << 30)
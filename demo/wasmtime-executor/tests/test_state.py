@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for binary state transfer into the guest.
+"""
+
+import datetime
+import math
+import pickle
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor
+from wasmtime_executor.state import (
+    GUEST_STATE_DECODER_SOURCE,
+    StateTracker,
+    dumps_for_guest,
+)
+
+
+class HostOnly:
+    """A class the guest cannot import."""
+
+    def __repr__(self):
+        return "'host-only'"
+
+
+class Unloadable:
+    """An object whose pickle fails to load."""
+
+    def __reduce__(self):
+        return int, ("not a number",)
+
+
+def host_helper(value):
+    """A function the guest cannot import."""
+    return value
+
+
+def encode(variables, synced=None):
+    """Encode ``variables`` with a fresh tracker."""
+    tracker = StateTracker()
+    tracker.refresh(variables)
+    return tracker.encode(synced)
+
+
+def decode(blob):
+    """Decode a state blob the way the guest does."""
+    return {key: pickle.loads(value) for key, value in pickle.loads(blob).items()}
+
+
+class TestStateEncoding:
+    """Test how variables are split between the blob and source injection."""
+
+    def test_should_pickle_builtin_and_stdlib_values(self):
+        """Values the guest can rebuild should all go into the blob."""
+        variables = {
+            "numbers": list(range(10)),
+            "nested": {"a": (1, 2), "b": {3, 4}},
+            "raw": b"\x00\x01",
+            "when": datetime.date(2024, 1, 2),
+            "nan": float("nan"),
+        }
+
+        blob, remaining = encode(variables)
+
+        assert remaining == {}
+        loaded = decode(blob)
+        assert loaded["numbers"] == list(range(10))
+        assert loaded["when"] == datetime.date(2024, 1, 2)
+        assert math.isnan(loaded["nan"])
+
+    def test_should_leave_host_only_values_for_source_injection(self):
+        """Values of types the guest cannot import should not be pickled."""
+        blob, remaining = encode({"x": 1, "obj": HostOnly()})
+
+        assert decode(blob) == {"x": 1}
+        assert list(remaining) == ["obj"]
+
+    def test_should_reject_host_only_values_nested_in_containers(self):
+        """Host-only values inside containers should be detected too."""
+        with pytest.raises(pickle.PicklingError):
+            dumps_for_guest([1, {"inner": HostOnly()}])
+
+    def test_should_reject_host_functions(self):
+        """Functions are pickled by reference to their module, which the guest lacks."""
+        with pytest.raises(pickle.PicklingError):
+            dumps_for_guest(host_helper)
+        assert list(encode({"helper": host_helper, "n": 2})[1]) == ["helper"]
+
+    def test_should_decode_the_other_variables_when_one_fails(self, capsys):
+        """A variable the guest cannot load should not take the rest down with it."""
+        namespace = {}
+        exec(GUEST_STATE_DECODER_SOURCE, namespace)
+        blob = pickle.dumps({"n": pickle.dumps(2), "broken": pickle.dumps(Unloadable())})
+
+        state = namespace["_decode_state"](blob)
+
+        assert state == {"n": 2}
+        assert "Could not load variable broken" in capsys.readouterr().err
+
+    def test_should_return_no_blob_for_empty_state(self):
+        """No variables should mean no blob at all."""
+        assert encode({}) == (None, {})
+
+
+class TestStateTracking:
+    """Test that only new or changed variables are encoded for synced interpreters."""
+
+    def test_should_skip_variables_already_synced(self):
+        """Encoding twice against the same digests should send nothing the second time."""
+        tracker = StateTracker()
+        synced = {}
+        tracker.refresh({"a": [1, 2], "obj": HostOnly()})
+
+        first = tracker.encode(synced)
+        tracker.refresh({"a": [1, 2], "obj": HostOnly()})
+        second = tracker.encode(synced)
+
+        assert decode(first[0]) == {"a": [1, 2]}
+        assert list(first[1]) == ["obj"]
+        assert second == (None, {})
+
+    def test_should_send_only_changed_variables(self):
+        """New, replaced and mutated variables should be sent again, and nothing else."""
+        tracker = StateTracker()
+        synced = {}
+        items = [1]
+        tracker.refresh({"items": items, "same": "text", "old": 1})
+        tracker.encode(synced)
+
+        items.append(2)
+        tracker.refresh({"items": items, "same": "text", "old": 2, "new": None})
+        blob, remaining = tracker.encode(synced)
+
+        assert decode(blob) == {"items": [1, 2], "old": 2, "new": None}
+        assert remaining == {}
+
+    def test_should_reuse_encodings_of_unchanged_immutable_values(self):
+        """The same immutable object should not be pickled again."""
+        tracker = StateTracker()
+        text = "x" * 1000
+        tracker.refresh({"text": text})
+        first = tracker._variables["text"]
+
+        tracker.refresh({"text": text})
+
+        assert tracker._variables["text"] is first
+
+    def test_should_always_encode_everything_without_digests(self):
+        """Interpreters without synced digests should receive the whole state."""
+        tracker = StateTracker()
+        tracker.refresh({"a": 1})
+        tracker.encode({})
+
+        blob, remaining = tracker.encode()
+
+        assert decode(blob) == {"a": 1}
+
+
+@pytest.fixture(params=[{}, {"preinitialize": True}, {"session": True}], ids=str)
+def executor(request):
+    """Create an executor in each execution mode."""
+    executor = WasmtimePythonExecutor(
+        additional_authorized_imports=[], max_print_outputs_length=1000, **request.param
+    )
+    yield executor
+    executor.cleanup()
+
+
+class TestExecutorStateTransfer:
+    """Test that variables reach the guest through the binary channel."""
+
+    def test_should_transfer_values_without_source_form(self, executor):
+        """Values whose repr is not valid source should still arrive intact."""
+        executor.send_variables(
+            {"nan": float("nan"), "when": datetime.datetime(2024, 1, 2, 3, 4)}
+        )
+
+        output, logs, is_final_answer = executor("print(nan != nan, when.year)")
+
+        assert "True 2024" in logs
+
+    def test_should_transfer_large_collections(self, executor):
+        """Large collections should arrive without being compiled as source."""
+        executor.send_variables({"big": list(range(200_000))})
+
+        output, logs, is_final_answer = executor("print(sum(big))")
+
+        assert str(sum(range(200_000))) in logs
+
+    def test_should_fall_back_to_source_for_host_only_values(self, executor):
+        """Host-only values should still be injected through their repr."""
+        executor.send_variables({"obj": HostOnly(), "n": 2})
+
+        output, logs, is_final_answer = executor("print(obj, n)")
+
+        assert "host-only 2" in logs
+
+    def test_should_skip_host_functions(self, executor):
+        """A host function among the variables should not break the others."""
+        executor.send_variables({"helper": host_helper, "n": 2})
+
+        output, logs, is_final_answer = executor("print(n, 'helper' in globals())")
+
+        assert "2 False" in logs
+
+    def test_should_see_values_mutated_in_place(self, executor):
+        """Changes made to a sent value on the host should reach later calls."""
+        items = [1]
+        executor.send_variables({"items": items})
+        executor("print(len(items))")
+
+        items.append(2)
+        output, logs, is_final_answer = executor("print(len(items))")
+
+        assert "2" in logs
+
+
+class TestSessionStateSync:
+    """Test that a session only receives variables it does not hold yet."""
+
+    def test_should_not_resend_unchanged_variables(self):
+        """Guest-side changes to a variable should survive when the host value did not change."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[], session=True)
+        try:
+            executor.send_variables({"counter": 0})
+            executor("counter += 1")
+            executor.send_variables({"other": 1})
+
+            output, logs, is_final_answer = executor("print(counter)")
+
+            assert logs.strip() == "1"
+            assert executor._state_tracker.encode(executor._session_synced_variables) == (
+                None,
+                {},
+            )
+        finally:
+            executor.cleanup()
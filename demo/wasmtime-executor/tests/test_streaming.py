@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for streaming guest output while code runs.
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor
+from wasmtime_executor.streams import supports_memory_streams
+
+
+# Prints, works for a while, then prints again
+SLOW_CODE = """
+import sys
+print("first")
+print("warning", file=sys.stderr)
+total = 0
+for i in range(600_000):
+    total += i
+print("second")
+"""
+
+STREAMING_MODES = [{"preinitialize": True}, {"session": True}]
+if supports_memory_streams():
+    STREAMING_MODES.append({"output_capture": "memory"})
+
+
+class Recorder:
+    """Collects streamed output with the time it arrived."""
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, stream, text):
+        self.events.append((time.monotonic(), stream, text))
+
+    def text(self, stream):
+        return "".join(text for _, name, text in self.events if name == stream)
+
+
+@pytest.fixture(params=STREAMING_MODES, ids=str)
+def executor(request):
+    """Create an executor in each mode that streams output."""
+    executor = WasmtimePythonExecutor(
+        additional_authorized_imports=[], fuel=10**10, **request.param
+    )
+    yield executor
+    executor.cleanup()
+
+
+class TestOutputStreaming:
+    """Test that output reaches the callback while code still runs."""
+
+    def test_should_stream_output_before_the_call_returns(self, executor):
+        """The first line should arrive well before the call is done."""
+        recorder = Recorder()
+        executor.on_output = recorder
+
+        output, logs, is_final_answer = executor(SLOW_CODE)
+        finished = time.monotonic()
+
+        assert recorder.text("stdout") == "first\nsecond\n"
+        assert recorder.text("stderr") == "warning\n"
+        first_arrival = recorder.events[0][0]
+        assert finished - first_arrival > 0.05
+        assert "first" in logs and "second" in logs
+
+    def test_should_keep_running_when_the_callback_fails(self, executor):
+        """A failing callback should not affect the call."""
+
+        def failing(stream, text):
+            raise RuntimeError("callback broke")
+
+        executor.on_output = failing
+
+        output, logs, is_final_answer = executor("print('still fine')")
+
+        assert "still fine" in logs
+
+    @pytest.mark.asyncio
+    async def test_should_call_back_on_the_event_loop(self, executor):
+        """aexecute should deliver output on the event loop thread."""
+        loop_thread = threading.get_ident()
+        threads = set()
+
+        def on_output(stream, text):
+            threads.add(threading.get_ident())
+
+        await executor.aexecute("print('hello')", on_output=on_output)
+        await asyncio.sleep(0)
+
+        assert threads == {loop_thread}
+
+
+class TestFileCaptureStreaming:
+    """Test the callback with temporary-file capture."""
+
+    def test_should_deliver_output_once_the_call_is_done(self):
+        """File capture should still pass the whole output to the callback."""
+        recorder = Recorder()
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], output_capture="file", on_output=recorder
+        )
+        try:
+            executor("print('done')")
+        finally:
+            executor.cleanup()
+
+        assert recorder.text("stdout") == "done\n"
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for in-memory capture of guest output.
+"""
+
+import os
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor
+from wasmtime_executor.streams import (
+    MAX_FRAME_SIZE,
+    OutputBuffer,
+    StdinFeed,
+    dropped_marker,
+    read_output_file,
+    supports_memory_streams,
+)
+
+
+needs_memory_streams = pytest.mark.skipif(
+    not supports_memory_streams(), reason="needs custom WASI outputs"
+)
+
+
+class TestOutputBuffer:
+    """Test the bounded output buffer."""
+
+    def test_should_keep_output_below_the_limit(self):
+        """Writes within the limit should all be kept."""
+        buffer = OutputBuffer(limit=10)
+
+        buffer.write(b"hello ")
+        buffer.write(b"you")
+
+        assert buffer.getvalue() == "hello you"
+        assert buffer.dropped == 0
+
+    def test_should_keep_head_and_tail_beyond_the_limit(self):
+        """Output past the limit should be dropped between its head and its tail, and counted."""
+        buffer = OutputBuffer(limit=4)
+
+        buffer.write(b"abc")
+        buffer.write(b"def")
+        buffer.write(b"gh")
+
+        assert buffer.getvalue() == "ab" + dropped_marker(4) + "gh"
+        assert buffer.dropped == 4
+
+    def test_should_bound_memory_for_huge_writes(self):
+        """A single write larger than the buffer should only keep what fits."""
+        buffer = OutputBuffer(limit=1000)
+
+        buffer.write(b"h" * 10_000_000 + b"END")
+
+        assert len(buffer._head) + len(buffer._tail) == 1000
+        assert buffer.dropped == 10_000_003 - 1000
+        assert buffer.getvalue().endswith("END")
+
+    def test_should_read_head_and_tail_of_large_files(self, tmp_path):
+        """Reading an output file should bound memory the same way."""
+        path = tmp_path / "out.log"
+        path.write_bytes(b"start" + b"x" * 100_000 + b"end")
+
+        text = read_output_file(str(path), limit=10)
+
+        assert text == "start" + dropped_marker(99_998) + "xxend"
+        assert read_output_file(str(tmp_path / "missing.log")) == ""
+
+    def test_should_replace_invalid_utf8(self):
+        """Bytes that are not UTF-8 should not break decoding."""
+        buffer = OutputBuffer()
+
+        buffer.write(b"ok \xff")
+
+        assert buffer.getvalue() == "ok �"
+
+
+@needs_memory_streams
+class TestStdinFeed:
+    """Test feeding data through a stdin pipe."""
+
+    def test_should_feed_more_than_a_pipe_buffer(self):
+        """Data larger than the pipe buffer should arrive in full."""
+        data = os.urandom(1 << 20)
+        feed = StdinFeed(data)
+
+        with open(feed.path, "rb") as reader:
+            received = reader.read()
+        feed.close()
+
+        assert received == data
+
+    def test_should_not_hang_when_the_reader_stops_early(self):
+        """Closing the feed should release a writer whose data was not read."""
+        feed = StdinFeed(b"x" * (4 << 20))
+
+        feed.close()
+
+        assert not feed._thread.is_alive()
+
+
+@needs_memory_streams
+class TestExecutorMemoryCapture:
+    """Test calls whose output is captured in memory."""
+
+    @pytest.fixture
+    def executor(self):
+        """Create an executor capturing output in memory."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], output_capture="memory"
+        )
+        yield executor
+        executor.cleanup()
+
+    def test_should_pick_memory_capture_by_default(self):
+        """The default capture should be in memory when it is supported."""
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[])
+
+        assert executor.output_capture == "memory"
+
+        executor.cleanup()
+
+    def test_should_run_without_a_temporary_directory(self, executor):
+        """Calls should neither create temporary directories nor lose state or output."""
+        executor.send_variables({"numbers": list(range(100_000))})
+
+        with patch(
+            "wasmtime_executor.executor.tempfile.TemporaryDirectory",
+            side_effect=AssertionError("no temporary directory expected"),
+        ):
+            output, logs, is_final_answer = executor(
+                "import sys\nprint(sum(numbers))\nprint('oops', file=sys.stderr)"
+            )
+
+        assert str(sum(range(100_000))) in logs
+        assert "STDERR: oops" in logs
+
+    def test_should_match_file_capture(self, executor):
+        """Both capture modes should produce the same result."""
+        code = "for i in range(3):\n    print(i)\nfinal_answer(i)"
+        executor.send_tools({"final_answer": lambda x: x})
+        with WasmtimePythonExecutor(
+            additional_authorized_imports=[], output_capture="file"
+        ) as file_executor:
+            file_executor.send_tools({"final_answer": lambda x: x})
+
+            assert executor(code) == file_executor(code)
+
+
+class TestBoundedCapture:
+    """Test that huge outputs stay bounded in every execution mode."""
+
+    @pytest.mark.parametrize(
+        "mode",
+        [{"output_capture": "file"}, {"preinitialize": True}, {"session": True}]
+        + ([{"output_capture": "memory"}] if supports_memory_streams() else []),
+        ids=str,
+    )
+    def test_should_keep_the_end_of_huge_outputs(self, mode):
+        """The final answer printed after megabytes of output should survive."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[],
+            max_print_outputs_length=1000,
+            fuel=10**11,
+            **mode,
+        )
+        executor.send_tools({"final_answer": lambda x: x})
+        try:
+            output, logs, is_final_answer = executor(
+                "for i in range(200_000):\n    print('line', i)\nfinal_answer(42)"
+            )
+        finally:
+            executor.cleanup()
+
+        assert is_final_answer is True
+        assert output == 42
+        assert logs.startswith("line 0\n")
+        assert "characters truncated" in logs
+        assert "line 199999" in logs
+        assert len(logs) < 1100
+
+    @pytest.mark.parametrize(
+        "mode",
+        [{"preinitialize": True}, {"session": True}]
+        + ([{"output_capture": "memory"}] if supports_memory_streams() else []),
+        ids=str,
+    )
+    def test_should_split_huge_writes_into_small_frames(self, mode):
+        """A single huge write should reach the host in frames of bounded size."""
+        sizes = []
+        write = OutputBuffer.write
+
+        def recording_write(buffer, data):
+            sizes.append(len(data))
+            write(buffer, data)
+
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], max_print_outputs_length=1000, **mode
+        )
+        try:
+            with patch.object(OutputBuffer, "write", recording_write):
+                output, logs, is_final_answer = executor(
+                    "import sys\nsys.stdout.write('x' * 3_000_000 + '\\nend')"
+                )
+        finally:
+            executor.cleanup()
+
+        assert sum(sizes) >= 3_000_000
+        assert max(sizes) <= MAX_FRAME_SIZE
+        assert logs.endswith("end")
+
+
+class TestOutputCaptureOption:
+    """Test validation of the output capture option."""
+
+    def test_should_reject_unknown_capture_modes(self):
+        """An unknown capture mode should be refused."""
+        with pytest.raises(ValueError):
+            WasmtimePythonExecutor(additional_authorized_imports=[], output_capture="disk")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for host tool calls from the guest.
+"""
+
+import pickle
+import pytest
+import sys
+import threading
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WasmtimePythonExecutor
+from wasmtime_executor.metrics import ExecutionMetrics
+from wasmtime_executor.result import RESULT_ENCODER_SOURCE
+from wasmtime_executor.streams import StdinFeed
+from wasmtime_executor.tools import ToolBridge
+
+
+def call_payload(name, *args, **kwargs):
+    """Encode a tool call like the guest does."""
+    namespace = {}
+    exec(RESULT_ENCODER_SOURCE, namespace)
+    return namespace["_encode_result"]((name, args, kwargs))
+
+
+def decode_reply(frame):
+    assert frame[:1] == b"a"
+    assert int.from_bytes(frame[1:5], "big") == len(frame) - 5
+    return pickle.loads(frame[5:])
+
+
+class Opaque:
+    """A type the guest cannot unpickle."""
+
+    def __str__(self):
+        return "opaque"
+
+
+class TestToolBridge:
+    """Test the host side of tool calls."""
+
+    def test_should_run_tools_with_decoded_arguments(self):
+        """The tool should receive the positional and keyword arguments of the call."""
+        bridge = ToolBridge({"add": lambda a, b=0: a + b})
+
+        reply = bridge.reply(call_payload("add", 2, b=3))
+
+        assert decode_reply(reply) == ("ok", 5)
+
+    def test_should_report_tool_exceptions(self):
+        """Exceptions raised by a tool should travel back with their type and message."""
+
+        def failing():
+            raise KeyError("missing")
+
+        reply = ToolBridge({"failing": failing}).reply(call_payload("failing"))
+
+        assert decode_reply(reply) == ("error", "KeyError", "'missing'")
+
+    def test_should_reject_unknown_tools_and_malformed_calls(self):
+        """Unknown tools and payloads that are not calls should be answered with errors."""
+        bridge = ToolBridge({})
+
+        assert decode_reply(bridge.reply(call_payload("nope")))[:2] == ("error", "NameError")
+        assert decode_reply(bridge.reply(b"garbage"))[:2] == ("error", "RuntimeError")
+
+    def test_should_send_values_the_guest_cannot_load_as_text(self):
+        """Return values of host-only types should reach the guest as their str."""
+        reply = ToolBridge({"make": Opaque}).reply(call_payload("make"))
+
+        assert decode_reply(reply) == ("ok", "opaque")
+
+    def test_should_count_calls_in_metrics(self):
+        """Every call should be counted, failed or not."""
+        metrics = ExecutionMetrics()
+        bridge = ToolBridge({"echo": lambda x: x}, metrics)
+
+        bridge.reply(call_payload("echo", 1))
+        bridge.reply(call_payload("missing"))
+
+        assert metrics.tool_calls == 2
+        assert metrics.tool_seconds > 0
+
+
+class TestStdinFeedKeptOpen:
+    """Test stdin feeds answering tool calls."""
+
+    def test_should_send_data_after_the_initial_data(self):
+        """Data sent later should follow the initial data, and EOF only comes on close."""
+        feed = StdinFeed(b"first", keep_open=True)
+        feed.send(b"second")
+        received = bytearray()
+        with open(feed.path, "rb", buffering=0) as reader:
+            while len(received) < 11:
+                received += reader.read(11 - len(received))
+            feed.close()
+
+        assert bytes(received) == b"firstsecond"
+
+
+class TestExecutorToolCalls:
+    """Test guest code calling host tools."""
+
+    @pytest.fixture(
+        params=[{"output_capture": "memory"}, {"preinitialize": True}, {"session": True}],
+        ids=["fresh", "preinitialize", "session"],
+    )
+    def executor(self, request):
+        executor = WasmtimePythonExecutor(additional_authorized_imports=[], **request.param)
+        yield executor
+        executor.cleanup()
+
+    def test_should_run_tools_on_the_host(self, executor):
+        """Tools should run in the host process and return their result to the guest."""
+        calls = []
+
+        def lookup(key, default=None):
+            calls.append(threading.current_thread().name)
+            return {"a": [1, 2]}.get(key, default)
+
+        executor.send_tools({"lookup": lookup, "final_answer": None})
+
+        output, logs, is_final_answer = executor(
+            "values = lookup('a')\nprint(lookup('b', default='none'))\nfinal_answer(sum(values))"
+        )
+
+        assert (output, logs, is_final_answer) == (3, "none\n", True)
+        assert len(calls) == 2
+        assert executor.last_metrics.tool_calls == 2
+
+    def test_should_raise_tool_errors_in_the_guest(self, executor):
+        """A failing tool should raise an exception of the same builtin type in the guest."""
+
+        def fetch(url):
+            raise ValueError(f"bad url {url}")
+
+        executor.send_tools({"fetch": fetch})
+
+        caught = executor("try:\n    fetch('x')\nexcept ValueError as e:\n    print(e)")
+        uncaught = executor("fetch('y')")
+
+        assert caught[1] == "bad url x\n"
+        assert uncaught[0] == "Execution error: ValueError: bad url y"
+
+    def test_should_keep_state_and_tools_together(self, executor):
+        """Variables shipped on stdin should not be mistaken for tool replies."""
+        executor.send_variables({"numbers": list(range(5))})
+        executor.send_tools({"total": sum})
+
+        output, logs, is_final_answer = executor("print(total(numbers))")
+
+        assert logs == "10\n"
+
+    def test_should_hide_the_channel_from_guest_code(self, executor):
+        """Guest code reading stdin should get EOF rather than tool replies."""
+        executor.send_tools({"echo": lambda x: x})
+
+        output, logs, is_final_answer = executor(
+            "import sys\nprint(repr(sys.stdin.read()), echo(1))"
+        )
+
+        assert logs == "'' 1\n"
+
+    def test_should_fail_tool_calls_with_file_capture(self):
+        """With file output capture, tool calls should fail rather than hang."""
+        executor = WasmtimePythonExecutor(
+            additional_authorized_imports=[], output_capture="file"
+        )
+        executor.send_tools({"echo": lambda x: x})
+        try:
+            output, logs, is_final_answer = executor("echo(1)")
+        finally:
+            executor.cleanup()
+
+        assert output.startswith("Execution error: RuntimeError: Tool echo cannot be called")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Behavior-driven tests for the worker process pool.
+"""
+
+import os
+import pytest
+import signal
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wasmtime_executor import WorkerPool, get_process_metrics
+
+
+@pytest.fixture(scope="module")
+def pool():
+    """A pool of two workers shared by the tests of this module."""
+    pool = WorkerPool([], workers=2)
+    yield pool
+    pool.cleanup()
+
+
+class TestWorkerPoolExecution:
+    """Test running calls on worker processes."""
+
+    def test_should_execute_code_on_a_worker(self, pool):
+        """A call should return the same triple as the executor."""
+        get_process_metrics().reset()
+
+        output, logs, is_final_answer = pool("print(6 * 7)")
+
+        assert (output, logs, is_final_answer) == ("42", "42\n", False)
+        assert pool.last_metrics.failed is False
+        assert pool.last_metrics.stdout_bytes == 3
+        assert get_process_metrics().snapshot()["calls"]["fresh"] == 1
+
+    def test_should_send_variables_with_every_call(self, pool):
+        """Variables should reach whichever worker runs the call."""
+        pool.send_variables({"numbers": [1, 2, 3]})
+        try:
+            results = pool.execute_many(["print(sum(numbers))"] * 4)
+        finally:
+            pool.state.pop("numbers")
+
+        assert [logs for _, logs, _ in results] == ["6\n"] * 4
+
+    def test_should_run_tools_in_the_calling_process(self, pool):
+        """Tools called by the guest should run here, with their errors forwarded."""
+
+        def host_pid():
+            return os.getpid()
+
+        def fail():
+            raise KeyError("missing")
+
+        pool.send_tools({"host_pid": host_pid, "fail": fail})
+        try:
+            output, logs, is_final_answer = pool("print(host_pid())")
+            failed, _, _ = pool("fail()")
+        finally:
+            pool.send_tools({})
+
+        assert logs == f"{os.getpid()}\n"
+        assert "KeyError" in failed
+
+    def test_should_forward_output_while_calls_run(self, pool):
+        """on_output should receive the output of the worker's guest."""
+        received = []
+
+        pool.execute("print('streamed')", on_output=lambda stream, text: received.append(text))
+
+        assert "".join(received) == "streamed\n"
+
+    def test_should_replace_workers_that_died(self, pool):
+        """A killed worker should be replaced, and calls should keep working."""
+        restarts = pool.stats()["restarts"]
+        for worker in list(pool._workers):
+            os.kill(worker.process.pid, signal.SIGKILL)
+            worker.process.join()
+
+        output, logs, is_final_answer = pool("print('still here')")
+
+        assert logs == "still here\n"
+        assert pool.stats()["restarts"] >= restarts + 1
+        assert pool.stats()["workers"] == 2
+
+
+class TestWorkerPoolLimits:
+    """Test job timeouts and unsupported options."""
+
+    def test_should_abandon_jobs_past_the_timeout(self):
+        """A job running past job_timeout should fail and its worker be replaced."""
+        with WorkerPool(
+            [], workers=1, job_timeout=1.0, interruption="epoch", timeout=600
+        ) as pool:
+            output, logs, is_final_answer = pool("while True:\n    pass")
+            after, _, _ = pool("print('recovered')")
+            stats = pool.stats()
+
+        assert "timed out" in output
+        assert after == "recovered"
+        assert stats["restarts"] == 1
+
+    def test_should_reject_sessions(self):
+        """Session mode should be refused, since calls may change workers."""
+        with pytest.raises(ValueError):
+            WorkerPool([], workers=1, session=True)